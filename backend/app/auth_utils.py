@@ -1,14 +1,25 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from typing import Optional
+from jose import jwt
+from typing import Optional, Tuple
 
 # Configuración
 SECRET_KEY = "tu_clave_secreta_super_segura_cambiala_en_prod"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 300 # 5 horas para desarrollo
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Costo de bcrypt (2^rounds iteraciones); al cambiarlo, los hashes se actualizan en el siguiente login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hilos dedicados a bcrypt: acota cuántos hashes corren a la vez (bcrypt libera el GIL)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Pool propio para que una ráfaga de logins no ocupe el pool por defecto del event loop
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,6 +27,22 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    """Como get_password_hash, pero en el pool de bcrypt sin bloquear el event loop"""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica una contraseña en el pool de bcrypt
+
+    Returns:
+        Tupla (válida, nuevo hash). El nuevo hash viene cuando el guardado usa otro
+        costo o esquema y debe reemplazarse; si no, es None.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
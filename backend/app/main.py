@@ -7,13 +7,20 @@ Arquitectura Refactorizada:
 - Integración: El Backend sirve el build de React como archivos estáticos.
 """
 
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
 from app.websockets import manager
+from app.database import engine, SessionLocal
+from app.schema import upgrade_schema
+from app.services.email import email_queue
+from app.services.idempotency import purge_expired_keys
+from app.services.order_events import ensure_order_events
+from app.services.stats import ensure_stats
+from app.services.work_queue import work_queue
 
 # ... imports anteriores ...
 # Importar rutas
@@ -44,6 +51,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def apply_schema_upgrades():
+    # Crear tablas/columnas/índices nuevos sobre bases de datos existentes
+    upgrade_schema(engine)
+    # Migrar el historial heredado a order_events y armar las estadísticas del admin
+    # si la base aún no los tiene
+    with SessionLocal() as db:
+        ensure_order_events(db)
+        ensure_stats(db)
+        # Las Idempotency-Key vencidas ya no deduplican nada
+        purge_expired_keys(db)
+
+@app.on_event("shutdown")
+async def close_background_services():
+    # Esperar (con tope) los efectos secundarios de pedidos que siguen en la cola interna
+    await work_queue.close()
+    # Enviar los correos que quedaron en cola y cerrar las conexiones SMTP
+    await email_queue.close()
+    # Cerrar la suscripción al backend de difusión (Redis)
+    await manager.close()
+
 # Endpoint WebSocket
 @app.websocket("/ws/orders/{order_id}")
 async def websocket_endpoint(websocket: WebSocket, order_id: int):
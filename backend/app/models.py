@@ -1,5 +1,5 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, Float, DateTime, JSON
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -32,6 +32,11 @@ class Business(Base):
     longitude = Column(Float)
     phone = Column(String)
     rating = Column(Float, default=5.0)
+    # Acumulados de reseñas (ver app/services/ratings.py)
+    review_count = Column(Integer, default=0, server_default="0")
+    rating_sum = Column(Float, default=0.0, server_default="0")
+    rating_decayed_sum = Column(Float, default=0.0, server_default="0")
+    rating_decayed_weight = Column(Float, default=0.0, server_default="0")
     is_open = Column(Boolean, default=True)
     delivery_time = Column(Integer)
     
@@ -51,9 +56,20 @@ class Product(Base):
     available = Column(Boolean, default=True)
     image = Column(String)
     source = Column(String, default="Local") # 'Local' o 'Jumbo'
+    # Clave natural dentro del negocio para las importaciones de catálogo (ver services/catalog_import.py)
+    sku = Column(String, nullable=True)
 
     business = relationship("Business", back_populates="products")
 
+    __table_args__ = (
+        # Listado por categoría (case-insensitive): WHERE source = ? AND lower(category) = ? AND available
+        Index("ix_products_source_category_available", "source", func.lower(category), "available"),
+        # Productos de un negocio
+        Index("ix_products_business_available", "business_id", "available"),
+        # Upsert de la importación por (business_id, sku); los productos sin SKU no chocan entre sí
+        Index("ux_products_business_sku", "business_id", "sku", unique=True),
+    )
+
 class Courier(Base):
     __tablename__ = "couriers"
 
@@ -63,9 +79,10 @@ class Courier(Base):
     lat = Column(Float)
     lng = Column(Float)
     zone = Column(String)
-    available = Column(Boolean, default=True)
+    available = Column(Boolean, default=True, index=True)
     vehicle = Column(String)
     rating = Column(Float, default=5.0)
+    current_order_id = Column(Integer, nullable=True) # Pedido que está entregando (sin FK para evitar ciclo con orders)
 
 class Order(Base):
     __tablename__ = "orders"
@@ -97,17 +114,52 @@ class Order(Base):
     
     payment_method = Column(String)
     payment_status = Column(String, default="pendiente")
-    status = Column(String, default="pendiente") # pendiente, preparando, en_camino, entregado
+    # pendiente, preparando, en_camino, entregado. active_history carga el estado anterior
+    # aunque el commit haya expirado el pedido: lo usan los eventos de stats y order_events
+    status = column_property(Column(String, default="pendiente"), active_history=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    status_history = Column(JSON, default=list) # Lista de eventos
+    # Historial heredado: los cambios de estado se registran en order_events
+    # (ver app/services/order_events.py) y las respuestas lo arman desde ahí
+    status_history = Column(JSON, default=list)
 
     business = relationship("Business", back_populates="orders")
     courier = relationship("Courier")
     user = relationship("User", back_populates="orders")
 
+    __table_args__ = (
+        # Historial paginado por cursor (created_at, id) del vendedor y del comprador
+        Index("ix_orders_business_created", "business_id", "created_at"),
+        Index("ix_orders_user_created", "user_id", "created_at"),
+    )
+
+class OrderEvent(Base):
+    """Cambio de estado de un pedido. Solo se insertan filas, nunca se modifican"""
+    __tablename__ = "order_events"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    ts = Column(DateTime, nullable=False) # Hora local, como los timestamps del historial heredado
+    status = Column(String, nullable=False)
+    actor = Column(String, nullable=True) # Email del usuario, repartidor:<id> o None si fue automático
+
+    __table_args__ = (
+        Index("ix_order_events_order_ts", "order_id", "ts"),
+    )
+
+class IdempotencyKey(Base):
+    """Idempotency-Key ya usada por un usuario al crear un pedido (ver app/services/idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False) # SHA-256 del cuerpo de la solicitud original
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 class Review(Base):
     __tablename__ = "reviews"
     
@@ -125,3 +177,21 @@ class Coupon(Base):
     code = Column(String, unique=True, index=True)
     discount_percent = Column(Integer)
     active = Column(Boolean, default=True)
+
+class StatsCounter(Base):
+    """Contadores globales del panel de admin (ver app/services/stats.py)"""
+    __tablename__ = "stats_counters"
+
+    key = Column(String, primary_key=True) # orders, revenue, users, businesses, status:<estado>
+    value = Column(Float, default=0)
+
+class OrderStatsRollup(Base):
+    """Pedidos que entraron a cada estado por hora/día y negocio, con el total vendido"""
+    __tablename__ = "order_stats_rollups"
+
+    granularity = Column(String, primary_key=True) # hour, day
+    bucket = Column(DateTime, primary_key=True) # Inicio de la hora/día (hora local)
+    business_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    orders = Column(Integer, default=0)
+    revenue = Column(Float, default=0)
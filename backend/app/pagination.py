@@ -0,0 +1,104 @@
+"""
+Paginación por cursor (keyset)
+Recorre listados ordenados por (created_at, id) sin OFFSET: cada página continúa
+exactamente después de la última fila de la anterior, aunque entren filas nuevas
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, literal, or_, type_coerce
+from sqlalchemy.sql import Select
+
+# Tamaño de página por defecto y máximo permitido en ?limit=
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+def page_size(limit: Optional[int]) -> int:
+    """Normaliza el ?limit= recibido al rango [1, MAX_PAGE_SIZE]"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(*values: Any) -> str:
+    """Codifica la clave de la última fila de una página como un token opaco"""
+    raw = json.dumps([str(v) if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decodifica un cursor generado por encode_cursor
+
+    Raises:
+        HTTPException 400 si el cursor está mal formado
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+    return values
+
+
+def keyset_page(stmt: Select, created_column, id_column, dialect: str,
+                cursor: Optional[str], limit: int) -> Select:
+    """
+    Aplica orden (created_at DESC, id DESC), la condición del cursor y el límite
+
+    La consulta retorna una columna extra con el valor de created_at tal como está
+    guardado; en SQLite es el texto almacenado, para comparar exactamente con las
+    filas aunque unas tengan microsegundos y otras no.
+
+    Args:
+        stmt: select() con los filtros del listado
+        dialect: Nombre del dialecto de la sesión ("sqlite", "postgresql", ...)
+        cursor: Cursor recibido (None para la primera página)
+        limit: Tamaño de página; se pide una fila extra para saber si hay más
+
+    Returns:
+        select() listo para ejecutar con paginate_rows
+    """
+    sqlite = dialect == "sqlite"
+    sort_key = (type_coerce(created_column, String) if sqlite else created_column).label("cursor_created_at")
+    stmt = stmt.add_columns(sort_key).order_by(created_column.desc(), id_column.desc())
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, 2)
+        if not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+        if sqlite:
+            bound = literal(created_at, String)
+        else:
+            try:
+                bound = datetime.fromisoformat(created_at)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+        stmt = stmt.where(or_(
+            created_column < bound,
+            and_(created_column == bound, id_column < last_id),
+        ))
+    return stmt.limit(limit + 1)
+
+
+def paginate_rows(rows: List[Tuple[Any, Any]], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Separa la página del resultado de keyset_page y calcula el siguiente cursor
+
+    Returns:
+        Tupla (objetos de la página, next_cursor o None si es la última página)
+    """
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        item, created_at = page[-1]
+        next_cursor = encode_cursor(created_at, item.id)
+    return [item for item, _ in page], next_cursor
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
-from app.database import get_db
+from app.database import get_async_db, write_gate
 from app.models import User, Business
-from app.auth_utils import verify_password, get_password_hash, create_access_token, SECRET_KEY, ALGORITHM
+from app.services.catalog_cache import catalog_cache
+from app.services.business_index import business_index
+from app.services.auth_cache import AuthenticatedUser, principal_cache
+from app.auth_utils import hash_password, verify_and_update_password, create_access_token, SECRET_KEY, ALGORITHM
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -32,12 +36,17 @@ class Token(BaseModel):
     token_type: str
 
 # Dependencia para obtener usuario actual
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciales inválidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Token ya verificado hace poco: sin decodificar ni consultar la DB
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -45,20 +54,32 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-        
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+
+    # Los tokens nuevos traen el id (búsqueda por clave primaria); los anteriores solo el email
+    user_id = payload.get("uid")
+    if user_id is not None:
+        user = await db.get(User, user_id)
+        if user is not None and user.email != email:
+            user = None
+    else:
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+    if user is None or user.is_active is False:
         raise credentials_exception
-    return user
+
+    principal = AuthenticatedUser.from_user(user)
+    principal_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Verificar si existe
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user:
+    result = await db.execute(select(User.id).where(User.email == user.email))
+    if result.first():
         raise HTTPException(status_code=400, detail="El email ya está registrado")
     
-    hashed_pw = get_password_hash(user.password)
+    # bcrypt corre en su propio pool: no bloquea el event loop
+    hashed_pw = await hash_password(user.password)
     new_user = User(
         email=user.email,
         hashed_password=hashed_pw,
@@ -66,40 +87,53 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    # Si es vendedor, creamos un negocio "dummy" para que pueda empezar
-    if user.role == "seller":
-        new_business = Business(
-            name=f"Negocio de {user.full_name}",
-            category="Restaurante",
-            address="Dirección pendiente",
-            latitude=6.24,
-            longitude=-75.56,
-            phone="000000",
-            owner=new_user
-        )
-        db.add(new_business)
-        db.commit()
+    async with write_gate.turn():
+        await db.flush()
         
-        # Asignar ID al usuario
-        new_user.business_id = new_business.id
-        db.commit()
+        # Si es vendedor, creamos un negocio "dummy" para que pueda empezar
+        if user.role == "seller":
+            new_business = Business(
+                name=f"Negocio de {user.full_name}",
+                category="Restaurante",
+                address="Dirección pendiente",
+                latitude=6.24,
+                longitude=-75.56,
+                phone="000000"
+            )
+            db.add(new_business)
+            await db.flush()
+            
+            # Asignar ID al usuario
+            new_user.business_id = new_business.id
+
+        await db.commit()
+    if user.role == "seller":
+        catalog_cache.invalidate_businesses()
+        business_index.invalidate()
 
     return new_user
 
 @router.post("/token", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalar_one_or_none()
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # El hash guardado usa otro costo (BCRYPT_ROUNDS cambió): se reemplaza de forma transparente
+    if new_hash:
+        user.hashed_password = new_hash
+        async with write_gate.turn():
+            await db.commit()
     
-    access_token = create_access_token(data={"sub": user.email, "role": user.role})
+    access_token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
@@ -3,157 +3,159 @@ Rutas para el módulo de repartidores
 Sistema de gestión de repartidores simulados
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
-from app.utils import load_json, save_json, calculate_distance
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import Courier, Order
+from app.services.couriers import assign_courier, release_courier, find_nearby, courier_index
+from app.services.order_events import with_status_history
 
 router = APIRouter()
 
 
 @router.get("/")
-async def get_couriers():
+async def get_couriers(db: Session = Depends(get_db)):
     """
     Obtiene todos los repartidores disponibles
     """
-    couriers = load_json("couriers.json")
+    couriers = db.query(Courier).all()
     return {"couriers": couriers}
 
 
 @router.get("/available")
-async def get_available_couriers():
+async def get_available_couriers(db: Session = Depends(get_db)):
     """
     Obtiene solo los repartidores disponibles (no ocupados)
     """
-    couriers = load_json("couriers.json")
-    available = [c for c in couriers if c.get("available", True)]
+    available = db.query(Courier).filter(Courier.available == True).all()
     return {"couriers": available, "count": len(available)}
 
 
 @router.get("/{courier_id}")
-async def get_courier(courier_id: int):
+async def get_courier(courier_id: int, db: Session = Depends(get_db)):
     """
     Obtiene un repartidor por ID
     """
-    couriers = load_json("couriers.json")
-    courier = next((c for c in couriers if c["id"] == courier_id), None)
+    courier = db.get(Courier, courier_id)
     if not courier:
         raise HTTPException(status_code=404, detail="Repartidor no encontrado")
     return courier
 
 
 @router.post("/{courier_id}/assign-order/{order_id}")
-async def assign_order_to_courier(courier_id: int, order_id: int):
+async def assign_order_to_courier(courier_id: int, order_id: int, db: Session = Depends(get_db)):
     """
     Asigna un pedido a un repartidor
-    
+
+    La asignación es atómica: si dos solicitudes reclaman al mismo repartidor
+    o al mismo pedido a la vez, solo una lo consigue.
+
     Args:
         courier_id: ID del repartidor
         order_id: ID del pedido a asignar
     """
-    couriers = load_json("couriers.json")
-    orders = load_json("orders.json")
-    
-    # Buscar repartidor
-    courier = next((c for c in couriers if c["id"] == courier_id), None)
-    if not courier:
-        raise HTTPException(status_code=404, detail="Repartidor no encontrado")
-    
-    if not courier.get("available", True):
-        raise HTTPException(status_code=400, detail="El repartidor no está disponible")
-    
-    # Buscar pedido
-    order = next((o for o in orders if o["id"] == order_id), None)
-    if not order:
-        raise HTTPException(status_code=404, detail="Pedido no encontrado")
-    
-    if order.get("status") not in ["pendiente", "preparando"]:
+    assigned, reason = assign_courier(db, courier_id, order_id)
+
+    if not assigned:
+        courier = db.get(Courier, courier_id)
+        if not courier:
+            raise HTTPException(status_code=404, detail="Repartidor no encontrado")
+        if reason == "courier":
+            raise HTTPException(status_code=400, detail="El repartidor no está disponible")
+
+        order = db.get(Order, order_id)
+        if not order:
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
         raise HTTPException(
-            status_code=400, 
-            detail=f"El pedido no puede ser asignado. Estado actual: {order.get('status')}"
+            status_code=400,
+            detail=f"El pedido no puede ser asignado. Estado actual: {order.status}"
         )
-    
-    # Asignar pedido
-    order["courier_id"] = courier_id
-    order["courier_name"] = courier["name"]
-    order["courier_phone"] = courier["phone"]
-    order["status"] = "en_camino"
-    
-    # Marcar repartidor como ocupado
-    courier["available"] = False
-    courier["current_order_id"] = order_id
-    
-    save_json("orders.json", orders)
-    save_json("couriers.json", couriers)
-    
+
+    courier = db.get(Courier, courier_id)
+    order = db.get(Order, order_id)
+    with_status_history(db, [order])
     return {
-        "message": f"Pedido {order_id} asignado a {courier['name']}",
+        "message": f"Pedido {order_id} asignado a {courier.name}",
         "order": order,
         "courier": courier
     }
 
 
 @router.post("/{courier_id}/complete-order/{order_id}")
-async def complete_order(courier_id: int, order_id: int):
+async def complete_order(courier_id: int, order_id: int, db: Session = Depends(get_db)):
     """
     Marca un pedido como entregado y libera al repartidor
     """
-    couriers = load_json("couriers.json")
-    orders = load_json("orders.json")
-    
-    # Buscar repartidor
-    courier = next((c for c in couriers if c["id"] == courier_id), None)
-    if not courier:
-        raise HTTPException(status_code=404, detail="Repartidor no encontrado")
-    
-    # Buscar pedido
-    order = next((o for o in orders if o["id"] == order_id), None)
-    if not order:
-        raise HTTPException(status_code=404, detail="Pedido no encontrado")
-    
-    if order.get("courier_id") != courier_id:
+    if not release_courier(db, courier_id, order_id):
+        if not db.get(Courier, courier_id):
+            raise HTTPException(status_code=404, detail="Repartidor no encontrado")
+        if not db.get(Order, order_id):
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
         raise HTTPException(status_code=400, detail="Este pedido no está asignado a este repartidor")
-    
-    # Marcar pedido como entregado
-    order["status"] = "entregado"
-    
-    # Liberar repartidor
-    courier["available"] = True
-    courier["current_order_id"] = None
-    
-    save_json("orders.json", orders)
-    save_json("couriers.json", couriers)
-    
+
+    order = db.get(Order, order_id)
+    with_status_history(db, [order])
     return {
         "message": f"Pedido {order_id} marcado como entregado",
         "order": order,
-        "courier": courier
+        "courier": db.get(Courier, courier_id)
     }
 
 
+@router.put("/{courier_id}/location")
+async def update_courier_location(courier_id: int, location: dict, db: Session = Depends(get_db)):
+    """
+    Actualiza la posición reportada por un repartidor
+    {
+        "lat": 6.24,
+        "lng": -75.56
+    }
+    """
+    if "lat" not in location or "lng" not in location:
+        raise HTTPException(status_code=400, detail="Latitud y longitud son requeridas")
+
+    lat, lng = float(location["lat"]), float(location["lng"])
+    result = db.execute(
+        update(Courier).where(Courier.id == courier_id).values(lat=lat, lng=lng)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Repartidor no encontrado")
+    db.commit()
+    courier_index.update(courier_id, lat=lat, lng=lng)
+
+    return {"message": "Ubicación actualizada", "courier": db.get(Courier, courier_id)}
+
+
 @router.get("/nearby/{lat}/{lng}")
-async def get_nearby_couriers(lat: float, lng: float, max_distance: float = 5.0):
+async def get_nearby_couriers(lat: float, lng: float, max_distance: float = 5.0, limit: Optional[int] = None,
+                              db: Session = Depends(get_db)):
     """
     Obtiene repartidores cercanos a una ubicación
-    
+
     Args:
         lat: Latitud de la ubicación
         lng: Longitud de la ubicación
         max_distance: Distancia máxima en kilómetros (default: 5.0)
+        limit: Si se indica, retorna solo los `limit` repartidores más cercanos
     """
-    couriers = load_json("couriers.json")
-    available_couriers = [c for c in couriers if c.get("available", True)]
-    
     nearby = []
-    for courier in available_couriers:
-        distance = calculate_distance(lat, lng, courier["lat"], courier["lng"])
-        if distance <= max_distance:
-            courier_copy = courier.copy()
-            courier_copy["distance_km"] = round(distance, 2)
-            nearby.append(courier_copy)
-    
-    # Ordenar por distancia
-    nearby.sort(key=lambda x: x["distance_km"])
-    
+    for courier, distance in find_nearby(db, lat, lng, max_distance, limit):
+        nearby.append({
+            "id": courier.id,
+            "name": courier.name,
+            "phone": courier.phone,
+            "lat": courier.lat,
+            "lng": courier.lng,
+            "zone": courier.zone,
+            "available": courier.available,
+            "vehicle": courier.vehicle,
+            "rating": courier.rating,
+            "distance_km": round(distance, 2)
+        })
+
     return {
         "couriers": nearby,
         "count": len(nearby),
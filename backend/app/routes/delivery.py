@@ -3,82 +3,245 @@ Rutas para el módulo de delivery local
 Maneja negocios, productos y pedidos
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request, Response, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import Business, Product, Order, Courier, Coupon, Review
-from app.utils import calculate_distance, get_current_timestamp, validate_coordinates
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db, AsyncSessionLocal, write_gate
+from app.models import Business, Product, Order, Coupon, Review, User, StatsCounter
+from app.utils import get_current_timestamp, validate_coordinates
+from app.services.email import EmailService
+from app.services.simulation import simulation_service
+from app.services.routing import road_router
+from app.services.dispatch import dispatch_service
+from app.services.couriers import free_courier, release_courier
+from app.services.catalog_cache import catalog_cache, etag_response
+from app.services.business_index import (
+    DISCOVERY_MAX_RADIUS_KM, DISCOVERY_RADIUS_KM, business_index
+)
+from app.services.search import SEARCH_DEFAULT_RADIUS_KM, search_products
+from app.services.ratings import add_review_statement
+from app.services.idempotency import (
+    IDEMPOTENCY_KEY_MAX_LENGTH, claim_key, find_order_for_key, idempotency_cache, request_fingerprint
+)
+from app.services.work_queue import work_queue
+from app.services.order_events import REPLAY_BATCH_SIZE, replay_query, set_actor, with_status_history_async
+from app.services.stats import GRANULARITIES, range_query, read_counters, series_from_rows
+from app.pagination import page_size, keyset_page, paginate_rows, encode_cursor, decode_cursor
+from app.routes.auth import get_current_user
+from app.websockets import manager
+from datetime import datetime, timedelta
+from bisect import bisect_right
+import asyncio
+import json
 
 router = APIRouter()
 
 @router.get("/businesses")
-async def get_businesses(db: Session = Depends(get_db)):
+async def get_businesses(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Obtiene todos los negocios"""
-    businesses = db.query(Business).all()
-    return {"businesses": businesses}
+    async def load():
+        businesses = (await db.execute(select(Business))).scalars().all()
+        # La misma consulta deja precargado el detalle de cada negocio
+        loaded = {("business", b.id): b for b in businesses}
+        loaded[("businesses",)] = {"businesses": businesses}
+        return loaded
+
+    entry = await catalog_cache.get_or_load(("businesses",), load)
+    return entry.to_response(request)
+
+@router.get("/businesses/discover")
+async def discover_businesses(
+    lat: float,
+    lng: float,
+    radius_km: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Negocios abiertos cerca del cliente, ordenados por un puntaje que combina la
+    distancia, la calificación y el tiempo de entrega (ver services/business_index.py)
+
+    Paginado por cursor sobre (puntaje, id).
+    """
+    if not validate_coordinates(lat, lng):
+        raise HTTPException(status_code=400, detail="Coordenadas inválidas")
+    radius = radius_km if radius_km is not None else DISCOVERY_RADIUS_KM
+    if not 0 < radius <= DISCOVERY_MAX_RADIUS_KM:
+        raise HTTPException(status_code=400, detail=f"El radio debe estar entre 0 y {DISCOVERY_MAX_RADIUS_KM:g} km")
+    size = page_size(limit)
+
+    after = None
+    if cursor:
+        score, last_id = decode_cursor(cursor, 2)
+        if not isinstance(score, (int, float)) or not isinstance(last_id, int):
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+        after = (float(score), last_id)
+    page, total, has_more = await business_index.ranked_page(db, lat, lng, radius, size, after)
+
+    rows = (await db.execute(select(Business).where(Business.id.in_([b for _, b, _ in page])))).scalars().all()
+    by_id = {b.id: b for b in rows}
+    businesses = [
+        {**jsonable_encoder(by_id[business_id]), "distance_km": round(distance, 2), "score": round(score, 4)}
+        for score, business_id, distance in page if business_id in by_id
+    ]
+    next_cursor = encode_cursor(page[-1][0], page[-1][1]) if has_more else None
+    return {"businesses": businesses, "count": len(businesses), "total": total, "next_cursor": next_cursor}
 
 @router.get("/businesses/{business_id}")
-async def get_business(business_id: int, db: Session = Depends(get_db)):
+async def get_business(business_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Obtiene un negocio por ID"""
-    business = db.query(Business).filter(Business.id == business_id).first()
-    if not business:
+    async def load():
+        business = await db.get(Business, business_id)
+        return {("business", business_id): business} if business else {}
+
+    entry = await catalog_cache.get_or_load(("business", business_id), load)
+    if not entry:
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
-    return business
+    return entry.to_response(request)
 
 @router.get("/businesses/{business_id}/products")
-async def get_business_products(business_id: int, db: Session = Depends(get_db)):
+async def get_business_products(business_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Obtiene productos de un negocio"""
-    products = db.query(Product).filter(Product.business_id == business_id, Product.available == True).all()
-    return {"products": products}
+    async def load():
+        result = await db.execute(
+            select(Product).where(Product.business_id == business_id, Product.available == True)
+        )
+        return {("business_products", business_id): {"products": result.scalars().all()}}
 
-@router.get("/products")
-async def get_all_products(category: str = None, db: Session = Depends(get_db)):
-    """Obtiene todos los productos"""
-    query = db.query(Product).filter(Product.source == "Local") # Solo productos de negocios reales
+    entry = await catalog_cache.get_or_load(("business_products", business_id), load)
+    return entry.to_response(request)
+
+def catalog_products_query(category: str = None):
+    """
+    Consulta del listado de productos locales disponibles, filtrada por categoría en SQL
+
+    La comparación usa lower(category), que coincide con la expresión del índice
+    ix_products_source_category_available.
+    """
+    query = select(Product).where(Product.source == "Local", Product.available == True) # Solo productos de negocios reales
     if category:
-        # Búsqueda case-insensitive simple
-        products = query.all()
-        products = [p for p in products if p.category and p.category.lower() == category.lower()]
-    else:
-        products = query.all()
-    
-    return {
-        "products": products, 
-        "count": len(products),
-        "category": category
-    }
+        query = query.where(func.lower(Product.category) == category.lower())
+    return query.order_by(Product.id)
 
-from app.services.email import EmailService
-from app.routes.auth import get_current_user
-from app.models import User
+@router.get("/products")
+async def get_all_products(
+    request: Request,
+    category: str = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Obtiene todos los productos, paginados por cursor (id ascendente)"""
+    bucket_key = ("products", category.lower() if category else None)
+    size = page_size(limit)
+    after_id = 0
+    if cursor:
+        after_id = decode_cursor(cursor, 1)[0]
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
 
-# ... imports anteriores ...
+    async def load_bucket():
+        products = (await db.execute(catalog_products_query(category))).scalars().all()
+        if category:
+            name = products[0].category if products else category
+            return {bucket_key: {"products": products, "category": name}}
 
-@router.post("/orders")
-async def create_order(
-    order_data: dict, 
-    background_tasks: BackgroundTasks, # Inyectar BackgroundTasks
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user) # Requiere autenticación
+        # El listado completo ya trae todo: precalcular de paso el listado de cada categoría
+        buckets: Dict[str, List[Product]] = {}
+        for p in products:
+            if p.category:
+                buckets.setdefault(p.category.lower(), []).append(p)
+        loaded = {bucket_key: {"products": products, "category": None}}
+        for name, items in buckets.items():
+            loaded[("products", name)] = {"products": items, "category": items[0].category}
+        return loaded
+
+    # Solo el listado completo va a la caché: la página se corta en cada solicitud
+    # (cursor y límite los elige el cliente, no deben crear entradas nuevas)
+    bucket = (await catalog_cache.get_or_load(bucket_key, load_bucket)).payload
+    products = bucket["products"]
+    start = bisect_right(products, after_id, key=lambda p: p["id"])
+    page = products[start:start + size]
+    next_cursor = encode_cursor(page[-1]["id"]) if start + size < len(products) else None
+    return etag_response({
+        "products": page,
+        "count": len(page),
+        "total": len(products),
+        "category": bucket["category"],
+        "next_cursor": next_cursor
+    }, request)
+
+@router.get("/search")
+async def search_catalog(
+    q: str,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Crea un nuevo pedido (Autenticado)"""
-    # Validar negocio
-    business = db.query(Business).filter(Business.id == order_data["business_id"]).first()
-    if not business:
-        raise HTTPException(status_code=404, detail="Negocio no encontrado")
-    
-    # Validar productos y calcular total
+    """
+    Busca productos disponibles de todos los negocios por nombre, descripción o categoría
+
+    Ordena por relevancia, ignora tildes, completa la última palabra como prefijo y
+    corrige errores de tipeo si no hay resultados. Con lat/lng solo incluye negocios
+    a menos de radius_km y agrega la distancia de cada uno.
+    """
+    business_distances = None
+    if lat is not None or lng is not None:
+        if lat is None or lng is None or not validate_coordinates(lat, lng):
+            raise HTTPException(status_code=400, detail="Coordenadas inválidas")
+        radius = radius_km if radius_km is not None else SEARCH_DEFAULT_RADIUS_KM
+        if radius <= 0:
+            raise HTTPException(status_code=400, detail="El radio debe ser mayor que cero")
+        business_distances = await business_index.within_radius(db, lat, lng, radius)
+    return await search_products(db, q, page_size(limit), cursor, business_distances)
+
+@router.get("/catalog/stats")
+async def get_catalog_cache_stats():
+    """Métricas de la caché del catálogo (aciertos, fallos, entradas)"""
+    return catalog_cache.stats()
+
+async def price_order_items(db: AsyncSession, business_id: int, items: List[Dict]):
+    """
+    Resuelve los productos del carrito con una sola consulta IN y calcula el total
+
+    Valida que cada producto exista, pertenezca al negocio del pedido y esté disponible.
+
+    Returns:
+        Tupla (líneas del pedido, total)
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="El pedido debe contener productos válidos")
+
+    product_ids = {item["product_id"] for item in items}
+    result = await db.execute(select(Product).where(Product.id.in_(product_ids)))
+    products = {product.id: product for product in result.scalars()}
+
+    invalid = sorted(
+        pid for pid in product_ids
+        if pid not in products or products[pid].business_id != business_id or not products[pid].available
+    )
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Productos no disponibles en este negocio: {invalid}"
+        )
+
     total = 0
     order_products = []
-    
-    for item in order_data["products"]:
-        product = db.query(Product).filter(Product.id == item["product_id"]).first()
-        if not product:
-            continue
-            
+    for item in items:
+        product = products[item["product_id"]]
         quantity = item.get("quantity", 1)
+        if not isinstance(quantity, int) or quantity < 1:
+            raise HTTPException(status_code=400, detail=f"Cantidad inválida para el producto {product.id}")
         subtotal = product.price * quantity
         total += subtotal
         
@@ -90,16 +253,139 @@ async def create_order(
             "subtotal": subtotal,
             "image": product.image
         })
+    return order_products, total
+
+def run_in_background(background_tasks: BackgroundTasks, job, *args, **kwargs):
+    """Encola el trabajo en la cola interna; si está llena, lo corre al terminar la respuesta"""
+    if not work_queue.submit(job, *args, **kwargs):
+        background_tasks.add_task(job, *args, **kwargs)
+
+# -------------------------------------------------------------------------
+# AUTOMATIZACIÓN DE DEMOSTRACIÓN
+# Para que el usuario vea cambios en el tracking sin esperar a un "vendedor"
+# -------------------------------------------------------------------------
+async def demo_order_progression(order_id: int):
+    # Esperar 5 segundos y pasar a PREPARANDO
+    await asyncio.sleep(5)
+    # Necesitamos una nueva sesión de DB porque esto corre en background
+    async with AsyncSessionLocal() as db_bg:
+        try:
+            order = await db_bg.get(Order, order_id)
+            if order and order.status == "pendiente":
+                order.status = "preparando"
+                # Notificar WS
+                await manager.broadcast(order_id, {
+                    "type": "status_update", 
+                    "status": "preparando", 
+                    "message": "El restaurante está preparando tu pedido 🍳"
+                })
+                await EmailService.send_status_update(order.customer_email, order.id, "preparando")
+                async with write_gate.turn():
+                    await db_bg.commit()
+
+                # Esperar 8 segundos más y pasar a EN CAMINO (Inicia simulación)
+                await asyncio.sleep(8)
+                await db_bg.refresh(order)
+                if order.status == "preparando":
+                    # Pedir repartidor al despacho por lotes (el claim pasa el pedido a en_camino)
+                    await db_bg.commit()
+                    courier_id = await dispatch_service.request_courier(
+                        order_id, order.business_lat, order.business_lng
+                    )
+
+                    await db_bg.refresh(order)
+                    if order.status not in ("preparando", "en_camino"):
+                        return
+                    order.status = "en_camino"
+
+                    # Notificar WS
+                    await manager.broadcast(order_id, {
+                        "type": "status_update", 
+                        "status": "en_camino", 
+                        "message": "¡Tu pedido va en camino! 🛵"
+                    })
+                    await EmailService.send_status_update(order.customer_email, order.id, "en_camino")
+                    async with write_gate.turn():
+                        await db_bg.commit()
+
+                    # Iniciar simulación de movimiento por la ruta (ya cacheada al crear el pedido)
+                    route = await road_router.route_async(
+                        order.business_lat, order.business_lng, order.customer_lat, order.customer_lng
+                    )
+                    arrived = await simulation_service.start_simulation(
+                        order_id=order.id,
+                        start_lat=order.business_lat,
+                        start_lng=order.business_lng,
+                        end_lat=order.customer_lat,
+                        end_lng=order.customer_lng,
+                        duration_seconds=60, # Viaje rápido de 1 min para demo
+                        waypoints=route.waypoints
+                    )
+
+                    # Al terminar el recorrido, marcar entregado y liberar al repartidor
+                    # (si se canceló, update_order_status ya liberó al repartidor)
+                    if courier_id and arrived:
+                        async with write_gate.turn():
+                            await db_bg.run_sync(release_courier, courier_id, order_id)
+        except Exception as e:
+            print(f"❌ Error en demo automática: {e}")
+
+
+def order_created_response(order: Order) -> Dict:
+    return {"order": order, "message": "Pedido creado exitosamente", "id": order.id}
+
+async def replay_created_order(db: AsyncSession, response: Response, fingerprint: str,
+                               original_fingerprint: str, order_id: int) -> Dict:
+    """Respuesta de un reintento: el pedido creado con la misma Idempotency-Key, sin efectos secundarios"""
+    if fingerprint != original_fingerprint:
+        raise HTTPException(status_code=422, detail="La Idempotency-Key ya se usó con un pedido distinto")
+    order = await db.get(Order, order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    await with_status_history_async(db, [order])
+    response.headers["Idempotent-Replayed"] = "true"
+    return order_created_response(order)
+
+@router.post("/orders")
+async def create_order(
+    order_data: dict, 
+    background_tasks: BackgroundTasks, # Inyectar BackgroundTasks
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user), # Requiere autenticación
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Crea un nuevo pedido (Autenticado)
+
+    Con el header Idempotency-Key, los reintentos con la misma clave devuelven el
+    pedido ya creado (con el header Idempotent-Replayed: true) en lugar de crear otro.
+    Reusar la clave con un pedido distinto responde 422.
+    """
+    fingerprint = None
+    if idempotency_key:
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key demasiado larga")
+        fingerprint = request_fingerprint(order_data)
+        existing = await find_order_for_key(db, current_user.id, idempotency_key)
+        if existing:
+            return await replay_created_order(db, response, fingerprint, *existing)
+
+    # Validar negocio
+    business = await db.get(Business, order_data["business_id"])
+    if not business:
+        raise HTTPException(status_code=404, detail="Negocio no encontrado")
     
-    if not order_products:
-        raise HTTPException(status_code=400, detail="El pedido debe contener productos válidos")
+    # Validar productos y calcular total
+    order_products, total = await price_order_items(db, business.id, order_data["products"])
 
-    # Calcular distancia
-    distance = calculate_distance(
+    # Calcular distancia y tiempo de viaje por la red vial (en línea recta si no hay grafo)
+    route = await road_router.route_async(
         business.latitude, business.longitude,
         order_data["customer_lat"], order_data["customer_lng"]
     )
-    estimated_time = int(business.delivery_time + (distance * 2)) if business.delivery_time else 30
+    distance = route.distance_km
+    estimated_time = int(business.delivery_time + route.duration_minutes) if business.delivery_time else 30
     
     # Crear orden vinculada al usuario
     new_order = Order(
@@ -120,102 +406,63 @@ async def create_order(
         estimated_time=estimated_time,
         payment_method=order_data.get("payment_method", "efectivo"),
         status="pendiente",
-        status_history=[{
-            "status": "pendiente",
-            "timestamp": datetime.now().isoformat()
-        }],
         courier_phone=None # Añadimos esto para evitar error si el modelo lo espera
     )
     
+    # Una sola transacción corta: pedido, evento "pendiente", estadísticas y la clave
     db.add(new_order)
-    db.commit()
-    db.refresh(new_order)
-    
-    # Enviar email de confirmación
-    EmailService.send_order_confirmation(current_user.email, new_order.id, total)
-    
-    # -------------------------------------------------------------------------
-    # AUTOMATIZACIÓN DE DEMOSTRACIÓN
-    # Para que el usuario vea cambios en el tracking sin esperar a un "vendedor"
-    # -------------------------------------------------------------------------
-    async def demo_order_progression(order_id: int):
-        import asyncio
-        # Esperar 5 segundos y pasar a PREPARANDO
-        await asyncio.sleep(5)
-        # Necesitamos una nueva sesión de DB porque esto corre en background
-        from app.database import SessionLocal
-        db_bg = SessionLocal()
-        try:
-            order = db_bg.query(Order).filter(Order.id == order_id).first()
-            if order and order.status == "pendiente":
-                order.status = "preparando"
-                # Notificar WS
-                await manager.broadcast(order_id, {
-                    "type": "status_update", 
-                    "status": "preparando", 
-                    "message": "El restaurante está preparando tu pedido 🍳"
-                })
-                EmailService.send_status_update(order.customer_email, order.id, "preparando")
-                db_bg.commit()
-                
-                # Esperar 8 segundos más y pasar a EN CAMINO (Inicia simulación)
-                await asyncio.sleep(8)
-                order = db_bg.query(Order).filter(Order.id == order_id).first()
-                if order and order.status == "preparando":
-                    order.status = "en_camino"
-                    
-                    # Asignar repartidor
-                    courier = db_bg.query(Courier).filter(Courier.available == True).first()
-                    if courier:
-                        order.delivery_person_id = courier.id
-                        order.delivery_person_name = courier.name
-                        order.courier_phone = courier.phone
-                    
-                    # Notificar WS
-                    await manager.broadcast(order_id, {
-                        "type": "status_update", 
-                        "status": "en_camino", 
-                        "message": "¡Tu pedido va en camino! 🛵"
-                    })
-                    EmailService.send_status_update(order.customer_email, order.id, "en_camino")
-                    db_bg.commit()
-                    
-                    # Iniciar simulación de movimiento
-                    await simulation_service.start_simulation(
-                        order_id=order.id,
-                        start_lat=order.business_lat,
-                        start_lng=order.business_lng,
-                        end_lat=order.customer_lat,
-                        end_lng=order.customer_lng,
-                        duration_seconds=60 # Viaje rápido de 1 min para demo
-                    )
-        except Exception as e:
-            print(f"❌ Error en demo automática: {e}")
-        finally:
-            db_bg.close()
-
-    # Agregar tarea en segundo plano
-    background_tasks.add_task(demo_order_progression, new_order.id)
+    set_actor(db, current_user.email)
+    try:
+        async with write_gate.turn():
+            if idempotency_key:
+                await db.flush()
+                expires_at = await claim_key(db, current_user.id, idempotency_key, fingerprint, new_order.id)
+            await db.commit()
+    except IntegrityError:
+        # Un reintento en paralelo con la misma clave confirmó primero
+        await db.rollback()
+        existing = await find_order_for_key(db, current_user.id, idempotency_key) if idempotency_key else None
+        if not existing:
+            raise
+        return await replay_created_order(db, response, fingerprint, *existing)
+    if idempotency_key:
+        idempotency_cache.put(current_user.id, idempotency_key, fingerprint, new_order.id, expires_at)
 
-    return {"order": new_order, "message": "Pedido creado exitosamente", "id": new_order.id}
+    # created_at ya volvió en el RETURNING del INSERT: sin refresh
+    await with_status_history_async(db, [new_order])
+    
+    # Correo y demo fuera de la solicitud: la respuesta sale apenas se confirma el pedido.
+    # La demo dura más de un minuto esperando, así que no ocupa cupo de la cola de trabajos
+    run_in_background(background_tasks, EmailService.send_order_confirmation, current_user.email, new_order.id, total)
+    work_queue.spawn(demo_order_progression, new_order.id)
 
-from app.websockets import manager
-from app.services.simulation import simulation_service
-from fastapi import BackgroundTasks
+    return order_created_response(new_order)
 
-# ... imports anteriores ...
+async def dispatch_and_track(order_id: int, start_lat: float, start_lng: float, end_lat: float, end_lng: float):
+    """Solicita repartidor al despacho y, si se asigna, inicia la simulación de movimiento"""
+    courier_id = await dispatch_service.request_courier(order_id, start_lat, start_lng)
+    if courier_id:
+        route = await road_router.route_async(start_lat, start_lng, end_lat, end_lng)
+        await simulation_service.start_simulation(
+            order_id=order_id,
+            start_lat=start_lat,
+            start_lng=start_lng,
+            end_lat=end_lat,
+            end_lng=end_lng,
+            waypoints=route.waypoints
+        )
 
 @router.patch("/orders/{order_id}/status")
 async def update_order_status(
     order_id: int, 
     status_data: dict, 
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Actualiza el estado de un pedido (Solo Vendedores o Admin)"""
     
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
         
@@ -237,40 +484,28 @@ async def update_order_status(
     
     order.status = new_status
     
-    # Logica de repartidor (simplificada)
+    # Logica de repartidor: el despacho por lotes elige al repartidor más cercano
     if new_status == "en_camino" and not order.delivery_person_id:
-        courier = db.query(Courier).filter(Courier.available == True).first()
-        if courier:
-            order.delivery_person_id = courier.id
-            order.delivery_person_name = courier.name
-            order.courier_phone = courier.phone
-            
-            # Iniciar simulación de movimiento
-            background_tasks.add_task(
-                simulation_service.start_simulation,
-                order_id=order.id,
-                start_lat=order.business_lat,
-                start_lng=order.business_lng,
-                end_lat=order.customer_lat,
-                end_lng=order.customer_lng
-            )
-    elif new_status == "entregado":
+        background_tasks.add_task(
+            dispatch_and_track,
+            order_id=order.id,
+            start_lat=order.business_lat,
+            start_lng=order.business_lng,
+            end_lat=order.customer_lat,
+            end_lng=order.customer_lng
+        )
+    elif new_status in ("entregado", "cancelado"):
         simulation_service.stop_simulation(order.id)
     
-    # Actualizar historial
-    if not order.status_history:
-        order.status_history = []
-    
-    history = list(order.status_history)
-    history.append({
-        "status": new_status,
-        "timestamp": datetime.now().isoformat(),
-        "updated_by": current_user.email
-    })
-    order.status_history = history
+    # El cambio de estado se agrega al log order_events al hacer commit
+    set_actor(db, current_user.email)
     order.updated_at = datetime.now()
     
-    db.commit()
+    async with write_gate.turn():
+        if new_status in ("entregado", "cancelado") and order.delivery_person_id:
+            await db.run_sync(free_courier, order.delivery_person_id, order.id)
+        await db.commit()
+    await with_status_history_async(db, [order])
     
     # Notificar via WebSocket
     await manager.broadcast(order.id, {
@@ -281,59 +516,148 @@ async def update_order_status(
     
     # Enviar notificación de cambio de estado
     if order.customer_email:
-        EmailService.send_status_update(order.customer_email, order.id, new_status)
+        await EmailService.send_status_update(order.customer_email, order.id, new_status)
     
     return {"order": order, "message": f"Estado actualizado de '{old_status}' a '{new_status}'"}
 
+async def fetch_orders_page(db: AsyncSession, stmt, cursor: Optional[str], limit: Optional[int]):
+    """
+    Ejecuta un listado de pedidos paginado por (created_at, id), del más reciente al más antiguo
+
+    Returns:
+        Tupla (pedidos de la página, next_cursor)
+    """
+    size = page_size(limit)
+    stmt = keyset_page(stmt, Order.created_at, Order.id, db.bind.dialect.name, cursor, size)
+    rows = (await db.execute(stmt)).all()
+    orders, next_cursor = paginate_rows(rows, size)
+    return await with_status_history_async(db, orders), next_cursor
+
 @router.get("/seller/orders")
-async def get_seller_orders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Obtiene los pedidos del negocio del vendedor actual"""
+async def get_seller_orders(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obtiene los pedidos del negocio del vendedor actual, paginados por cursor"""
     if current_user.role != "seller" or not current_user.business_id:
         raise HTTPException(status_code=403, detail="No eres vendedor o no tienes negocio asignado")
-        
-    orders = db.query(Order).filter(Order.business_id == current_user.business_id).order_by(Order.created_at.desc()).all()
-    return {"orders": orders}
+
+    orders, next_cursor = await fetch_orders_page(
+        db, select(Order).where(Order.business_id == current_user.business_id), cursor, limit
+    )
+    return {"orders": orders, "next_cursor": next_cursor}
 
 @router.get("/admin/stats")
-async def get_admin_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Métricas globales para el admin"""
+async def get_admin_stats(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """Métricas globales para el admin (contadores materializados, sin recorrer las tablas)"""
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Acceso denegado")
         
-    total_orders = db.query(Order).count()
-    total_sales = db.query(func.sum(Order.total)).scalar() or 0
-    total_users = db.query(User).count()
-    total_businesses = db.query(Business).count()
-    
-    recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(5).all()
+    counters = (await db.execute(select(StatsCounter.key, StatsCounter.value))).all()
+    recent_orders = (await db.execute(select(Order).order_by(Order.id.desc()).limit(5))).scalars().all()
+    await with_status_history_async(db, recent_orders)
     
+    return {**read_counters(counters), "recent_orders": recent_orders}
+
+@router.get("/admin/stats/range")
+async def get_admin_stats_range(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "hour",
+    business_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Pedidos y ventas por hora o día en [start, end), agrupados por estado
+
+    Por defecto: últimas 24 horas por hora, o últimos 30 días por día.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"Granularidad inválida. Válidas: {list(GRANULARITIES)}")
+
+    end = end.replace(tzinfo=None) if end else datetime.now()
+    if start is None:
+        start = end - (timedelta(hours=24) if granularity == "hour" else timedelta(days=30))
+    rows = (await db.execute(range_query(start.replace(tzinfo=None), end, granularity, business_id))).all()
     return {
-        "total_orders": total_orders,
-        "total_sales": total_sales,
-        "total_users": total_users,
-        "total_businesses": total_businesses,
-        "recent_orders": recent_orders
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "business_id": business_id,
+        "series": series_from_rows(rows),
     }
 
+@router.get("/admin/order-events")
+async def stream_order_events(
+    after_id: int = 0,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Reproduce el log de cambios de estado de los pedidos para analítica (NDJSON)
+
+    Una línea por evento en orden de inserción, leída por lotes. Para continuar una
+    lectura cortada, pasar como after_id el id del último evento recibido.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Acceso denegado")
+
+    stmt = replay_query(
+        after_id,
+        since.replace(tzinfo=None) if since else None,
+        until.replace(tzinfo=None) if until else None,
+    ).execution_options(yield_per=REPLAY_BATCH_SIZE)
+
+    async def lines():
+        # Sesión propia: la respuesta se sigue enviando después de salir del endpoint
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt)
+            async for partition in result.partitions():
+                yield "".join(
+                    json.dumps({
+                        "id": event_id, "order_id": order_id, "ts": ts.isoformat(), "status": status,
+                        "actor": actor, "business_id": business_id, "total": total,
+                    }, ensure_ascii=False) + "\n"
+                    for event_id, order_id, ts, status, actor, business_id, total in partition
+                )
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/orders/mine")
-async def get_my_orders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Obtiene el historial de pedidos del usuario autenticado"""
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
-    return {"orders": orders}
+async def get_my_orders(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obtiene el historial de pedidos del usuario autenticado, paginado por cursor"""
+    orders, next_cursor = await fetch_orders_page(
+        db, select(Order).where(Order.user_id == current_user.id), cursor, limit
+    )
+    return {"orders": orders, "next_cursor": next_cursor}
 
 @router.get("/orders/user/history")
-async def get_user_orders(phone: str, db: Session = Depends(get_db)):
+async def get_user_orders(phone: str, cursor: Optional[str] = None, limit: Optional[int] = None,
+                          db: AsyncSession = Depends(get_async_db)):
     """Historial de pedidos por teléfono (simulación de usuario)"""
     # Normalizar
     clean_phone = phone.replace(" ", "").replace("-", "").replace("+", "")
     # Buscamos coincidencias aproximadas o exactas
-    orders = db.query(Order).filter(Order.customer_phone.contains(phone[-7:])).order_by(Order.created_at.desc()).all()
-    return {"orders": orders}
+    orders, next_cursor = await fetch_orders_page(
+        db, select(Order).where(Order.customer_phone.contains(phone[-7:])), cursor, limit
+    )
+    return {"orders": orders, "next_cursor": next_cursor}
 
 @router.post("/reviews")
-async def create_review(review_data: dict, db: Session = Depends(get_db)):
+async def create_review(review_data: dict, db: AsyncSession = Depends(get_async_db)):
     """Crear una reseña para un pedido"""
-    order = db.query(Order).filter(Order.id == review_data["order_id"]).first()
+    order = await db.get(Order, review_data["order_id"])
     if not order:
         raise HTTPException(status_code=404, detail="Pedido no encontrado")
     
@@ -345,14 +669,11 @@ async def create_review(review_data: dict, db: Session = Depends(get_db)):
     )
     db.add(review)
     
-    # Actualizar rating del negocio (promedio simple)
-    business = db.query(Business).filter(Business.id == order.business_id).first()
-    reviews = db.query(Review).filter(Review.business_id == order.business_id).all()
-    if reviews:
-        total_rating = sum([r.rating for r in reviews]) + review_data["rating"]
-        business.rating = round(total_rating / (len(reviews) + 1), 1)
-    
-    db.commit()
+    # Actualizar rating del negocio con los acumulados (sin releer todas las reseñas)
+    async with write_gate.turn():
+        await db.execute(add_review_statement(order.business_id, review_data["rating"]))
+        await db.commit()
+    catalog_cache.invalidate_businesses()
     return {"message": "Reseña guardada"}
 
 @router.post("/coupons/validate")
@@ -0,0 +1,64 @@
+"""
+Actualización incremental del esquema de la base de datos
+Crea tablas, columnas e índices nuevos sobre bases de datos existentes (ej. delivery.db)
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.database import Base
+
+
+def _existing_index_names(conn, inspector, table_name: str) -> set:
+    """Nombres de los índices de una tabla, incluidos los de expresión (ej. lower(category))"""
+    if conn.dialect.name == "sqlite":
+        # El inspector de SQLite omite los índices sobre expresiones
+        rows = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+            {"table": table_name},
+        )
+        return {row[0] for row in rows}
+    return {i["name"] for i in inspector.get_indexes(table_name)}
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Sincroniza la base de datos con los modelos sin borrar datos
+
+    - Crea las tablas que no existan
+    - Agrega con ALTER TABLE las columnas nuevas de tablas existentes
+    - Crea los índices declarados en los modelos que falten
+    - Crea el índice de búsqueda FTS5 de productos y sus triggers (solo SQLite)
+
+    Args:
+        engine: Engine de SQLAlchemy sobre el que aplicar los cambios
+    """
+    # Importar modelos para registrarlos en Base.metadata
+    import app.models  # noqa: F401
+    from app.services.search import SEARCH_TABLE, ensure_search_index
+
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                default = column.server_default
+                if default is not None and isinstance(getattr(default, "arg", None), str):
+                    ddl += f" DEFAULT '{default.arg}'"
+                conn.execute(text(ddl))
+                print(f"🛠️  Columna agregada: {table.name}.{column.name}")
+
+            existing_indexes = _existing_index_names(conn, inspector, table.name)
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    print(f"🛠️  Índice creado: {index.name}")
+
+        if ensure_search_index(conn):
+            print(f"🛠️  Índice de búsqueda creado: {SEARCH_TABLE}")
@@ -0,0 +1,169 @@
+"""
+Caché de usuarios autenticados
+Guarda por unos segundos el token ya verificado -> usuario, para que las rutas
+autenticadas (ej. el dashboard del vendedor, que consulta cada pocos segundos) no
+decodifiquen el JWT ni consulten la tabla users en cada petición
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models import User
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+
+# Cambios en estas columnas alteran lo que un token puede hacer
+PRINCIPAL_FIELDS = ("email", "full_name", "role", "business_id", "is_active")
+
+
+class AuthenticatedUser:
+    """
+    Copia de solo lectura de las columnas del usuario que usan las rutas.
+
+    No está ligada a ninguna sesión, así que puede compartirse entre peticiones.
+    """
+
+    __slots__ = ("id",) + PRINCIPAL_FIELDS
+
+    def __init__(self, id: int, email: str, full_name: str, role: str,
+                 business_id: Optional[int], is_active: bool):
+        self.id = id
+        self.email = email
+        self.full_name = full_name
+        self.role = role
+        self.business_id = business_id
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(user.id, user.email, user.full_name, user.role, user.business_id,
+                   user.is_active is not False)
+
+
+class PrincipalCache:
+    """
+    Caché LRU con TTL de token verificado -> AuthenticatedUser.
+
+    Una entrada vive hasta AUTH_CACHE_TTL_SECONDS (o hasta que expire el token, si es
+    antes). Cuando cambia el rol, el negocio, el email o is_active de un usuario, se
+    borran todas sus entradas en este proceso; en otros workers el TTL acota cuánto
+    tiempo se ve el dato anterior.
+    """
+
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS, max_size: int = AUTH_CACHE_MAX_SIZE):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[AuthenticatedUser, float]]" = OrderedDict()
+        # user_id -> tokens cacheados, para invalidar por usuario
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if expires_at <= time.time():
+                self._discard(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: AuthenticatedUser, token_expires_at: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._discard(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+
+    def _discard(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[0].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[0].id]
+
+    def invalidate_user(self, user_id: int):
+        """Olvida todos los tokens cacheados de un usuario"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._discard(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+principal_cache = PrincipalCache()
+
+
+# Usuarios modificados en la transacción de una sesión, pendientes de invalidar
+_PENDING_KEY = "principal_cache_invalidate"
+
+
+def _mark_for_invalidation(target: User):
+    # El flush ocurre antes del commit: si se invalidara aquí, una petición concurrente
+    # podría volver a cachear la fila vieja (aún confirmada) antes de que la nueva se vea.
+    # Se anota el id y se invalida en after_commit
+    session = inspect(target).session
+    if session is None:
+        principal_cache.invalidate_user(target.id)
+    else:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_user(mapper, connection, target: User):
+    # Cubre los cambios hechos con la sesión (sync o async); un UPDATE masivo sobre
+    # users debe llamar a principal_cache.invalidate_user por su cuenta
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+        _mark_for_invalidation(target)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User):
+    _mark_for_invalidation(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        principal_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session: Session):
+    # Los cambios no se confirmaron: la caché sigue siendo válida
+    session.info.pop(_PENDING_KEY, None)
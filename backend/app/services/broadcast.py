@@ -0,0 +1,168 @@
+"""
+Backends de difusión (pub/sub) para los mensajes de tracking
+Permiten correr varios workers de uvicorn: un worker publica una vez y cada
+worker entrega el mensaje a los WebSockets que tiene abiertos
+"""
+
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+# "memory" (un solo proceso) o "redis" (varios workers / servidores)
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+BROADCAST_CHANNEL_PREFIX = os.getenv("BROADCAST_CHANNEL_PREFIX", "delivery:orders:")
+
+# Recibe (order_id, mensaje ya serializado en JSON) y lo entrega a los sockets locales
+Deliver = Callable[[int, str], Awaitable[None]]
+
+
+class BroadcastBackend(ABC):
+    """
+    Interfaz de un backend de difusión.
+
+    `publish` envía un mensaje a todos los workers suscritos a la orden; cada worker
+    lo recibe en el callback `deliver` registrado con `start`. `subscribe` y
+    `unsubscribe` se llaman cuando un worker abre su primer socket de una orden o
+    cierra el último. Un backend debe implementar al menos `start` y `publish`.
+    """
+
+    @abstractmethod
+    async def start(self, deliver: Deliver):
+        """Registra el callback que entrega los mensajes recibidos a los sockets locales"""
+
+    @abstractmethod
+    async def publish(self, order_id: int, text: str):
+        """Envía un mensaje ya serializado a los workers suscritos a la orden"""
+
+    async def publish_many(self, messages: List[Tuple[int, str]]):
+        """Publica varios mensajes de una vez; los backends remotos los envían en un solo viaje"""
+        for order_id, text in messages:
+            await self.publish(order_id, text)
+
+    async def subscribe(self, order_id: int):
+        pass
+
+    async def unsubscribe(self, order_id: int):
+        pass
+
+    async def close(self):
+        pass
+
+
+class MemoryBroadcast(BroadcastBackend):
+    """Difusión dentro del mismo proceso: publicar es entregar directamente"""
+
+    def __init__(self):
+        self.deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def publish(self, order_id: int, text: str):
+        await self.deliver(order_id, text)
+
+
+class RedisBroadcast(BroadcastBackend):
+    """
+    Difusión entre procesos con pub/sub de Redis (un canal por orden).
+
+    Cada worker solo se suscribe a los canales de las órdenes con sockets abiertos
+    en él. Acepta un cliente ya creado (ej. un servidor local de pruebas) o una URL.
+    """
+
+    def __init__(self, url: str = REDIS_URL, client=None, prefix: str = BROADCAST_CHANNEL_PREFIX):
+        self.url = url
+        self.client = client
+        self._owns_client = client is None
+        self.prefix = prefix
+        self.deliver: Optional[Deliver] = None
+        self.pubsub = None
+        self.subscribed: Set[int] = set()
+        self._reader: Optional[asyncio.Task] = None
+
+    def _channel(self, order_id: int) -> str:
+        return f"{self.prefix}{order_id}"
+
+    async def start(self, deliver: Deliver):
+        if self.client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError:
+                raise RuntimeError("BROADCAST_BACKEND=redis requiere el paquete 'redis' (pip install redis)")
+            self.client = redis.from_url(self.url)
+        self.deliver = deliver
+        self.pubsub = self.client.pubsub()
+        # Canal de control: la conexión de pub/sub necesita al menos una suscripción para leer
+        await self.pubsub.subscribe(f"{self.prefix}control")
+        for order_id in self.subscribed:
+            await self.pubsub.subscribe(self._channel(order_id))
+        self._reader = asyncio.get_running_loop().create_task(self._read())
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error leyendo pub/sub de Redis: {e}")
+                await asyncio.sleep(1)
+                continue
+            if not message or message["type"] != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            suffix = channel[len(self.prefix):]
+            if suffix.isdigit():
+                try:
+                    await self.deliver(int(suffix), data)
+                except Exception as e:
+                    print(f"❌ Error entregando mensaje de la orden #{suffix}: {e}")
+
+    async def publish(self, order_id: int, text: str):
+        await self.client.publish(self._channel(order_id), text)
+
+    async def publish_many(self, messages: List[Tuple[int, str]]):
+        if not messages:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for order_id, text in messages:
+            pipe.publish(self._channel(order_id), text)
+        await pipe.execute()
+
+    async def subscribe(self, order_id: int):
+        if order_id not in self.subscribed:
+            self.subscribed.add(order_id)
+            await self.pubsub.subscribe(self._channel(order_id))
+
+    async def unsubscribe(self, order_id: int):
+        if order_id in self.subscribed:
+            self.subscribed.discard(order_id)
+            await self.pubsub.unsubscribe(self._channel(order_id))
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+            self.pubsub = None
+        if self._owns_client and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+def create_broadcast_backend(kind: str = BROADCAST_BACKEND) -> BroadcastBackend:
+    """Crea el backend configurado en BROADCAST_BACKEND"""
+    if kind == "redis":
+        return RedisBroadcast()
+    if kind == "memory":
+        return MemoryBroadcast()
+    raise ValueError(f"BROADCAST_BACKEND desconocido: {kind}")
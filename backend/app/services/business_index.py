@@ -0,0 +1,156 @@
+"""
+Índice espacial de negocios
+Cuadrícula GeoGrid con la ubicación de los negocios, cargada desde la DB y
+reconstruida periódicamente, para filtrar por cercanía sin recorrer la tabla y
+ordenar los negocios abiertos cercanos por distancia, calificación y tiempo de entrega
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Business
+from app.services.spatial import GeoGrid
+from app.utils import distances_from
+
+# Cada cuánto reconstruir el índice desde la DB (negocios nuevos o de otros workers,
+# cambios de calificación)
+BUSINESS_INDEX_REFRESH_SECONDS = float(os.getenv("BUSINESS_INDEX_REFRESH_SECONDS", "60"))
+
+# Radio de búsqueda del descubrimiento de negocios
+DISCOVERY_RADIUS_KM = float(os.getenv("DISCOVERY_RADIUS_KM", "5"))
+DISCOVERY_MAX_RADIUS_KM = float(os.getenv("DISCOVERY_MAX_RADIUS_KM", "25"))
+# Pesos del puntaje (cada componente va de 0 a 1)
+DISCOVERY_WEIGHT_DISTANCE = float(os.getenv("DISCOVERY_WEIGHT_DISTANCE", "0.5"))
+DISCOVERY_WEIGHT_RATING = float(os.getenv("DISCOVERY_WEIGHT_RATING", "0.3"))
+DISCOVERY_WEIGHT_DELIVERY_TIME = float(os.getenv("DISCOVERY_WEIGHT_DELIVERY_TIME", "0.2"))
+# Tiempo de entrega a partir del cual ese componente vale 0, y el que se asume si falta
+DISCOVERY_MAX_DELIVERY_MINUTES = float(os.getenv("DISCOVERY_MAX_DELIVERY_MINUTES", "60"))
+DEFAULT_DELIVERY_MINUTES = 30
+
+
+def static_score(rating: Optional[float], delivery_time: Optional[int]) -> float:
+    """Parte del puntaje que no depende del cliente (calificación y tiempo de entrega)"""
+    rating_part = min(max(rating or 0.0, 0.0), 5.0) / 5.0
+    minutes = delivery_time if delivery_time is not None else DEFAULT_DELIVERY_MINUTES
+    time_part = 1.0 - min(max(minutes, 0), DISCOVERY_MAX_DELIVERY_MINUTES) / DISCOVERY_MAX_DELIVERY_MINUTES
+    return DISCOVERY_WEIGHT_RATING * rating_part + DISCOVERY_WEIGHT_DELIVERY_TIME * time_part
+
+
+class BusinessIndex:
+    """
+    Índice espacial de los negocios con coordenadas.
+
+    Se carga perezosamente y se reemplaza completo al recargar, así una consulta
+    concurrente nunca ve una cuadrícula a medio armar. Al cargar también se
+    precalculan, por celda de la cuadrícula, arreglos NumPy con los negocios
+    abiertos y la parte fija de su puntaje: ordenar solo junta las celdas cercanas
+    y suma el componente de distancia en un paso vectorizado. `invalidate` fuerza
+    la recarga en la próxima consulta (ej. al registrar un negocio).
+    """
+
+    def __init__(self, cell_size_deg: float = 0.01):
+        self.cell_size = cell_size_deg
+        self.grid = GeoGrid(cell_size_deg)
+        # celda -> (ids, latitudes, longitudes, parte fija del puntaje) de los negocios abiertos
+        self.open_cells: Dict[Tuple[int, int], Tuple[np.ndarray, ...]] = {}
+        self.loaded_at: Optional[float] = None
+        self._reloading = False
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > BUSINESS_INDEX_REFRESH_SECONDS
+
+    def reload(self, db: Session):
+        grid = GeoGrid(self.cell_size)
+        by_cell: Dict[Tuple[int, int], List[Tuple[int, float, float, float]]] = {}
+        rows = db.execute(
+            select(Business.id, Business.latitude, Business.longitude, Business.is_open,
+                   Business.rating, Business.delivery_time)
+            .where(Business.latitude.is_not(None), Business.longitude.is_not(None))
+        )
+        for business_id, lat, lng, is_open, rating, delivery_time in rows:
+            grid.upsert(business_id, lat, lng)
+            if is_open or is_open is None:
+                by_cell.setdefault(grid.cell_of(lat, lng), []).append(
+                    (business_id, lat, lng, static_score(rating, delivery_time))
+                )
+        open_cells = {}
+        for cell, items in by_cell.items():
+            ids, lats, lngs, base = zip(*items)
+            open_cells[cell] = (np.array(ids, dtype=np.int64), np.array(lats), np.array(lngs), np.array(base))
+        self.grid, self.open_cells = grid, open_cells
+        self.loaded_at = time.monotonic()
+
+    async def get(self, db: AsyncSession) -> GeoGrid:
+        # Mientras otra solicitud recarga, se sigue usando el índice anterior
+        if self.is_stale() and not (self._reloading and self.loaded_at is not None):
+            self._reloading = True
+            try:
+                await db.run_sync(self.reload)
+            finally:
+                self._reloading = False
+        return self.grid
+
+    async def within_radius(self, db: AsyncSession, lat: float, lng: float, radius_km: float) -> Dict[int, float]:
+        """Negocios a menos de `radius_km`: {business_id: distancia_km}"""
+        grid = await self.get(db)
+        return dict(grid.within_radius(lat, lng, radius_km))
+
+    async def ranked_page(self, db: AsyncSession, lat: float, lng: float, radius_km: float, size: int,
+                          after: Optional[Tuple[float, int]] = None) -> Tuple[List[Tuple[float, int, float]], int, bool]:
+        """
+        Página de negocios abiertos a menos de `radius_km`, del mejor al peor puntaje
+
+        puntaje = peso_distancia * (1 - distancia / radio) + parte fija del negocio
+
+        Args:
+            size: Tamaño de página
+            after: (puntaje, business_id) del último negocio de la página anterior
+
+        Returns:
+            Tupla (página, total en el radio, hay más páginas). La página es una lista
+            de (puntaje, business_id, distancia_km) ordenada por puntaje descendente y
+            luego por id
+        """
+        await self.get(db)
+        open_cells = self.open_cells
+        cells = self.grid.cells_around(lat, lng, radius_km)
+        # Si el radio cubre más celdas de las que tienen negocios, recorrer esas
+        if len(cells) > len(open_cells):
+            chunks = list(open_cells.values())
+        else:
+            chunks = [open_cells[cell] for cell in cells if cell in open_cells]
+        if not chunks:
+            return [], 0, False
+        ids, lats, lngs, base = (np.concatenate(parts) for parts in zip(*chunks))
+
+        distances = distances_from(lat, lng, lats, lngs)
+        inside = distances <= radius_km
+        ids, distances = ids[inside], distances[inside]
+        scores = base[inside] + DISCOVERY_WEIGHT_DISTANCE * (1.0 - distances / radius_km)
+        total = len(ids)
+
+        if after is not None:
+            last_score, last_id = after
+            keep = (scores < last_score) | ((scores == last_score) & (ids > last_id))
+            ids, distances, scores = ids[keep], distances[keep], scores[keep]
+        has_more = len(ids) > size
+        if has_more:
+            # Solo se ordenan los candidatos a la página (incluidos los empates en el corte)
+            cutoff = np.partition(-scores, size - 1)[size - 1]
+            candidates = np.flatnonzero(-scores <= cutoff)
+            ids, distances, scores = ids[candidates], distances[candidates], scores[candidates]
+        order = np.lexsort((ids, -scores))[:size]
+        page = [(float(scores[i]), int(ids[i]), float(distances[i])) for i in order]
+        return page, total, has_more
+
+    def invalidate(self):
+        self.loaded_at = None
+
+
+business_index = BusinessIndex()
@@ -0,0 +1,184 @@
+"""
+Caché en memoria del catálogo (negocios y productos)
+Lectura a través de la caché con TTL, invalidación explícita, ETags precalculados y
+un tope de entradas (se descartan las vencidas y las menos usadas)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "300"))
+# Entradas máximas (negocios, detalle de cada negocio, productos por negocio y por categoría)
+CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CacheEntry:
+    """Respuesta cacheada junto con su vencimiento; el cuerpo JSON y el ETag se calculan al primer uso"""
+
+    __slots__ = ("payload", "expires_at", "_body", "_etag")
+
+    def __init__(self, payload: Any, expires_at: float):
+        self.payload = jsonable_encoder(payload)
+        self.expires_at = expires_at
+        self._body: Optional[bytes] = None
+        self._etag: Optional[str] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = json.dumps(self.payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+        return self._etag
+
+    def to_response(self, request: Optional[Request] = None) -> Response:
+        """Retorna 304 si el cliente ya tiene esta versión, o el cuerpo cacheado"""
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if request is not None and request.headers.get("if-none-match") == self.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+def etag_response(payload: Any, request: Optional[Request] = None) -> Response:
+    """Respuesta con ETag para un payload que no se guarda en la caché (ej. una página de una entrada)"""
+    return CacheEntry(payload, 0.0).to_response(request)
+
+
+class CatalogCache:
+    """
+    Caché de lectura del catálogo.
+
+    Cada clave se carga con un `loader` asíncrono la primera vez (o al vencer el TTL)
+    y se sirve desde memoria hasta entonces. Un loader puede devolver varias entradas
+    a la vez (ej. todas las categorías de productos) para precalcularlas juntas.
+    Las entradas se guardan en orden de uso: al pasar de `max_entries` se descartan
+    las usadas hace más tiempo, y las vencidas se barren una vez por TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = CATALOG_CACHE_TTL_SECONDS,
+                 max_entries: int = CATALOG_CACHE_MAX_ENTRIES):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self._next_sweep = time.monotonic() + ttl_seconds
+        # clave -> (lock, solicitudes que lo usan); se elimina cuando la última lo suelta
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            del self.entries[key]
+            self.evictions += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: Hashable, payload: Any) -> CacheEntry:
+        entry = CacheEntry(payload, time.monotonic() + self.ttl)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        # Las vencidas que nadie volvió a pedir se barren una vez por TTL
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.ttl
+            for key in [k for k, e in self.entries.items() if e.expires_at < now]:
+                del self.entries[key]
+                self.evictions += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable,
+                          loader: Callable[[], Awaitable[Dict[Hashable, Any]]]) -> Optional[CacheEntry]:
+        """
+        Obtiene una entrada, cargándola si no existe o venció
+
+        Args:
+            key: Clave buscada
+            loader: Corutina que retorna un dict {clave: payload}; puede incluir
+                otras claves además de `key` para precargarlas
+
+        Returns:
+            La entrada de `key`, o None si el loader no la produjo (ej. no existe)
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        # Un solo loader por clave aunque lleguen muchas solicitudes a la vez
+        lock, users = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                entry = self.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+                loaded = await loader()
+                for loaded_key, payload in loaded.items():
+                    if loaded_key != key:
+                        self.put(loaded_key, payload)
+                # La pedida va al final: es la más reciente y no la descarta el tope
+                return self.put(key, loaded[key]) if key in loaded else None
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] = lambda key: True):
+        """Elimina las entradas cuya clave cumple el predicado (todas por defecto)"""
+        for key in [k for k in self.entries if predicate(k)]:
+            del self.entries[key]
+            self.invalidations += 1
+
+    def invalidate_businesses(self):
+        """Llamar cuando cambia un negocio o su rating"""
+        self.invalidate(lambda key: key[0] in ("businesses", "business"))
+
+    def invalidate_products(self, business_id: Optional[int] = None):
+        """Llamar cuando cambian productos (de un negocio o de todos)"""
+        # El listado global ("products", categoría) mezcla todos los negocios: siempre se invalida
+        self.invalidate(lambda key: key[0] == "products"
+                        or (key[0] == "business_products" and business_id in (None, key[1])))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,435 @@
+"""
+Importación masiva del catálogo de productos
+Lee el archivo en streaming (JSON, NDJSON o CSV, opcionalmente .gz), valida cada
+fila y hace upsert por la clave natural (business_id, sku) en lotes grandes, un
+lote por transacción. Tras cada lote confirmado guarda un checkpoint junto al
+archivo, así una importación interrumpida continúa donde quedó.
+"""
+
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Business, Product
+from app.services.catalog_cache import catalog_cache
+
+CATALOG_IMPORT_BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH_SIZE", "5000"))
+# Cada cuántas filas leídas se imprime el progreso
+CATALOG_IMPORT_PROGRESS_EVERY = int(os.getenv("CATALOG_IMPORT_PROGRESS_EVERY", "50000"))
+
+FORMATS = ("json", "ndjson", "csv")
+READ_CHUNK_SIZE = 1 << 16
+
+# Columnas opcionales: si la fila no las trae, el upsert conserva el valor guardado
+OPTIONAL_COLUMNS = ("description", "category", "image")
+_TRUE = {"1", "true", "t", "yes", "y", "si", "sí", "s"}
+_FALSE = {"0", "false", "f", "no", "n"}
+
+
+def natural_sku(name: str) -> str:
+    """SKU derivado del nombre para las filas que no traen uno (espacios y mayúsculas normalizados)"""
+    return " ".join(name.split()).casefold()
+
+
+def detect_format(path: str) -> str:
+    """Formato según la extensión (ignorando .gz)"""
+    name = path[:-3] if path.endswith(".gz") else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if ext in (".json", ".csv"):
+        return ext[1:]
+    raise ValueError(f"No se reconoce el formato de {path}; usa --format {'/'.join(FORMATS)}")
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _iter_json_array(f: io.TextIOBase) -> Iterator[object]:
+    """Elementos de un arreglo JSON leyendo el archivo por bloques"""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_CHUNK_SIZE)
+        buf, pos = buf[pos:] + chunk, 0
+        eof = not chunk
+        return bool(chunk)
+
+    def next_char() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    if next_char() != "[":
+        raise ValueError("El archivo JSON debe ser un arreglo de productos")
+    pos += 1
+    if next_char() == "]":
+        return
+    while True:
+        next_char()
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if fill():
+                continue
+            raise
+        if end == len(buf) and not eof:
+            # Un número al final del bloque puede estar cortado: leer más y decodificar de nuevo
+            fill()
+            continue
+        pos = end
+        yield value
+        separator = next_char()
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"JSON inválido: se esperaba ',' o ']' y llegó {separator!r}")
+        pos += 1
+
+
+def _iter_ndjson(f: io.TextIOBase) -> Iterator[object]:
+    for line in f:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # La línea se reporta como rechazada, no corta la importación
+                yield ValueError(f"JSON inválido: {e.msg}")
+
+
+def _iter_csv(f: io.TextIOBase) -> Iterator[object]:
+    yield from csv.DictReader(f)
+
+
+def iter_records(path: str, fmt: Optional[str] = None) -> Iterator[object]:
+    """
+    Registros del archivo uno a uno, sin cargarlo completo en memoria
+
+    Un registro ilegible (ej. una línea NDJSON rota) llega como ValueError para que
+    quien consume lo cuente como rechazado.
+    """
+    fmt = fmt or detect_format(path)
+    readers = {"json": _iter_json_array, "ndjson": _iter_ndjson, "csv": _iter_csv}
+    if fmt not in readers:
+        raise ValueError(f"Formato desconocido: {fmt}")
+    with _open_text(path) as f:
+        yield from readers[fmt](f)
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _parse_bool(value, default: bool = True) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"available inválido: {value!r}")
+
+
+def validate_product(raw, business_ids: Set[int], default_business_id: Optional[int] = None,
+                     source: str = "Local") -> Dict:
+    """
+    Convierte un registro del archivo en una fila de products
+
+    Raises:
+        ValueError: si el registro no es válido (el mensaje va al archivo de rechazos)
+    """
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError("El registro no es un objeto")
+
+    business_id = raw.get("business_id")
+    if business_id in (None, ""):
+        business_id = default_business_id
+    if business_id is None:
+        raise ValueError("Falta business_id")
+    try:
+        business_id = int(business_id)
+    except (TypeError, ValueError):
+        raise ValueError(f"business_id inválido: {business_id!r}")
+    if business_id not in business_ids:
+        raise ValueError(f"El negocio {business_id} no existe")
+
+    name = _text(raw.get("name"))
+    if not name:
+        raise ValueError("Falta el nombre")
+
+    try:
+        price = float(raw.get("price"))
+    except (TypeError, ValueError):
+        raise ValueError(f"Precio inválido: {raw.get('price')!r}")
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f"Precio inválido: {raw.get('price')!r}")
+
+    row = {
+        "business_id": business_id,
+        "sku": _text(raw.get("sku")) or natural_sku(name),
+        "name": name,
+        "price": price,
+        "available": _parse_bool(raw.get("available")),
+        "source": _text(raw.get("source")) or source,
+    }
+    for column in OPTIONAL_COLUMNS:
+        row[column] = _text(raw.get(column))
+    return row
+
+
+def upsert_products(conn: Connection, rows: List[Dict]):
+    """
+    INSERT de cada fila o actualización del producto con el mismo (business_id, sku)
+
+    Con SQLite y PostgreSQL el lote va en un solo executemany de INSERT ... ON CONFLICT.
+    """
+    if not rows:
+        return
+    table = Product.__table__
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        assignments = {name: stmt.excluded[name] for name in ("name", "price", "available", "source")}
+        for name in OPTIONAL_COLUMNS:
+            assignments[name] = func.coalesce(stmt.excluded[name], table.c[name])
+        conn.execute(stmt.on_conflict_do_update(index_elements=["business_id", "sku"], set_=assignments), rows)
+        return
+    # Otros motores: UPDATE y, si no había fila, INSERT
+    for row in rows:
+        values = {name: value for name, value in row.items()
+                  if name not in ("business_id", "sku") and (value is not None or name not in OPTIONAL_COLUMNS)}
+        result = conn.execute(
+            update(table).where(table.c.business_id == row["business_id"], table.c.sku == row["sku"]).values(values)
+        )
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(**row))
+
+
+def adopt_legacy_products(db: Session) -> int:
+    """
+    Asigna SKU a los productos cargados antes de que existiera la columna
+
+    Usa el SKU derivado del nombre; si un negocio tiene nombres repetidos, solo el
+    producto más antiguo queda enlazado. No hace commit.
+
+    Returns:
+        Cantidad de productos con SKU asignado
+    """
+    legacy = db.execute(
+        select(Product.id, Product.business_id, Product.name)
+        .where(Product.sku.is_(None), Product.name.is_not(None))
+        .order_by(Product.id)
+    ).all()
+    if not legacy:
+        return 0
+    taken = set(db.execute(select(Product.business_id, Product.sku).where(Product.sku.is_not(None))).all())
+    assignments = []
+    for product_id, business_id, name in legacy:
+        key = (business_id, natural_sku(name))
+        if key[1] and key not in taken:
+            taken.add(key)
+            assignments.append({"product_id": product_id, "new_sku": key[1]})
+    if assignments:
+        table = Product.__table__
+        db.connection().execute(
+            update(table).where(table.c.id == bindparam("product_id")).values(sku=bindparam("new_sku")),
+            assignments,
+        )
+    return len(assignments)
+
+
+class ImportStats:
+    """Contadores de una importación (incluye lo hecho antes de reanudar)"""
+
+    def __init__(self, read: int = 0, upserted: int = 0, rejected: int = 0, batches: int = 0):
+        self.read = read
+        self.upserted = upserted
+        self.rejected = rejected
+        self.batches = batches
+        self.resumed_from = 0
+        self.elapsed = 0.0
+        self.rejects_path: Optional[str] = None
+
+    @property
+    def rate(self) -> float:
+        """Filas por segundo en esta ejecución"""
+        return (self.read - self.resumed_from) / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> Dict:
+        return {"read": self.read, "upserted": self.upserted, "rejected": self.rejected, "batches": self.batches}
+
+
+class ImportCheckpoint:
+    """
+    Estado de una importación guardado en `<archivo>.import-state.json`
+
+    Guarda cuántos registros quedaron confirmados, hasta dónde llegaba el archivo de
+    rechazados en ese momento y la huella del archivo (tamaño y fecha de
+    modificación); si el archivo cambió, el checkpoint se descarta.
+    """
+
+    def __init__(self, source_path: str):
+        self.source_path = source_path
+        self.path = source_path + ".import-state.json"
+        stat = os.stat(source_path)
+        self.fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self) -> Optional[Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if state.get("file") != self.fingerprint:
+            print(f"⚠️ {self.source_path} cambió desde la última importación; se empieza de cero")
+            return None
+        return state
+
+    def save(self, records: int, stats: ImportStats, rejects_offset: int):
+        state = {
+            "file": self.fingerprint,
+            "records": records,
+            "rejects_offset": rejects_offset,
+            "stats": stats.as_dict(),
+            "updated_at": datetime.now().isoformat(),
+        }
+        # Escritura atómica: un corte a mitad no deja un checkpoint corrupto
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        for path in (self.path, self.path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _print_progress(stats: ImportStats):
+    print(f"   … {stats.read:,} leídas, {stats.upserted:,} guardadas, {stats.rejected:,} rechazadas "
+          f"({stats.rate:,.0f} filas/s)")
+
+
+def import_catalog(db: Session, path: str, fmt: Optional[str] = None, source: str = "Local",
+                   business_id: Optional[int] = None, batch_size: int = CATALOG_IMPORT_BATCH_SIZE,
+                   resume: bool = True, rejects_path: Optional[str] = None,
+                   progress: Optional[Callable[[ImportStats], None]] = _print_progress) -> ImportStats:
+    """
+    Importa (o actualiza) los productos de un archivo
+
+    Cada lote de `batch_size` filas válidas se confirma en su propia transacción.
+    Los registros inválidos se escriben en `rejects_path` (por defecto
+    `<archivo>.rejects.ndjson`) con su número y el motivo. Con `resume`, si hay un
+    checkpoint de una ejecución anterior se saltan los registros ya confirmados; el
+    upsert es idempotente, así que repetir el último lote no duplica productos, y el
+    archivo de rechazados se recorta al tamaño que tenía en el checkpoint.
+
+    Al terminar invalida la caché del catálogo de este proceso; un servidor que corre
+    en otro proceso la refresca al vencer CATALOG_CACHE_TTL_SECONDS.
+
+    Args:
+        db: Sesión sync; se hace commit por lote
+        path: Archivo .json (arreglo), .ndjson/.jsonl o .csv, opcionalmente .gz
+        fmt: Formato, si la extensión no lo indica
+        source: Origen de las filas que no traen uno ('Local', 'Jumbo', ...)
+        business_id: Negocio de las filas que no traen business_id
+
+    Returns:
+        Contadores de la importación
+    """
+    fmt = fmt or detect_format(path)
+    checkpoint = ImportCheckpoint(path)
+    rejects_path = rejects_path or path + ".rejects.ndjson"
+
+    state = checkpoint.load() if resume else None
+    skip = state["records"] if state else 0
+    stats = ImportStats(**state["stats"]) if state else ImportStats()
+    stats.resumed_from = stats.read
+    stats.rejects_path = rejects_path
+    if skip:
+        print(f"↩️  Reanudando {path} desde el registro {skip + 1:,}")
+
+    business_ids = set(db.scalars(select(Business.id)))
+    adopted = adopt_legacy_products(db)
+    if adopted:
+        db.commit()
+        print(f"🔗 {adopted} productos existentes enlazados por SKU")
+
+    started = time.perf_counter()
+    batch: List[Dict] = []
+    records = 0
+
+    def commit_batch():
+        upsert_products(db.connection(), batch)
+        db.commit()
+        stats.upserted += len(batch)
+        stats.batches += 1
+        batch.clear()
+        checkpoint.save(records, stats, rejects.tell())
+
+    with open(rejects_path, "a" if skip else "w", encoding="utf-8") as rejects:
+        # Los rechazados escritos después del último checkpoint se vuelven a escribir al reanudar
+        rejects_offset = state.get("rejects_offset") if state else None
+        if skip and rejects_offset is not None and rejects.tell() > rejects_offset:
+            rejects.truncate(rejects_offset)
+            rejects.seek(rejects_offset)
+        for raw in iter_records(path, fmt):
+            records += 1
+            if records <= skip:
+                continue
+            stats.read += 1
+            try:
+                batch.append(validate_product(raw, business_ids, business_id, source))
+            except ValueError as e:
+                stats.rejected += 1
+                rejects.write(json.dumps({"record": records, "error": str(e),
+                                          "data": raw if isinstance(raw, dict) else None},
+                                         ensure_ascii=False, default=str) + "\n")
+            if len(batch) >= batch_size:
+                rejects.flush()
+                commit_batch()
+            if progress and stats.read % CATALOG_IMPORT_PROGRESS_EVERY == 0:
+                stats.elapsed = time.perf_counter() - started
+                progress(stats)
+        if batch:
+            rejects.flush()
+            commit_batch()
+
+    stats.elapsed = time.perf_counter() - started
+    checkpoint.clear()
+    if not stats.rejected and os.path.exists(rejects_path):
+        os.remove(rejects_path)
+    catalog_cache.invalidate_products()
+    return stats
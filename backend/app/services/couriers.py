@@ -0,0 +1,225 @@
+"""
+Servicio de repartidores
+Asignación atómica de pedidos sobre las tablas Courier/Order e índice espacial en memoria
+"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models import Courier, Order
+from app.services.spatial import GeoGrid
+from app.services.order_events import append_event
+from app.services.stats import record_status_change
+
+# Estados desde los que un pedido puede recibir repartidor
+ASSIGNABLE_STATUSES = ("pendiente", "preparando")
+
+# Cada cuánto reconstruir el índice desde la DB (cambios hechos por otros procesos)
+INDEX_REFRESH_SECONDS = 30
+
+
+class CourierIndex:
+    """
+    Índice espacial de repartidores respaldado por la tabla `couriers`.
+
+    Se carga perezosamente desde la DB y se actualiza en cada claim/release/ubicación
+    hecho en este proceso; cada INDEX_REFRESH_SECONDS se reconstruye para incorporar
+    cambios de otros workers.
+    """
+
+    def __init__(self):
+        self.grid = GeoGrid()
+        self.loaded_at: Optional[float] = None
+
+    def get(self, db: Session) -> GeoGrid:
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > INDEX_REFRESH_SECONDS:
+            self.reload(db)
+        return self.grid
+
+    def reload(self, db: Session):
+        self.grid.clear()
+        rows = db.query(Courier.id, Courier.lat, Courier.lng, Courier.available).all()
+        for courier_id, lat, lng, available in rows:
+            if lat is not None and lng is not None:
+                self.grid.upsert(courier_id, lat, lng, bool(available))
+        self.loaded_at = time.monotonic()
+
+    def update(self, courier_id: int, lat: Optional[float] = None, lng: Optional[float] = None,
+               available: Optional[bool] = None):
+        """Refleja en el índice un cambio ya confirmado en la DB"""
+        if self.loaded_at is None:
+            return
+        if lat is not None and lng is not None:
+            current = self.grid.available.get(courier_id, True)
+            self.grid.upsert(courier_id, lat, lng, current if available is None else available)
+        elif available is not None:
+            self.grid.set_available(courier_id, available)
+
+
+courier_index = CourierIndex()
+
+
+def claim_courier(db: Session, courier_id: int, order_id: int) -> bool:
+    """
+    Marca un repartidor como ocupado solo si sigue disponible
+
+    Es un único UPDATE condicionado sobre la fila, por lo que dos llamadas
+    concurrentes nunca pueden reclamar al mismo repartidor. No hace commit.
+
+    Returns:
+        True si esta llamada obtuvo al repartidor
+    """
+    result = db.execute(
+        update(Courier)
+        .where(Courier.id == courier_id, Courier.available == True)
+        .values(available=False, current_order_id=order_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def claim_order(db: Session, order_id: int, courier: Courier,
+                statuses: Tuple[str, ...] = ASSIGNABLE_STATUSES) -> bool:
+    """
+    Asigna un repartidor a un pedido que aún no tiene uno y lo pasa a "en_camino".
+    No hace commit.
+
+    Returns:
+        True si el pedido estaba libre y quedó asignado
+    """
+    current = db.execute(
+        select(Order.status, Order.business_id, Order.total).where(Order.id == order_id)
+    ).first()
+    if current is None or current.status not in statuses:
+        return False
+    # El UPDATE exige el mismo estado leído: si otro proceso lo cambió, no se asigna
+    result = db.execute(
+        update(Order)
+        .where(
+            Order.id == order_id,
+            Order.delivery_person_id.is_(None),
+            Order.status == current.status,
+        )
+        .values(
+            delivery_person_id=courier.id,
+            delivery_person_name=courier.name,
+            courier_phone=courier.phone,
+            status="en_camino",
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    record_status_change(db.connection(), current.business_id, current.total, current.status, "en_camino")
+    # Un pedido que ya estaba en camino (ej. lo marcó el vendedor) solo recibe repartidor
+    if current.status != "en_camino":
+        append_event(db.connection(), order_id, "en_camino", f"repartidor:{courier.id}")
+    return True
+
+
+def assign_courier(db: Session, courier_id: int, order_id: int,
+                   statuses: Tuple[str, ...] = ASSIGNABLE_STATUSES) -> Tuple[bool, str]:
+    """
+    Asigna atómicamente un pedido a un repartidor en una sola transacción
+
+    Args:
+        statuses: Estados del pedido que admiten la asignación
+
+    Returns:
+        Tupla (éxito, motivo). Motivo es "ok", "courier" si el repartidor ya
+        estaba ocupado u "order" si el pedido ya no admite asignación.
+    """
+    try:
+        if not claim_courier(db, courier_id, order_id):
+            db.rollback()
+            return False, "courier"
+        courier = db.get(Courier, courier_id)
+        if not claim_order(db, order_id, courier, statuses):
+            db.rollback()
+            return False, "order"
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    courier_index.update(courier_id, available=False)
+    return True, "ok"
+
+
+def release_courier(db: Session, courier_id: int, order_id: int) -> bool:
+    """
+    Marca el pedido como entregado y libera al repartidor en una sola transacción
+
+    Returns:
+        True si el pedido estaba asignado a este repartidor y no estaba entregado
+    """
+    try:
+        current = db.execute(
+            select(Order.status, Order.business_id, Order.total)
+            .where(Order.id == order_id, Order.delivery_person_id == courier_id)
+        ).first()
+        if current is None or current.status == "entregado":
+            db.rollback()
+            return False
+        result = db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.delivery_person_id == courier_id, Order.status == current.status)
+            .values(status="entregado")
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            return False
+        record_status_change(db.connection(), current.business_id, current.total, current.status, "entregado")
+        append_event(db.connection(), order_id, "entregado", f"repartidor:{courier_id}")
+        db.execute(
+            update(Courier)
+            .where(Courier.id == courier_id)
+            .values(available=True, current_order_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    courier_index.update(courier_id, available=True)
+    return True
+
+
+def free_courier(db: Session, courier_id: int, order_id: int):
+    """
+    Libera al repartidor de un pedido que terminó (entregado o cancelado). No hace commit.
+    """
+    result = db.execute(
+        update(Courier)
+        .where(Courier.id == courier_id, Courier.current_order_id == order_id)
+        .values(available=True, current_order_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        courier_index.update(courier_id, available=True)
+
+
+def find_nearby(db: Session, lat: float, lng: float, max_distance: float,
+                limit: Optional[int] = None) -> List[Tuple[Courier, float]]:
+    """
+    Busca repartidores disponibles cercanos usando el índice espacial
+
+    Returns:
+        Lista de tuplas (Courier, distancia_km) ordenada por distancia
+    """
+    grid = courier_index.get(db)
+    if limit is not None:
+        matches = grid.nearest(lat, lng, k=limit, max_distance_km=max_distance)
+    else:
+        matches = grid.within_radius(lat, lng, max_distance)
+    if not matches:
+        return []
+
+    ids = [courier_id for courier_id, _ in matches]
+    couriers: Dict[int, Courier] = {
+        c.id: c for c in db.query(Courier).filter(Courier.id.in_(ids), Courier.available == True)
+    }
+    return [(couriers[cid], distance) for cid, distance in matches if cid in couriers]
@@ -0,0 +1,255 @@
+"""
+Servicio de despacho de pedidos
+Agrupa los pedidos listos para recoger en ventanas cortas y asigna repartidores
+en lote minimizando la distancia total de recogida (algoritmo húngaro)
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.database import SessionLocal
+from app.services.couriers import courier_index, assign_courier
+from app.utils import distance_matrix
+
+# "batch" resuelve la asignación óptima por ventana; "greedy" asigna al más cercano de inmediato
+DISPATCH_MODE = os.getenv("DISPATCH_MODE", "batch")
+DISPATCH_WINDOW_SECONDS = float(os.getenv("DISPATCH_WINDOW_SECONDS", "2"))
+# Distancia máxima de recogida para considerar a un repartidor
+DISPATCH_MAX_PICKUP_KM = float(os.getenv("DISPATCH_MAX_PICKUP_KM", "15"))
+# Ventanas que un pedido espera repartidor antes de darse por no asignado
+DISPATCH_MAX_ATTEMPTS = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "3"))
+
+# Un pedido puede recibir repartidor mientras no se haya entregado o cancelado
+DISPATCHABLE_STATUSES = ("pendiente", "preparando", "en_camino")
+
+# Costo usado para pares no permitidos (fuera del radio de recogida)
+UNREACHABLE = 1e9
+
+
+def assign_min_cost(cost: np.ndarray, max_cost: float = UNREACHABLE) -> List[Tuple[int, int]]:
+    """
+    Asignación de costo mínimo (algoritmo húngaro, O(n²·m)) sobre una matriz rectangular
+
+    Args:
+        cost: Matriz (filas, columnas) de costos
+        max_cost: Los pares con costo >= max_cost no se asignan
+
+    Returns:
+        Lista de pares (fila, columna) asignados
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # Potenciales y emparejamiento con índices base 1 (columna 0 es ficticia)
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = []
+    for j in range(1, m + 1):
+        if p[j]:
+            row, col = p[j] - 1, j - 1
+            if cost[row, col] < max_cost:
+                pairs.append((col, row) if transposed else (row, col))
+    pairs.sort()
+    return pairs
+
+
+def assign_greedy(cost: np.ndarray, max_cost: float = UNREACHABLE) -> List[Tuple[int, int]]:
+    """
+    Asignación voraz: toma repetidamente el par más barato disponible
+
+    Returns:
+        Lista de pares (fila, columna) asignados
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return []
+    rows_used, cols_used = set(), set()
+    pairs = []
+    limit = min(cost.shape)
+    for flat in np.argsort(cost, axis=None, kind="stable"):
+        row, col = divmod(int(flat), cost.shape[1])
+        if cost[row, col] >= max_cost:
+            break
+        if row in rows_used or col in cols_used:
+            continue
+        rows_used.add(row)
+        cols_used.add(col)
+        pairs.append((row, col))
+        if len(pairs) == limit:
+            break
+    pairs.sort()
+    return pairs
+
+
+def plan_assignments(pickups: Sequence[Tuple[float, float]], couriers: Sequence[Tuple[float, float]],
+                     mode: str = "batch", max_pickup_km: float = DISPATCH_MAX_PICKUP_KM) -> List[Tuple[int, int]]:
+    """
+    Calcula qué repartidor recoge cada pedido
+
+    Args:
+        pickups: Posiciones (lat, lng) de recogida de los pedidos
+        couriers: Posiciones (lat, lng) de los repartidores candidatos
+        mode: "batch" (óptimo) o "greedy"
+        max_pickup_km: Distancia máxima permitida hasta el punto de recogida
+
+    Returns:
+        Lista de pares (índice_pedido, índice_repartidor)
+    """
+    if not pickups or not couriers:
+        return []
+    cost = distance_matrix(pickups, couriers)
+    cost[cost > max_pickup_km] = UNREACHABLE
+    if mode == "greedy":
+        return assign_greedy(cost)
+    return assign_min_cost(cost)
+
+
+class DispatchService:
+    """
+    Acumula solicitudes de repartidor y las resuelve en lote al cerrar cada ventana.
+
+    En modo "greedy" cada solicitud se resuelve de inmediato, sin esperar la ventana.
+    """
+
+    def __init__(self, mode: str = DISPATCH_MODE, window_seconds: float = DISPATCH_WINDOW_SECONDS,
+                 max_pickup_km: float = DISPATCH_MAX_PICKUP_KM, session_factory=SessionLocal):
+        self.mode = mode
+        self.window_seconds = window_seconds
+        self.max_pickup_km = max_pickup_km
+        self.session_factory = session_factory
+        # order_id -> (lat, lng, future, intentos)
+        self.pending: Dict[int, Tuple[float, float, asyncio.Future, int]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def request_courier(self, order_id: int, pickup_lat: float, pickup_lng: float) -> Optional[int]:
+        """
+        Solicita un repartidor para un pedido listo para recoger
+
+        Returns:
+            ID del repartidor asignado, o None si no hubo repartidor disponible
+        """
+        if order_id in self.pending:
+            return await self.pending[order_id][2]
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[order_id] = (pickup_lat, pickup_lng, future, 0)
+        if self.mode == "greedy" or self.window_seconds <= 0:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window_seconds, self.flush)
+        return await future
+
+    def flush(self):
+        """Resuelve todas las solicitudes pendientes en un solo lote"""
+        self._flush_handle = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            asyncio.get_running_loop().create_task(self._resolve(batch))
+
+    def _dispatch_in_session(self, pickups: Dict[int, Tuple[float, float]]) -> Dict[int, int]:
+        db = self.session_factory()
+        try:
+            return self.dispatch_batch(db, pickups)
+        finally:
+            db.close()
+
+    async def _resolve(self, batch: Dict[int, Tuple[float, float, asyncio.Future, int]]):
+        # Los claims son escrituras síncronas: en un hilo, para no frenar el event loop
+        # (ni a las solicitudes que tienen una transacción abierta) si la DB está ocupada
+        try:
+            assigned = await asyncio.to_thread(
+                self._dispatch_in_session, {oid: (lat, lng) for oid, (lat, lng, _, _) in batch.items()}
+            )
+        except Exception as e:
+            print(f"❌ Error en despacho: {e}")
+            assigned = {}
+
+        for order_id, (lat, lng, future, attempts) in batch.items():
+            if future.done():
+                continue
+            if order_id in assigned:
+                future.set_result(assigned[order_id])
+            elif attempts + 1 < DISPATCH_MAX_ATTEMPTS and self.window_seconds > 0:
+                # Reintentar en la siguiente ventana
+                self.pending[order_id] = (lat, lng, future, attempts + 1)
+            else:
+                future.set_result(None)
+
+        if self.pending and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window_seconds, self.flush)
+
+    def dispatch_batch(self, db, pickups: Dict[int, Tuple[float, float]]) -> Dict[int, int]:
+        """
+        Asigna repartidores a un lote de pedidos y reclama cada par en la DB
+
+        Returns:
+            Diccionario order_id -> courier_id con las asignaciones confirmadas
+        """
+        grid = courier_index.get(db)
+        # Candidatos: los repartidores más cercanos a cada punto de recogida
+        k = len(pickups) + 4
+        candidate_ids = set()
+        for lat, lng in pickups.values():
+            for courier_id, _ in grid.nearest(lat, lng, k=k, max_distance_km=self.max_pickup_km):
+                candidate_ids.add(courier_id)
+        if not candidate_ids:
+            return {}
+
+        order_ids = list(pickups)
+        courier_ids = sorted(candidate_ids)
+        pairs = plan_assignments(
+            [pickups[oid] for oid in order_ids],
+            [grid.positions[cid] for cid in courier_ids],
+            mode=self.mode,
+            max_pickup_km=self.max_pickup_km,
+        )
+
+        assigned = {}
+        for row, col in pairs:
+            order_id, courier_id = order_ids[row], courier_ids[col]
+            # El claim puede fallar si otro proceso tomó al repartidor; se reintenta luego
+            ok, _ = assign_courier(db, courier_id, order_id, statuses=DISPATCHABLE_STATUSES)
+            if ok:
+                assigned[order_id] = courier_id
+        return assigned
+
+
+dispatch_service = DispatchService()
@@ -1,100 +1,93 @@
 import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import os
+from typing import List, Tuple
+
+from app.services.email_queue import EmailQueue, OutgoingEmail, SMTPConnection
+from app.services.email_templates import email_templates, status_label
 
 # Configuración SMTP (Gmail)
 # NOTA: Para que esto funcione con Gmail, debes usar una "Contraseña de Aplicación"
-# Si no tienes una configurada, el envío fallará y hará fallback a simulación.
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
-SMTP_USER = "davidsantiagorodriguezruiz9@gmail.com"  # Tu correo
-SMTP_PASSWORD = "tu_contraseña_de_aplicacion_aqui"  # REEMPLAZAR CON APP PASSWORD REAL
+# Si no tienes una configurada, los correos se simulan imprimiéndolos en consola.
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER", "davidsantiagorodriguezruiz9@gmail.com")  # Tu correo
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "tu_contraseña_de_aplicacion_aqui")  # REEMPLAZAR CON APP PASSWORD REAL
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+
+# "smtp" envía de verdad; "simulated" solo imprime. Por defecto depende de si hay contraseña real
+EMAIL_DELIVERY = os.getenv(
+    "EMAIL_DELIVERY",
+    "simulated" if SMTP_PASSWORD == "tu_contraseña_de_aplicacion_aqui" else "smtp"
+)
+# Forzar envío a tu correo para pruebas, ignorando el del cliente (vacío = enviar al cliente)
+EMAIL_TEST_RECIPIENT = os.getenv("EMAIL_TEST_RECIPIENT", "davidsantiagorodriguezruiz9@gmail.com")
+
+# Cola de salida
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))          # Conexiones SMTP persistentes
+EMAIL_QUEUE_MAX_SIZE = int(os.getenv("EMAIL_QUEUE_MAX_SIZE", "1000"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "2"))
+EMAIL_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv("EMAIL_ENQUEUE_TIMEOUT_SECONDS", "5"))
+
+
+def smtp_connection() -> SMTPConnection:
+    """Crea una conexión SMTP con la configuración del proyecto"""
+    password = None if SMTP_PASSWORD == "tu_contraseña_de_aplicacion_aqui" else SMTP_PASSWORD
+    return SMTPConnection(SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_USER, password, SMTP_STARTTLS)
+
+
+email_queue = EmailQueue(
+    connection_factory=smtp_connection if EMAIL_DELIVERY == "smtp" else None,
+    pool_size=EMAIL_POOL_SIZE,
+    max_size=EMAIL_QUEUE_MAX_SIZE,
+    batch_size=EMAIL_BATCH_SIZE,
+    max_retries=EMAIL_MAX_RETRIES,
+    retry_base_seconds=EMAIL_RETRY_BASE_SECONDS,
+    enqueue_timeout=EMAIL_ENQUEUE_TIMEOUT_SECONDS,
+    recipient_override=EMAIL_TEST_RECIPIENT or None,
+)
+
 
 class EmailService:
-    @staticmethod
-    def _send_real_email(to_email: str, subject: str, body: str):
-        # Forzar envío a tu correo para pruebas, ignorando el del cliente
-        target_email = "davidsantiagorodriguezruiz9@gmail.com"
-        
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = SMTP_USER
-            msg['To'] = target_email
-            msg['Subject'] = subject
-
-            msg.attach(MIMEText(body, 'html'))
-
-            # Intentar conexión (solo si hay password configurado, sino simular)
-            if SMTP_PASSWORD == "tu_contraseña_de_aplicacion_aqui":
-                print("⚠️ No se ha configurado la contraseña de aplicación. Simulando envío...")
-                return False
-
-            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            text = msg.as_string()
-            server.sendmail(SMTP_USER, target_email, text)
-            server.quit()
-            print(f"✅ Email enviado exitosamente a {target_email}")
-            return True
-        except Exception as e:
-            print(f"❌ Error enviando email real: {e}")
-            return False
+    """
+    Notificaciones por correo. Los métodos solo encolan el mensaje: el envío SMTP
+    ocurre en segundo plano en `email_queue`, sin bloquear la solicitud.
+    """
 
     @staticmethod
-    def send_order_confirmation(to_email: str, order_id: int, total: float):
+    async def send_order_confirmation(to_email: str, order_id: int, total: float, locale: str = None):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        subject = f"Confirmación de Pedido #{order_id}"
-        body = f"""
-        <html>
-          <body>
-            <h2>¡Pedido Confirmado!</h2>
-            <p>Hola,</p>
-            <p>Tu pedido <strong>#{order_id}</strong> ha sido recibido exitosamente.</p>
-            <p><strong>Total a pagar:</strong> ${total:,.0f}</p>
-            <p>Fecha: {timestamp}</p>
-            <br>
-            <p>Gracias por preferirnos.</p>
-          </body>
-        </html>
-        """
-        
-        # Intentar envío real
-        if EmailService._send_real_email(to_email, subject, body):
-            return True
-            
-        # Fallback a simulación
-        print("\n" + "="*50)
-        print(f"📧 [EMAIL SIMULADO -> {to_email}]")
-        print(f"📌 Asunto: {subject}")
-        print("-" * 50)
-        print(f"Total: ${total:,.0f}")
-        print("="*50 + "\n")
-        return True
+
+        subject = email_templates.subject("order_confirmation", locale, order_id=order_id)
+        body = email_templates.render(
+            "order_confirmation", locale, order_id=order_id, total=f"{total:,.0f}", timestamp=timestamp
+        )
+
+        return await email_queue.submit(OutgoingEmail(to_email, subject, body, f"Total: ${total:,.0f}"))
 
     @staticmethod
-    def send_status_update(to_email: str, order_id: int, new_status: str):
-        subject = f"Actualización de Pedido #{order_id}"
-        body = f"""
-        <html>
-          <body>
-            <h2>Tu pedido está en movimiento</h2>
-            <p>El estado de tu pedido #{order_id} ha cambiado a:</p>
-            <h3 style="color: #D4AF37;">{new_status.upper().replace('_', ' ')}</h3>
-            <p>Puedes seguirlo en tiempo real en la aplicación.</p>
-          </body>
-        </html>
+    async def send_status_update(to_email: str, order_id: int, new_status: str, locale: str = None):
+        return (await EmailService.send_status_updates([(to_email, order_id, new_status)], locale))[0]
+
+    @staticmethod
+    async def send_status_updates(updates: List[Tuple[str, int, str]], locale: str = None) -> List[bool]:
         """
+        Envía muchas actualizaciones de estado renderizándolas en un solo lote
 
-        if EmailService._send_real_email(to_email, subject, body):
-            return True
+        Args:
+            updates: Lista de tuplas (email, order_id, nuevo_estado)
+        """
+        locale = locale or email_templates.default_locale
+        bodies = email_templates.render_batch("status_update", [
+            {"order_id": order_id, "status_label": status_label(new_status, locale)}
+            for _, order_id, new_status in updates
+        ], locale)
 
-        print("\n" + "="*50)
-        print(f"📧 [EMAIL SIMULADO -> {to_email}]")
-        print(f"📌 Asunto: {subject}")
-        print(f"Estado: {new_status}")
-        print("="*50 + "\n")
-        return True
+        results = []
+        for (to_email, order_id, new_status), body in zip(updates, bodies):
+            subject = email_templates.subject("status_update", locale, order_id=order_id)
+            results.append(await email_queue.submit(
+                OutgoingEmail(to_email, subject, body, f"Estado: {new_status}")
+            ))
+        return results
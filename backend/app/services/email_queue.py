@@ -0,0 +1,256 @@
+"""
+Cola de salida de correos
+Envía los emails en segundo plano sobre conexiones SMTP persistentes, agrupando
+ráfagas en lotes y reintentando con backoff exponencial
+"""
+
+import asyncio
+import smtplib
+import time
+from email.mime.text import MIMEText
+from typing import Callable, Dict, List, Optional
+
+
+class OutgoingEmail:
+    """Mensaje pendiente de envío"""
+
+    __slots__ = ("to_email", "subject", "html", "summary", "attempts")
+
+    def __init__(self, to_email: str, subject: str, html: str, summary: str = ""):
+        self.to_email = to_email
+        self.subject = subject
+        self.html = html
+        # Línea corta que se muestra cuando el envío es simulado
+        self.summary = summary
+        self.attempts = 0
+
+
+class SMTPConnection:
+    """
+    Conexión SMTP reutilizable entre envíos.
+
+    Se conecta (STARTTLS + login) la primera vez y se mantiene abierta; si el servidor
+    la cerró, se reconecta una vez antes de dar el mensaje por fallido. No es segura
+    entre hilos: cada worker de la cola usa la suya.
+    """
+
+    def __init__(self, host: str, port: int, sender: str, user: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = True, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.server: Optional[smtplib.SMTP] = None
+
+    def connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self.server = server
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+    def _send(self, message: OutgoingEmail, recipient: str):
+        # Un solo cuerpo HTML: MIMEText directo, sin el contenedor multipart
+        msg = MIMEText(message.html, 'html')
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg['Subject'] = message.subject
+        self.server.sendmail(self.sender, recipient, msg.as_string())
+
+    def send_batch(self, messages: List[OutgoingEmail],
+                   recipient_override: Optional[str] = None) -> List[OutgoingEmail]:
+        """
+        Envía un lote de mensajes por la misma conexión (bloqueante, correr en un hilo)
+
+        Returns:
+            Mensajes que no se pudieron enviar
+        """
+        failed = []
+        for message in messages:
+            recipient = recipient_override or message.to_email
+            try:
+                if self.server is None:
+                    self.connect()
+                try:
+                    self._send(message, recipient)
+                except smtplib.SMTPServerDisconnected:
+                    # La conexión reutilizada expiró: reconectar y reintentar una vez
+                    self.close()
+                    self.connect()
+                    self._send(message, recipient)
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"❌ Error enviando email a {recipient}: {e}")
+                self.close()
+                failed.append(message)
+        return failed
+
+
+class EmailQueue:
+    """
+    Cola acotada de correos atendida por un pool de workers.
+
+    Cada worker mantiene una conexión SMTP abierta y envía en un hilo aparte los
+    mensajes que se acumularon mientras estaba ocupado (hasta `batch_size`), así
+    el event loop nunca espera el handshake SMTP. Cuando la cola está llena,
+    `submit` espera hasta `enqueue_timeout` (backpressure) antes de rechazar.
+    """
+
+    def __init__(self, connection_factory: Optional[Callable[[], SMTPConnection]] = None,
+                 pool_size: int = 2, max_size: int = 1000, batch_size: int = 20,
+                 max_retries: int = 3, retry_base_seconds: float = 2.0,
+                 enqueue_timeout: float = 5.0, recipient_override: Optional[str] = None):
+        # Sin connection_factory los correos se simulan imprimiéndolos en consola
+        self.connection_factory = connection_factory
+        self.pool_size = pool_size
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.enqueue_timeout = enqueue_timeout
+        self.recipient_override = recipient_override
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.batches = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._connections: List[Optional[SMTPConnection]] = []
+        self._retrying = 0
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        # Los workers pertenecen a un event loop; si cambia (ej. tests), se recrean
+        for connection in self._connections:
+            if connection is not None:
+                connection.close()
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._connections = [self.connection_factory() for _ in range(self.pool_size)] \
+            if self.connection_factory else [None] * self.pool_size
+        self._workers = [loop.create_task(self._worker(c)) for c in self._connections]
+        self._retrying = 0
+
+    async def submit(self, message: OutgoingEmail) -> bool:
+        """
+        Encola un correo para envío en segundo plano
+
+        Returns:
+            True si quedó en cola, False si la cola siguió llena durante enqueue_timeout
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        try:
+            await asyncio.wait_for(self._queue.put(message), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            print(f"⚠️ Cola de correos llena, se descarta: {message.subject}")
+            return False
+        return True
+
+    async def _worker(self, connection: Optional[SMTPConnection]):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self.batches += 1
+            try:
+                if connection is None:
+                    for message in batch:
+                        self._print_simulated(message)
+                    failed = []
+                else:
+                    failed = await asyncio.to_thread(connection.send_batch, batch, self.recipient_override)
+            except Exception as e:
+                print(f"❌ Error en la cola de correos: {e}")
+                failed = batch
+            self.sent += len(batch) - len(failed)
+            for message in failed:
+                self._schedule_retry(message)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _schedule_retry(self, message: OutgoingEmail):
+        message.attempts += 1
+        if message.attempts > self.max_retries:
+            self.failed += 1
+            print(f"❌ Email descartado tras {self.max_retries} reintentos: {message.subject}")
+            self._print_simulated(message)
+            return
+        self.retried += 1
+        self._retrying += 1
+        delay = self.retry_base_seconds * 2 ** (message.attempts - 1)
+        self._loop.call_later(delay, self._requeue, message)
+
+    def _requeue(self, message: OutgoingEmail):
+        self._retrying -= 1
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.failed += 1
+            print(f"⚠️ Cola de correos llena, se descarta el reintento: {message.subject}")
+
+    @staticmethod
+    def _print_simulated(message: OutgoingEmail):
+        print("\n" + "="*50)
+        print(f"📧 [EMAIL SIMULADO -> {message.to_email}]")
+        print(f"📌 Asunto: {message.subject}")
+        if message.summary:
+            print(message.summary)
+        print("="*50 + "\n")
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Espera a que la cola (incluidos los reintentos programados) quede vacía"""
+        if self._queue is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            await asyncio.wait_for(self._queue.join(), remaining)
+            if not self._retrying:
+                return
+            await asyncio.sleep(0.05)
+
+    async def close(self, timeout: float = 10.0):
+        """Envía lo pendiente, detiene los workers y cierra las conexiones SMTP"""
+        if self._queue is None:
+            return
+        try:
+            await self.drain(timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Quedaron {self._queue.qsize()} correos sin enviar al cerrar")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        for connection in self._connections:
+            if connection is not None:
+                await asyncio.to_thread(connection.close)
+        self._loop = None
+        self._queue = None
+        self._workers = []
+        self._connections = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "batches": self.batches,
+        }
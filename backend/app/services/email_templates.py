@@ -0,0 +1,165 @@
+"""
+Plantillas de correo (Jinja2)
+Compila todas las plantillas una sola vez y cachea el HTML renderizado: los campos
+que cambian en cada mensaje (ej. order_id) se sustituyen sobre un esqueleto ya
+renderizado, así dos actualizaciones al mismo estado solo se renderizan una vez.
+Por eso en las plantillas los campos dinámicos solo pueden usarse como `{{ campo }}`
+(sin filtros, condiciones ni asignaciones); se verifica al cargarlas.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from jinja2 import Environment, FileSystemLoader, TemplateAssertionError, nodes, select_autoescape
+from markupsafe import escape
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates", "emails")
+
+DEFAULT_EMAIL_LOCALE = os.getenv("DEFAULT_EMAIL_LOCALE", "es")
+EMAIL_RENDER_CACHE_SIZE = int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "512"))
+
+# Campos distintos en cada mensaje: no forman parte de la clave de la caché y se
+# sustituyen ya escapados sobre el esqueleto, así que la plantilla solo puede mostrarlos
+DYNAMIC_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "order_confirmation": ("order_id", "total", "timestamp"),
+    "status_update": ("order_id",),
+}
+
+SUBJECTS = {
+    "es": {
+        "order_confirmation": "Confirmación de Pedido #{order_id}",
+        "status_update": "Actualización de Pedido #{order_id}",
+    },
+    "en": {
+        "order_confirmation": "Order Confirmation #{order_id}",
+        "status_update": "Order Update #{order_id}",
+    },
+}
+
+STATUS_LABELS = {
+    "en": {
+        "pendiente": "PENDING",
+        "preparando": "PREPARING",
+        "en_camino": "ON THE WAY",
+        "entregado": "DELIVERED",
+        "cancelado": "CANCELLED",
+    },
+}
+
+
+def status_label(status: str, locale: str) -> str:
+    """Nombre del estado para mostrar en el correo (en español: EN CAMINO, ENTREGADO...)"""
+    return STATUS_LABELS.get(locale, {}).get(status, status.upper().replace('_', ' '))
+
+
+def _marker(field: str) -> str:
+    # Caracteres de control: no aparecen en las plantillas ni los altera el autoescape
+    return f"\x00{field}\x00"
+
+
+class EmailTemplates:
+    """
+    Plantillas de correo precompiladas con caché de renderizado (LRU).
+
+    Las plantillas viven en `templates/emails/<locale>/<nombre>.html`; si un idioma no
+    tiene una plantilla se usa la del idioma por defecto. Una plantilla que use un
+    campo dinámico de otra forma que `{{ campo }}` falla al cargar con
+    TemplateAssertionError.
+    """
+
+    def __init__(self, directory: str = TEMPLATES_DIR, default_locale: str = DEFAULT_EMAIL_LOCALE,
+                 cache_size: int = EMAIL_RENDER_CACHE_SIZE):
+        self.default_locale = default_locale
+        self.cache_size = cache_size
+        self.env = Environment(
+            loader=FileSystemLoader(directory),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+        )
+        # Compilar todo al arrancar: los errores de sintaxis aparecen de inmediato
+        self.templates = {name: self.env.get_template(name) for name in self.env.list_templates()}
+        for name in self.templates:
+            self._check_dynamic_fields(name)
+        self._rendered: "OrderedDict[tuple, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_dynamic_fields(self, template_name: str):
+        """Verifica que los campos dinámicos solo aparezcan como salida directa: `{{ campo }}`"""
+        dynamic = DYNAMIC_FIELDS.get(os.path.splitext(os.path.basename(template_name))[0], ())
+        if not dynamic:
+            return
+        source = self.env.loader.get_source(self.env, template_name)[0]
+        tree = self.env.parse(source, template_name)
+        plain = {id(node) for output in tree.find_all(nodes.Output)
+                 for node in output.nodes if isinstance(node, nodes.Name)}
+        for node in tree.find_all(nodes.Name):
+            if node.name in dynamic and id(node) not in plain:
+                raise TemplateAssertionError(
+                    f"'{node.name}' es un campo dinámico: solo puede usarse como {{{{ {node.name} }}}}",
+                    node.lineno, template_name, template_name
+                )
+
+    def _resolve(self, name: str, locale: str):
+        template = self.templates.get(f"{locale}/{name}.html")
+        if template is None:
+            template = self.templates[f"{self.default_locale}/{name}.html"]
+        return template
+
+    def _skeleton(self, name: str, locale: str, static: Dict) -> str:
+        key = (name, locale, tuple(sorted(static.items())))
+        skeleton = self._rendered.get(key)
+        if skeleton is not None:
+            self.hits += 1
+            self._rendered.move_to_end(key)
+            return skeleton
+
+        self.misses += 1
+        markers = {field: _marker(field) for field in DYNAMIC_FIELDS.get(name, ())}
+        skeleton = self._resolve(name, locale).render(**static, **markers)
+        self._rendered[key] = skeleton
+        if len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+        return skeleton
+
+    def render(self, name: str, locale: str = None, **context) -> str:
+        """
+        Renderiza una plantilla
+
+        Args:
+            name: Nombre de la plantilla (ej. "status_update")
+            locale: Idioma ("es", "en"); por defecto DEFAULT_EMAIL_LOCALE
+            **context: Variables de la plantilla
+        """
+        return self.render_batch(name, [context], locale)[0]
+
+    def render_batch(self, name: str, contexts: Iterable[Dict], locale: str = None) -> List[str]:
+        """
+        Renderiza la misma plantilla para muchos mensajes en una sola llamada
+
+        Los mensajes que solo difieren en campos dinámicos comparten un único
+        renderizado de Jinja2.
+        """
+        locale = locale or self.default_locale
+        dynamic = DYNAMIC_FIELDS.get(name, ())
+        bodies = []
+        for context in contexts:
+            static = {k: v for k, v in context.items() if k not in dynamic}
+            body = self._skeleton(name, locale, static)
+            for field in dynamic:
+                body = body.replace(_marker(field), str(escape(context.get(field, ""))))
+            bodies.append(body)
+        return bodies
+
+    def subject(self, name: str, locale: str = None, **context) -> str:
+        subjects = SUBJECTS.get(locale or self.default_locale, SUBJECTS[self.default_locale])
+        return subjects[name].format(**context)
+
+    def stats(self) -> Dict[str, int]:
+        return {"templates": len(self.templates), "cached": len(self._rendered),
+                "hits": self.hits, "misses": self.misses}
+
+
+email_templates = EmailTemplates()
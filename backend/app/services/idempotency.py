@@ -0,0 +1,127 @@
+"""
+Creación idempotente de pedidos
+El cliente manda un header Idempotency-Key por cada pedido y repite la misma clave
+en sus reintentos. La clave se guarda en idempotency_keys en la misma transacción
+que el pedido, así un reintento (aunque llegue en paralelo o a otro worker)
+devuelve el pedido ya creado en lugar de duplicarlo
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import IdempotencyKey
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+def request_fingerprint(payload: Any) -> str:
+    """SHA-256 del cuerpo en JSON canónico, para detectar una clave reusada con otro pedido"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyCache:
+    """
+    Caché LRU de (user_id, clave) -> (huella, order_id, expira) de este proceso.
+
+    Evita la consulta a idempotency_keys en los reintentos que llegan al mismo
+    worker; la tabla sigue siendo la fuente de verdad.
+    """
+
+    def __init__(self, max_size: int = IDEMPOTENCY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[str, int, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, key: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[2] <= datetime.now():
+                self._entries.pop((user_id, key), None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, user_id: int, key: str, fingerprint: str, order_id: int, expires_at: datetime):
+        with self._lock:
+            self._entries[(user_id, key)] = (fingerprint, order_id, expires_at)
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+idempotency_cache = IdempotencyCache()
+
+
+async def find_order_for_key(db: AsyncSession, user_id: int, key: str) -> Optional[Tuple[str, int]]:
+    """
+    Pedido ya creado con esta clave
+
+    Returns:
+        Tupla (huella de la solicitud original, order_id) o None si la clave no se usó
+        (o ya expiró)
+    """
+    cached = idempotency_cache.get(user_id, key)
+    if cached is not None:
+        return cached
+    row = (await db.execute(
+        select(IdempotencyKey.request_hash, IdempotencyKey.order_id, IdempotencyKey.expires_at)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )).first()
+    if row is None or row.expires_at <= datetime.now():
+        return None
+    idempotency_cache.put(user_id, key, row.request_hash, row.order_id, row.expires_at)
+    return row.request_hash, row.order_id
+
+
+async def claim_key(db: AsyncSession, user_id: int, key: str, fingerprint: str, order_id: int) -> datetime:
+    """
+    Registra la clave para el pedido dentro de la transacción en curso. No hace commit.
+
+    Si otra solicitud con la misma clave ya confirmó su pedido, el INSERT falla con
+    IntegrityError (clave primaria) y la transacción debe deshacerse.
+
+    Returns:
+        Fecha de expiración de la clave
+    """
+    now = datetime.now()
+    expires_at = now + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+    # Una clave vencida se puede reutilizar
+    await db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+    )
+    await db.execute(insert(IdempotencyKey).values(
+        user_id=user_id, key=key, request_hash=fingerprint, order_id=order_id,
+        created_at=now, expires_at=expires_at,
+    ))
+    return expires_at
+
+
+def purge_expired_keys(db: Session) -> int:
+    """Borra las claves vencidas. Returns: cantidad de claves borradas"""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now()))
+    db.commit()
+    return result.rowcount
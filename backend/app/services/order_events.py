@@ -0,0 +1,197 @@
+"""
+Log de eventos de estado de los pedidos
+Cada cambio de estado agrega una fila a order_events (solo INSERT) en la misma
+transacción que cambia el pedido, en lugar de reescribir el JSON status_history
+completo. Las respuestas de la API siguen mostrando status_history, armado desde
+los eventos, y la analítica recorre el log en streaming.
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import event, exists, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Order, OrderEvent
+
+REPLAY_BATCH_SIZE = int(os.getenv("ORDER_EVENTS_BATCH_SIZE", "2000"))
+
+# Clave de Session.info con el autor de los cambios de estado hechos en esa sesión
+ACTOR_KEY = "order_event_actor"
+
+
+def set_actor(db, actor: Optional[str]):
+    """Registra quién hace los próximos cambios de estado de la sesión (sync o async)"""
+    db.info[ACTOR_KEY] = actor
+
+
+def append_event(conn: Connection, order_id: int, status: str, actor: Optional[str] = None,
+                 at: Optional[datetime] = None):
+    """
+    Agrega un evento al log. Es la única escritura sobre order_events
+
+    Los UPDATE masivos sobre orders (ej. claim_order) no disparan los eventos del ORM
+    y deben llamar a esta función con el estado nuevo.
+    """
+    conn.execute(
+        OrderEvent.__table__.insert().values(
+            order_id=order_id, ts=at or datetime.now(), status=status, actor=actor
+        )
+    )
+
+
+def _session_actor(target: Order) -> Optional[str]:
+    session = object_session(target)
+    return session.info.get(ACTOR_KEY) if session is not None else None
+
+
+@event.listens_for(Order, "after_insert")
+def _order_created(mapper, connection, target: Order):
+    append_event(connection, target.id, target.status or "pendiente", _session_actor(target))
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target: Order):
+    history = inspect(target).attrs.status.history
+    if history.has_changes() and history.deleted and history.deleted[0] != target.status:
+        append_event(connection, target.id, target.status, _session_actor(target))
+
+
+def event_entry(ts: datetime, status: str, actor: Optional[str]) -> Dict:
+    """Un evento con el formato de las entradas de status_history"""
+    entry = {"status": status, "timestamp": ts.isoformat()}
+    if actor:
+        entry["updated_by"] = actor
+    return entry
+
+
+def history_query(order_ids: List[int]):
+    """SELECT de los eventos de varios pedidos, listo para ejecutar en una sesión sync o async"""
+    return (
+        select(OrderEvent.order_id, OrderEvent.ts, OrderEvent.status, OrderEvent.actor)
+        .where(OrderEvent.order_id.in_(order_ids))
+        .order_by(OrderEvent.order_id, OrderEvent.ts, OrderEvent.id)
+    )
+
+
+def attach_status_history(orders: List[Order], rows) -> List[Order]:
+    """
+    Arma status_history de cada pedido con las filas de history_query
+
+    El valor se asigna como ya guardado: no marca el pedido como modificado ni se
+    escribe en la columna heredada. Los pedidos sin eventos conservan su JSON.
+    """
+    by_order: Dict[int, List[Dict]] = {}
+    for order_id, ts, status, actor in rows:
+        by_order.setdefault(order_id, []).append(event_entry(ts, status, actor))
+    for order in orders:
+        if order.id in by_order:
+            set_committed_value(order, "status_history", by_order[order.id])
+    return orders
+
+
+def with_status_history(db: Session, orders: List[Order]) -> List[Order]:
+    if orders:
+        attach_status_history(orders, db.execute(history_query([o.id for o in orders])).all())
+    return orders
+
+
+async def with_status_history_async(db: AsyncSession, orders: List[Order]) -> List[Order]:
+    if orders:
+        attach_status_history(orders, (await db.execute(history_query([o.id for o in orders]))).all())
+    return orders
+
+
+def replay_query(after_id: int = 0, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """
+    SELECT del log en orden de inserción, con el negocio y el total de cada pedido
+
+    Filas: (id, order_id, ts, status, actor, business_id, total). El id de la última
+    fila procesada sirve como `after_id` para continuar desde ahí.
+    """
+    stmt = (
+        select(OrderEvent.id, OrderEvent.order_id, OrderEvent.ts, OrderEvent.status, OrderEvent.actor,
+               Order.business_id, Order.total)
+        .join(Order, Order.id == OrderEvent.order_id)
+        .where(OrderEvent.id > after_id)
+        .order_by(OrderEvent.id)
+    )
+    if since is not None:
+        stmt = stmt.where(OrderEvent.ts >= since)
+    if until is not None:
+        stmt = stmt.where(OrderEvent.ts < until)
+    return stmt
+
+
+def replay_events(db: Session, after_id: int = 0, since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, batch_size: int = REPLAY_BATCH_SIZE) -> Iterator:
+    """Recorre el log por lotes de `batch_size` filas, sin cargarlo completo en memoria"""
+    yield from db.execute(replay_query(after_id, since, until).execution_options(yield_per=batch_size))
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return None
+
+
+def backfill_order_events(db: Session, batch_size: int = REPLAY_BATCH_SIZE) -> int:
+    """
+    Copia a order_events el status_history heredado de los pedidos que no tienen eventos
+
+    Si el estado actual no es el último del historial (cambios hechos sin tocar el
+    JSON, ej. la demo o la asignación de repartidor), se agrega en la fecha de
+    updated_at. No hace commit.
+
+    Returns:
+        Cantidad de eventos insertados
+    """
+    conn = db.connection()
+    rows = db.execute(
+        select(Order.id, Order.status, Order.status_history, Order.created_at, Order.updated_at)
+        .where(~exists().where(OrderEvent.order_id == Order.id))
+        .execution_options(yield_per=batch_size)
+    )
+    pending: List[Dict] = []
+    inserted = 0
+    for order_id, status, history, created_at, updated_at in rows:
+        fallback = _parse_timestamp(updated_at) or _parse_timestamp(created_at) or datetime.now()
+        last_status = None
+        for entry in history or []:
+            if not entry.get("status"):
+                continue
+            pending.append({
+                "order_id": order_id,
+                "ts": _parse_timestamp(entry.get("timestamp")) or fallback,
+                "status": entry["status"],
+                "actor": entry.get("updated_by"),
+            })
+            last_status = entry["status"]
+        if status and status != last_status:
+            pending.append({"order_id": order_id, "ts": fallback, "status": status, "actor": None})
+        if len(pending) >= batch_size:
+            conn.execute(OrderEvent.__table__.insert(), pending)
+            inserted += len(pending)
+            pending = []
+    if pending:
+        conn.execute(OrderEvent.__table__.insert(), pending)
+        inserted += len(pending)
+    return inserted
+
+
+def ensure_order_events(db: Session):
+    """Migra el historial heredado la primera vez (base existente sin eventos)"""
+    if db.scalar(select(OrderEvent.id).limit(1)) is None:
+        inserted = backfill_order_events(db)
+        db.commit()
+        if inserted:
+            print(f"🗂️  Historial de pedidos migrado a order_events: {inserted} eventos")
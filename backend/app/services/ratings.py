@@ -0,0 +1,135 @@
+"""
+Calificación de los negocios
+Mantiene por negocio el número de reseñas y la suma de calificaciones (más una
+versión ponderada por antigüedad), actualizadas con un UPDATE atómico en la misma
+transacción que inserta la reseña, en lugar de releer todas las reseñas
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Business, Review
+
+# "average" (promedio simple), "bayesian" (promedio con prior) o "decayed" (bayesiano
+# donde las reseñas pierden peso con el tiempo)
+RATING_MODE = os.getenv("RATING_MODE", "average")
+# Prior bayesiano: un negocio nuevo arranca en RATING_PRIOR_MEAN como si tuviera
+# RATING_PRIOR_WEIGHT reseñas con esa nota
+RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", "4.0"))
+RATING_PRIOR_WEIGHT = float(os.getenv("RATING_PRIOR_WEIGHT", "5"))
+# Vida media del peso de una reseña en modo "decayed"; si se cambia, correr backfill_ratings.py
+RATING_HALF_LIFE_DAYS = float(os.getenv("RATING_HALF_LIFE_DAYS", "90"))
+
+# Referencia para los pesos de decaimiento: una reseña en el instante t pesa
+# 2^((t - DECAY_EPOCH) / vida media). El cociente entre sumas ponderadas no depende
+# del momento en que se calcula, así que los acumulados solo se incrementan.
+DECAY_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def decay_weight(timestamp: Optional[float] = None) -> float:
+    """Peso de una reseña escrita en `timestamp` (segundos epoch; ahora por defecto)"""
+    if timestamp is None:
+        timestamp = time.time()
+    return 2.0 ** ((timestamp - DECAY_EPOCH) / (RATING_HALF_LIFE_DAYS * 86400))
+
+
+def rating_formula(count, total, decayed_total, decayed_weight, now_weight: float, mode: str = RATING_MODE):
+    """
+    Calificación a partir de los acumulados
+
+    Solo usa operaciones aritméticas: sirve igual con números de Python y con columnas
+    de SQLAlchemy (para calcularla dentro del mismo UPDATE).
+    """
+    if mode == "average":
+        return total / count
+    if mode == "bayesian":
+        return (RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + total) / (RATING_PRIOR_WEIGHT + count)
+    if mode == "decayed":
+        # Peso efectivo de las reseñas a la fecha (una reseña de hoy cuenta 1)
+        return ((RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + decayed_total / now_weight) /
+                (RATING_PRIOR_WEIGHT + decayed_weight / now_weight))
+    raise ValueError(f"RATING_MODE desconocido: {mode}")
+
+
+def add_review_statement(business_id: int, rating: int, mode: str = RATING_MODE):
+    """
+    UPDATE que suma una reseña a los acumulados del negocio y recalcula su calificación
+
+    Debe ejecutarse en la misma transacción que inserta la reseña; al ser un único
+    UPDATE con expresiones sobre las columnas, dos reseñas concurrentes no se pisan.
+    """
+    weight = decay_weight()
+    count = Business.review_count + 1
+    total = Business.rating_sum + rating
+    decayed_total = Business.rating_decayed_sum + rating * weight
+    decayed_weight = Business.rating_decayed_weight + weight
+    new_rating = rating_formula(count, total, decayed_total, decayed_weight, weight, mode)
+    return (
+        update(Business)
+        .where(Business.id == business_id)
+        .values(
+            review_count=count,
+            rating_sum=total,
+            rating_decayed_sum=decayed_total,
+            rating_decayed_weight=decayed_weight,
+            rating=func.round(new_rating, 1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _review_timestamp(created_at) -> float:
+    if created_at is None:
+        return time.time()
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        # CURRENT_TIMESTAMP de SQLite se guarda en UTC sin zona
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def backfill_ratings(db: Session, mode: str = RATING_MODE, batch_size: int = 5000) -> Dict[int, float]:
+    """
+    Recalcula los acumulados y la calificación de todos los negocios desde la tabla reviews
+
+    Recorre las reseñas en streaming. Los negocios sin reseñas conservan su
+    calificación actual con los acumulados en cero.
+
+    Returns:
+        Diccionario business_id -> calificación nueva (solo negocios con reseñas)
+    """
+    totals: Dict[int, list] = {}
+    rows = db.execute(
+        select(Review.business_id, Review.rating, Review.created_at)
+        .where(Review.business_id.is_not(None), Review.rating.is_not(None))
+        .execution_options(yield_per=batch_size)
+    )
+    for business_id, rating, created_at in rows:
+        weight = decay_weight(_review_timestamp(created_at))
+        acc = totals.setdefault(business_id, [0, 0.0, 0.0, 0.0])
+        acc[0] += 1
+        acc[1] += rating
+        acc[2] += rating * weight
+        acc[3] += weight
+
+    now_weight = decay_weight()
+    ratings = {}
+    db.execute(update(Business).values(review_count=0, rating_sum=0, rating_decayed_sum=0,
+                                       rating_decayed_weight=0))
+    for business_id, (count, total, decayed_total, decayed_weight) in totals.items():
+        rating = round(rating_formula(count, total, decayed_total, decayed_weight, now_weight, mode), 1)
+        db.execute(
+            update(Business)
+            .where(Business.id == business_id)
+            .values(review_count=count, rating_sum=total, rating_decayed_sum=decayed_total,
+                    rating_decayed_weight=decayed_weight, rating=rating)
+        )
+        ratings[business_id] = rating
+    db.commit()
+    return ratings
@@ -0,0 +1,410 @@
+"""
+Enrutamiento sobre la red vial (offline)
+Carga un extracto de OpenStreetMap, lo contrae a un grafo de intersecciones y
+calcula la ruta más rápida con A*; las rutas entre celdas frecuentes (negocio ->
+cliente) se guardan en un caché LRU
+"""
+
+import asyncio
+import gzip
+import heapq
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.spatial import GeoGrid
+from app.utils import DATA_DIR, calculate_distance
+
+# Extracto de OSM en XML (.osm o .osm.gz); si no existe las rutas se estiman en línea recta
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", os.path.join(DATA_DIR, "medellin.osm"))
+# Grafo mínimo sintético (cuadrícula de 81 nodos): solo para pruebas y benchmarks,
+# se usa pasándolo explícitamente como `path`
+ROAD_GRAPH_FIXTURE = os.path.join(DATA_DIR, "road_graph_fixture.osm")
+# Rutas guardadas y tamaño de la celda (en grados) que agrupa orígenes/destinos cercanos
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "4096"))
+ROUTE_CELL_SIZE_DEG = float(os.getenv("ROUTE_CELL_SIZE_DEG", "0.002"))  # ≈ 220 m
+
+# Velocidad por tipo de vía (km/h) para una moto en tráfico urbano
+ROAD_SPEEDS_KMH = {
+    "motorway": 60, "motorway_link": 40,
+    "trunk": 50, "trunk_link": 35,
+    "primary": 40, "primary_link": 30,
+    "secondary": 35, "secondary_link": 28,
+    "tertiary": 30, "tertiary_link": 25,
+    "unclassified": 25, "residential": 25,
+    "living_street": 10, "service": 15,
+}
+# Tramo a pie/moto desde el punto exacto hasta la intersección más cercana
+ACCESS_SPEED_KMH = 15
+# Sin grafo (o sin camino) se mantiene la estimación anterior: 2 minutos por km en línea recta
+FALLBACK_MINUTES_PER_KM = 2
+
+# Kilómetros por grado de latitud (aprox. constante)
+KM_PER_DEG_LAT = 111.32
+
+
+class Route:
+    """Ruta calculada entre dos puntos"""
+
+    __slots__ = ("distance_km", "duration_minutes", "waypoints", "routed")
+
+    def __init__(self, distance_km: float, duration_minutes: float,
+                 waypoints: List[Tuple[float, float]], routed: bool):
+        self.distance_km = distance_km
+        self.duration_minutes = duration_minutes
+        # Puntos (lat, lng) del recorrido, incluyendo origen y destino exactos
+        self.waypoints = waypoints
+        # False si es la estimación en línea recta
+        self.routed = routed
+
+
+class RoadGraph:
+    """
+    Grafo dirigido de la red vial.
+
+    Los nodos son intersecciones y extremos de vías: los puntos intermedios de forma
+    (grado 2) se contraen al cargar, y cada arista guarda su geometría para dibujar la
+    ruta. En un extracto de OSM la mayoría de los nodos son de forma, así que A* explora
+    un grafo varias veces más pequeño. El costo de las aristas es el tiempo de viaje.
+    """
+
+    def __init__(self):
+        self.lat: List[float] = []
+        self.lng: List[float] = []
+        # adjacency[u] = [(v, segundos, km, índice de geometría), ...]
+        self.adjacency: List[List[Tuple[int, float, float, int]]] = []
+        # Puntos intermedios de cada arista, en el sentido de recorrido
+        self.geometries: List[Tuple[Tuple[float, float], ...]] = []
+        self.max_speed_kmh = max(ROAD_SPEEDS_KMH.values())
+        self.index = GeoGrid(cell_size_deg=0.005)
+        # Coordenadas planas (km) para la heurística de A*
+        self._x: List[float] = []
+        self._y: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(edges) for edges in self.adjacency)
+
+    @classmethod
+    def from_osm(cls, path: str, contract: bool = True) -> "RoadGraph":
+        """
+        Construye el grafo desde un extracto de OSM en XML
+
+        Args:
+            path: Archivo .osm o .osm.gz
+            contract: Contraer los puntos de forma (False conserva todos los nodos)
+        """
+        opener = gzip.open if path.endswith(".gz") else open
+        coords: Dict[int, Tuple[float, float]] = {}
+        ways: List[Tuple[List[int], float, int]] = []
+        with opener(path, "rb") as f:
+            for _, element in ET.iterparse(f, events=("end",)):
+                if element.tag == "node":
+                    coords[int(element.get("id"))] = (float(element.get("lat")), float(element.get("lon")))
+                    element.clear()
+                elif element.tag == "way":
+                    tags = {t.get("k"): t.get("v") for t in element.iter("tag")}
+                    highway = tags.get("highway")
+                    if highway in ROAD_SPEEDS_KMH:
+                        refs = [int(nd.get("ref")) for nd in element.iter("nd")]
+                        ways.append((refs, _way_speed(highway, tags.get("maxspeed")), _way_direction(tags)))
+                    element.clear()
+
+        # Se conservan los extremos de cada vía y los nodos compartidos entre vías
+        uses: Dict[int, int] = {}
+        for refs, _, _ in ways:
+            for ref in refs:
+                uses[ref] = uses.get(ref, 0) + 1
+            for end in (refs[0], refs[-1]):
+                uses[end] = uses.get(end, 0) + 1
+
+        edges: List[Tuple[int, int, float, float, float, Tuple[Tuple[float, float], ...]]] = []
+        for refs, speed, direction in ways:
+            start, km, shape = None, 0.0, []
+            for ref in refs:
+                point = coords.get(ref)
+                if point is None:
+                    # Vía recortada por el borde del extracto
+                    start, km, shape = None, 0.0, []
+                    continue
+                if start is not None:
+                    prev = shape[-1] if shape else coords[start]
+                    km += calculate_distance(prev[0], prev[1], point[0], point[1])
+                if start is not None and (not contract or uses[ref] > 1):
+                    seconds = km / speed * 3600
+                    if direction >= 0:
+                        edges.append((start, ref, seconds, km, speed, tuple(shape)))
+                    if direction <= 0:
+                        edges.append((ref, start, seconds, km, speed, tuple(reversed(shape))))
+                    start, km, shape = ref, 0.0, []
+                elif start is None:
+                    start = ref
+                else:
+                    shape.append(point)
+
+        graph = cls()
+        graph._build(coords, _largest_component(edges))
+        return graph
+
+    def _build(self, coords: Dict[int, Tuple[float, float]], edges):
+        ids: Dict[int, int] = {}
+        for u, v, _, _, _, _ in edges:
+            for osm_id in (u, v):
+                if osm_id not in ids:
+                    ids[osm_id] = len(self.lat)
+                    lat, lng = coords[osm_id]
+                    self.lat.append(lat)
+                    self.lng.append(lng)
+                    self.adjacency.append([])
+        for u, v, seconds, km, _, shape in edges:
+            self.geometries.append(shape)
+            self.adjacency[ids[u]].append((ids[v], seconds, km, len(self.geometries) - 1))
+        # La heurística de A* es más precisa con la velocidad máxima real del extracto
+        if edges:
+            self.max_speed_kmh = max(edge[4] for edge in edges)
+
+        ref_lat = sum(self.lat) / len(self.lat) if self.lat else 0.0
+        km_per_deg_lng = KM_PER_DEG_LAT * math.cos(math.radians(ref_lat))
+        self._x = [lng * km_per_deg_lng for lng in self.lng]
+        self._y = [lat * KM_PER_DEG_LAT for lat in self.lat]
+        for node, (lat, lng) in enumerate(zip(self.lat, self.lng)):
+            self.index.upsert(node, lat, lng)
+
+    def nearest_node(self, lat: float, lng: float) -> Optional[Tuple[int, float]]:
+        """Intersección más cercana a un punto: (nodo, distancia_km)"""
+        found = self.index.nearest(lat, lng, k=1)
+        return found[0] if found else None
+
+    def shortest_path(self, source: int, target: int,
+                      heuristic: bool = True) -> Optional[Tuple[float, float, List[int]]]:
+        """
+        Camino más rápido entre dos nodos
+
+        Args:
+            source: Nodo de origen
+            target: Nodo de destino
+            heuristic: A* (distancia en línea recta a la velocidad máxima); False = Dijkstra
+
+        Returns:
+            Tupla (segundos, km, geometrías recorridas) o None si no hay camino.
+            Las geometrías son pares (nodo, índice de arista) en orden.
+        """
+        if source == target:
+            return 0.0, 0.0, []
+        adjacency, xs, ys = self.adjacency, self._x, self._y
+        tx, ty = xs[target], ys[target]
+        # La distancia plana puede superar levemente a la real: se descuenta 1% para no sobreestimar
+        seconds_per_km = 3600 / self.max_speed_kmh * 0.99 if heuristic else 0.0
+
+        best = {source: 0.0}
+        parent: Dict[int, Tuple[int, float, int]] = {}
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if cost > best[node]:
+                continue
+            for neighbor, seconds, km, geometry in adjacency[node]:
+                new_cost = cost + seconds
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    parent[neighbor] = (node, km, geometry)
+                    estimate = math.hypot(xs[neighbor] - tx, ys[neighbor] - ty) * seconds_per_km
+                    heapq.heappush(heap, (new_cost + estimate, new_cost, neighbor))
+        else:
+            return None
+
+        steps, total_km, node = [], 0.0, target
+        while node != source:
+            previous, km, geometry = parent[node]
+            steps.append((node, geometry))
+            total_km += km
+            node = previous
+        steps.reverse()
+        return best[target], total_km, steps
+
+    def path_points(self, source: int, steps: Sequence[Tuple[int, int]]) -> List[Tuple[float, float]]:
+        """Convierte el resultado de shortest_path en la lista de puntos (lat, lng)"""
+        points = [(self.lat[source], self.lng[source])]
+        for node, geometry in steps:
+            points.extend(self.geometries[geometry])
+            points.append((self.lat[node], self.lng[node]))
+        return points
+
+
+def _way_speed(highway: str, maxspeed: Optional[str]) -> float:
+    speed = ROAD_SPEEDS_KMH[highway]
+    if maxspeed:
+        digits = maxspeed.split()[0]
+        if digits.isdigit():
+            speed = min(speed, int(digits))
+    return speed
+
+
+def _way_direction(tags: Dict[str, str]) -> int:
+    """1 = solo en el sentido de los nodos, -1 = solo en sentido contrario, 0 = ambos"""
+    oneway = tags.get("oneway")
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1":
+        return -1
+    if oneway is None and tags.get("junction") == "roundabout":
+        return 1
+    return 0
+
+
+def _largest_component(edges):
+    """Descarta las islas del extracto (calles cortadas por el borde, parqueaderos)"""
+    parent: Dict[int, int] = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for u, v, *_ in edges:
+        ru, rv = find(u), find(v)
+        if ru != rv:
+            parent[ru] = rv
+    sizes: Dict[int, int] = {}
+    for node in parent:
+        root = find(node)
+        sizes[root] = sizes.get(root, 0) + 1
+    if not sizes:
+        return []
+    main = max(sizes, key=sizes.get)
+    return [edge for edge in edges if find(edge[0]) == main]
+
+
+class RoadRouter:
+    """
+    Rutas con caché sobre el grafo vial.
+
+    El grafo se carga la primera vez que se pide una ruta. Las rutas se guardan por
+    par de celdas (origen, destino): pedidos del mismo negocio a clientes de la misma
+    cuadra reutilizan el camino y solo cambian los tramos de acceso.
+    """
+
+    def __init__(self, path: str = ROAD_GRAPH_PATH, cache_size: int = ROUTE_CACHE_SIZE,
+                 cell_size_deg: float = ROUTE_CELL_SIZE_DEG, graph: Optional[RoadGraph] = None):
+        self.path = path
+        self.cache_size = cache_size
+        self.cell_size = cell_size_deg
+        self._graph = graph
+        self._loaded = graph is not None
+        self._cache: "OrderedDict[tuple, Optional[Tuple[float, float, List[Tuple[float, float]]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def graph(self) -> Optional[RoadGraph]:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._graph = self._load()
+                    self._loaded = True
+        return self._graph
+
+    def _load(self) -> Optional[RoadGraph]:
+        if not os.path.exists(self.path):
+            print(f"⚠️ No hay grafo vial ({self.path}): las rutas se estiman en línea recta")
+            return None
+        graph = RoadGraph.from_osm(self.path)
+        print(f"🗺️ Grafo vial cargado ({os.path.basename(self.path)}): {len(graph)} nodos, {graph.edge_count} aristas")
+        return graph
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def _cached(self, key: tuple):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return True, self._cache[key]
+        return False, None
+
+    def _store(self, key: tuple, value):
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _compute(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float):
+        """Ruta entre las intersecciones más cercanas: (segundos, km, puntos) o None"""
+        graph = self.graph
+        if graph is None or len(graph) == 0:
+            return None
+        source = graph.nearest_node(start_lat, start_lng)
+        target = graph.nearest_node(end_lat, end_lng)
+        if source is None or target is None:
+            return None
+        found = graph.shortest_path(source[0], target[0])
+        if found is None:
+            return None
+        seconds, km, steps = found
+        return seconds, km, graph.path_points(source[0], steps)
+
+    def route(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float) -> Route:
+        """
+        Calcula la ruta entre dos puntos (usa el caché por celdas)
+
+        Returns:
+            Route; si no hay grafo o camino, la estimación en línea recta (routed=False)
+        """
+        key = (self._cell(start_lat, start_lng), self._cell(end_lat, end_lng))
+        found, core = self._cached(key)
+        if not found:
+            core = self._compute(start_lat, start_lng, end_lat, end_lng)
+            self._store(key, core)
+        return self._assemble(core, start_lat, start_lng, end_lat, end_lng)
+
+    async def route_async(self, start_lat: float, start_lng: float, end_lat: float, end_lng: float) -> Route:
+        """Como route, pero calcula las rutas no cacheadas (y la carga del grafo) fuera del event loop"""
+        key = (self._cell(start_lat, start_lng), self._cell(end_lat, end_lng))
+        found, core = self._cached(key)
+        if found:
+            return self._assemble(core, start_lat, start_lng, end_lat, end_lng)
+        return await asyncio.to_thread(self.route, start_lat, start_lng, end_lat, end_lng)
+
+    @staticmethod
+    def _assemble(core, start_lat: float, start_lng: float, end_lat: float, end_lng: float) -> Route:
+        if core is None:
+            distance = calculate_distance(start_lat, start_lng, end_lat, end_lng)
+            return Route(distance, distance * FALLBACK_MINUTES_PER_KM,
+                         [(start_lat, start_lng), (end_lat, end_lng)], routed=False)
+        seconds, km, points = core
+        first, last = points[0], points[-1]
+        access_km = (calculate_distance(start_lat, start_lng, first[0], first[1]) +
+                     calculate_distance(last[0], last[1], end_lat, end_lng))
+        minutes = seconds / 60 + access_km / ACCESS_SPEED_KMH * 60
+        return Route(km + access_km, minutes, [(start_lat, start_lng), *points, (end_lat, end_lng)], routed=True)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict:
+        graph = self._graph
+        total = self.hits + self.misses
+        return {
+            "graph_nodes": len(graph) if graph is not None else 0,
+            "cached_routes": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+road_router = RoadRouter()
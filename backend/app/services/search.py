@@ -0,0 +1,335 @@
+"""
+Búsqueda de productos con SQLite FTS5
+La tabla virtual products_fts indexa nombre, descripción y categoría de products
+(tabla de contenido externo) y se mantiene sincronizada con triggers: cualquier
+escritura sobre products (API, import_catalog, SQL directo) queda buscable en la
+misma transacción. El tokenizador ignora tildes y mayúsculas, el último término se
+busca como prefijo (búsqueda mientras se escribe) y, si no hay resultados, los
+términos que no existen en el índice se corrigen contra su vocabulario.
+"""
+
+import os
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, or_, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models import Business, Product
+from app.pagination import decode_cursor, encode_cursor
+
+SEARCH_TABLE = "products_fts"
+SEARCH_VOCAB_TABLE = "products_fts_vocab"
+# Pesos de bm25 por columna (name, description, category): el nombre pesa más
+SEARCH_WEIGHTS = (10.0, 1.0, 4.0)
+# Cada cuánto recargar el vocabulario usado para corregir errores de tipeo
+SEARCH_VOCAB_REFRESH_SECONDS = float(os.getenv("SEARCH_VOCAB_REFRESH_SECONDS", "300"))
+# Correcciones que se prueban por término mal escrito
+SEARCH_MAX_CORRECTIONS = int(os.getenv("SEARCH_MAX_CORRECTIONS", "3"))
+SEARCH_DEFAULT_RADIUS_KM = float(os.getenv("SEARCH_DEFAULT_RADIUS_KM", "5"))
+SEARCH_MAX_TERMS = 8
+# Largo mínimo del último término para buscarlo como prefijo
+PREFIX_MIN_LENGTH = 2
+
+SEARCH_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_VOCAB_TABLE} USING fts5vocab({SEARCH_TABLE}, 'row')",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO {SEARCH_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+)
+
+
+def ensure_search_index(conn: Connection) -> bool:
+    """
+    Crea la tabla FTS5 y sus triggers si faltan (solo SQLite)
+
+    Si la tabla es nueva se llena con los productos existentes.
+
+    Returns:
+        True si se creó el índice
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+    ).first()
+    for ddl in SEARCH_DDL:
+        conn.execute(text(ddl))
+    if exists:
+        return False
+    conn.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def normalize(value: str) -> str:
+    """Minúsculas y sin tildes, igual que el tokenizador unicode61 remove_diacritics"""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def query_terms(query: str) -> List[str]:
+    return re.findall(r"[^\W_]+", normalize(query))[:SEARCH_MAX_TERMS]
+
+
+def allowed_typos(term: str) -> int:
+    """Errores tolerados según el largo: ninguno en palabras muy cortas"""
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 7 else 2
+
+
+def _deletes(term: str) -> List[str]:
+    return [term[:i] + term[i + 1:] for i in range(len(term))]
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Distancia de Damerau-Levenshtein (transposiciones adyacentes cuentan como un error)"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchVocabulary:
+    """
+    Vocabulario del índice FTS5 (products_fts_vocab) para corregir errores de tipeo.
+
+    Guarda cada término con su número de productos y, al estilo SymSpell, las
+    variantes con una letra menos: dos palabras a un error (o dos, en palabras
+    largas) comparten alguna variante, así encontrar candidatos cuesta unas pocas
+    búsquedas en un dict y no recorrer todo el vocabulario.
+    """
+
+    def __init__(self):
+        self.terms: Dict[str, int] = {}
+        self.sorted_terms: List[str] = []
+        self.deletes: Dict[str, List[str]] = {}
+        self.loaded_at: Optional[float] = None
+
+    def is_stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > SEARCH_VOCAB_REFRESH_SECONDS
+
+    def reload(self, db: Session):
+        terms = dict(db.execute(text(f"SELECT term, doc FROM {SEARCH_VOCAB_TABLE}")).all())
+        deletes: Dict[str, List[str]] = {}
+        for term in terms:
+            if allowed_typos(term):
+                for variant in set(_deletes(term)):
+                    deletes.setdefault(variant, []).append(term)
+        self.terms, self.sorted_terms, self.deletes = terms, sorted(terms), deletes
+        self.loaded_at = time.monotonic()
+
+    def has_prefix(self, prefix: str) -> bool:
+        i = bisect_left(self.sorted_terms, prefix)
+        return i < len(self.sorted_terms) and self.sorted_terms[i].startswith(prefix)
+
+    def corrections(self, term: str, limit: int = SEARCH_MAX_CORRECTIONS) -> List[str]:
+        """Términos del índice más parecidos a `term`: menos errores primero y, a igual distancia, los más frecuentes"""
+        max_distance = allowed_typos(term)
+        if not max_distance:
+            return []
+        variants = set(_deletes(term))
+        # Candidatos: `term` con una letra menos, con una letra más, o con una letra cambiada
+        candidates = {v for v in variants if v in self.terms}
+        candidates.update(self.deletes.get(term, ()))
+        for variant in variants:
+            candidates.update(self.deletes.get(variant, ()))
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(term, candidate)
+            if 0 < distance <= max_distance:
+                scored.append((distance, -self.terms[candidate], candidate))
+        return [candidate for _, _, candidate in sorted(scored)[:limit]]
+
+
+search_vocabulary = SearchVocabulary()
+
+
+# Cada grupo es (alternativas, buscar como prefijo); los grupos se combinan con AND
+Groups = List[Tuple[List[str], bool]]
+
+
+def match_expression(groups: Groups) -> str:
+    """Expresión MATCH de FTS5; los términos van entre comillas (sin operadores del usuario)"""
+    parts = []
+    for alternatives, prefix in groups:
+        quoted = [f'"{term}"' + ("*" if prefix else "") for term in alternatives]
+        parts.append(quoted[0] if len(quoted) == 1 else "(" + " OR ".join(quoted) + ")")
+    return " AND ".join(parts)
+
+
+def exact_groups(terms: List[str]) -> Groups:
+    last = len(terms) - 1
+    return [([term], i == last and len(term) >= PREFIX_MIN_LENGTH) for i, term in enumerate(terms)]
+
+
+async def corrected_groups(db: AsyncSession, terms: List[str]) -> Optional[Groups]:
+    """
+    Reemplaza los términos que no están en el índice por sus correcciones
+
+    Returns:
+        Grupos corregidos, o None si no hay nada que corregir
+    """
+    if search_vocabulary.is_stale():
+        await db.run_sync(search_vocabulary.reload)
+    groups = exact_groups(terms)
+    changed = False
+    for i, (alternatives, prefix) in enumerate(groups):
+        term = alternatives[0]
+        known = search_vocabulary.has_prefix(term) if prefix else term in search_vocabulary.terms
+        if known:
+            continue
+        fixes = search_vocabulary.corrections(term)
+        if fixes:
+            groups[i] = (fixes, False)
+            changed = True
+    return groups if changed else None
+
+
+def _fts_statement(groups: Groups, business_ids: Optional[List[int]], after: Optional[Tuple[float, int]],
+                   limit: int):
+    weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+    score = f"bm25({SEARCH_TABLE}, {weights})"
+    params = {"match": match_expression(groups), "limit": limit}
+    filters = ""
+    if business_ids is not None:
+        filters += " AND p.business_id IN (SELECT value FROM json_each(:business_ids))"
+        params["business_ids"] = "[" + ",".join(str(int(b)) for b in business_ids) + "]"
+    if after is not None:
+        filters += f" AND ({score} > :after_score OR ({score} = :after_score AND p.id > :after_id))"
+        params["after_score"], params["after_id"] = after
+    # bm25 se calcula para cada coincidencia; los datos del producto y del negocio
+    # se leen solo para las filas de la página
+    sql = f"""
+        SELECT p.id, p.business_id, b.name AS business_name, p.name, p.price, p.description,
+               p.category, p.image, p.source, r.score
+        FROM (
+            SELECT p.id, {score} AS score
+            FROM {SEARCH_TABLE}
+            JOIN products p ON p.id = {SEARCH_TABLE}.rowid
+            WHERE {SEARCH_TABLE} MATCH :match AND p.available = 1{filters}
+            ORDER BY score, p.id
+            LIMIT :limit
+        ) AS r
+        JOIN products p ON p.id = r.id
+        JOIN businesses b ON b.id = p.business_id
+        ORDER BY r.score, r.id
+    """
+    return text(sql).bindparams(**params)
+
+
+def _fallback_statement(terms: List[str], business_ids: Optional[List[int]], after: Optional[Tuple[float, int]],
+                        limit: int):
+    """Motores sin FTS5 (ej. PostgreSQL): coincidencia parcial por término, sin ranking"""
+    stmt = (
+        select(Product.id, Product.business_id, Business.name.label("business_name"), Product.name,
+               Product.price, Product.description, Product.category, Product.image, Product.source)
+        .join(Business, Business.id == Product.business_id)
+        .where(Product.available == True)
+        .order_by(Product.id)
+        .limit(limit)
+        .add_columns(literal(0.0).label("score"))
+    )
+    for term in terms:
+        pattern = f"%{term}%"
+        stmt = stmt.where(or_(Product.name.ilike(pattern), Product.description.ilike(pattern),
+                              Product.category.ilike(pattern)))
+    if business_ids is not None:
+        stmt = stmt.where(Product.business_id.in_(business_ids))
+    if after is not None:
+        stmt = stmt.where(Product.id > after[1])
+    return stmt
+
+
+def _decode_search_cursor(cursor: str) -> Tuple[float, int, bool]:
+    score, last_id, corrected = decode_cursor(cursor, 3)
+    if not isinstance(score, (int, float)) or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+    return float(score), last_id, bool(corrected)
+
+
+async def search_products(db: AsyncSession, query: str, limit: int, cursor: Optional[str] = None,
+                          business_distances: Optional[Dict[int, float]] = None) -> Dict:
+    """
+    Busca productos disponibles, los más relevantes primero
+
+    Args:
+        db: Sesión async
+        query: Texto escrito por el cliente
+        limit: Tamaño de página
+        cursor: Cursor de la página anterior
+        business_distances: {business_id: distancia_km} para limitar la búsqueda a
+            esos negocios (filtro geográfico); None busca en todos
+
+    Returns:
+        {"query", "corrected_query", "results", "count", "next_cursor"}
+    """
+    terms = query_terms(query)
+    response = {"query": query, "corrected_query": None, "results": [], "count": 0, "next_cursor": None}
+    if not terms or business_distances == {}:
+        return response
+
+    after, corrected = None, False
+    if cursor:
+        score, last_id, corrected = _decode_search_cursor(cursor)
+        after = (score, last_id)
+    business_ids = list(business_distances) if business_distances is not None else None
+    sqlite = db.bind.dialect.name == "sqlite"
+
+    async def run(groups: Groups):
+        if sqlite:
+            stmt = _fts_statement(groups, business_ids, after, limit + 1)
+        else:
+            stmt = _fallback_statement([g[0][0] for g in groups], business_ids, after, limit + 1)
+        return (await db.execute(stmt)).mappings().all()
+
+    groups = exact_groups(terms)
+    if corrected and sqlite:
+        groups = await corrected_groups(db, terms) or groups
+    rows = await run(groups)
+    if not rows and not cursor and sqlite:
+        fixed = await corrected_groups(db, terms)
+        if fixed is not None:
+            groups, corrected = fixed, True
+            rows = await run(groups)
+    if corrected:
+        response["corrected_query"] = " ".join(alternatives[0] for alternatives, _ in groups)
+
+    page = rows[:limit]
+    for row in page:
+        item = dict(row)
+        item["score"] = round(-item["score"], 4)
+        if business_distances is not None:
+            item["distance_km"] = round(business_distances[row["business_id"]], 2)
+        response["results"].append(item)
+    response["count"] = len(page)
+    if len(rows) > limit:
+        response["next_cursor"] = encode_cursor(page[-1]["score"], page[-1]["id"], int(corrected))
+    return response
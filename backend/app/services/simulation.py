@@ -1,71 +1,270 @@
+"""
+Simulación del recorrido de los repartidores
+Un único ticker avanza todas las simulaciones activas en cada paso: los recorridos
+(la ruta por calles, remuestreada a un punto por tick) viven en arreglos de NumPy y
+las actualizaciones de un tick se publican en lote
+"""
+
 import asyncio
-import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
 from app.websockets import manager
 
+# Cada cuánto avanza la simulación y se emiten posiciones
+SIMULATION_TICK_SECONDS = float(os.getenv("SIMULATION_TICK_SECONDS", "2"))
+
+# Amplitud del zig-zag que hace más "orgánico" el movimiento en línea recta (sin ruta)
+NOISE_AMPLITUDE = 0.00005
+
+# Mensaje de posición: {"type": "location_update", "lat", "lng", "progress", "eta_minutes"}
+LOCATION_UPDATE = '{"type":"location_update","lat":%r,"lng":%r,"progress":%d,"eta_minutes":%d}'
+
+# Ajuste de coordenadas: Usar ubicaciones de Medellín como base
+DEFAULT_START = (6.2092, -75.5676)  # El Poblado (Parque Lleras)
+DEFAULT_END = (6.2425, -75.5894)    # Laureles (Segundo Parque)
+
+
+def resample_path(points: Sequence[Tuple[float, float]], steps: int) -> np.ndarray:
+    """
+    Reparte un recorrido en `steps` posiciones equidistantes
+
+    La posición k es la que el repartidor alcanza al final del paso k
+    (la última coincide con el destino).
+
+    Returns:
+        Arreglo (steps, 2) con pares (lat, lng)
+    """
+    path = np.asarray(points, dtype=np.float64)
+    # Distancia acumulada en grados, corrigiendo la longitud por la latitud
+    scale = np.cos(np.radians(path[:, 0].mean()))
+    lengths = np.hypot(np.diff(path[:, 0]), np.diff(path[:, 1]) * scale)
+    cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+    if cumulative[-1] == 0:
+        return np.repeat(path[-1:], steps, axis=0)
+    targets = cumulative[-1] * np.arange(1, steps + 1) / steps
+    return np.column_stack((np.interp(targets, cumulative, path[:, 0]),
+                            np.interp(targets, cumulative, path[:, 1])))
+
+
 class SimulationService:
-    def __init__(self):
-        self.active_simulations = {}
+    """
+    Planificador de simulaciones por ticks.
+
+    Cada simulación ocupa una posición (slot) en los arreglos de estado; en cada
+    tick se avanzan todas a la vez con operaciones vectorizadas. `start_simulation`
+    espera hasta que la simulación termina (True) o se cancela (False).
+    """
+
+    def __init__(self, tick_seconds: float = SIMULATION_TICK_SECONDS, broadcaster=manager, capacity: int = 64):
+        self.tick_seconds = tick_seconds
+        self.broadcaster = broadcaster
+        # order_id -> slot
+        self.active_simulations: Dict[int, int] = {}
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._free: List[int] = []
+        self._allocate(capacity)
+        # Puntos (lat, lng) de todos los recorridos, uno por tick; los de simulaciones
+        # terminadas quedan como basura hasta la siguiente compactación
+        self.track = np.empty((capacity * 32, 2), dtype=np.float64)
+        self._track_used = 0
+        self._track_garbage = 0
+        self._ticker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _allocate(self, capacity: int):
+        """Crea o agranda los arreglos de estado conservando las simulaciones activas"""
+        old = getattr(self, "order_ids", None)
+        size = 0 if old is None else len(old)
+
+        def grow(name, dtype, fill=0):
+            array = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                array[:size] = getattr(self, name)
+            setattr(self, name, array)
 
-    async def start_simulation(self, order_id: int, start_lat: float, start_lng: float, end_lat: float, end_lng: float, duration_seconds: int = 60):
+        grow("order_ids", np.int64, -1)
+        # Inicio del recorrido de cada slot en self.track
+        grow("track_start", np.int64)
+        grow("noise", np.float64)
+        grow("step", np.int64)
+        grow("steps", np.int64)
+        grow("active", bool, False)
+        grow("paused", bool, False)
+        self._free.extend(range(capacity - 1, size - 1, -1))
+
+    def _store_track(self, points: np.ndarray) -> int:
+        """Copia un recorrido a self.track (compactando o agrandando si no cabe) y retorna su inicio"""
+        needed = self._track_used + len(points)
+        if needed > len(self.track):
+            live = self._track_used - self._track_garbage
+            if live + len(points) <= len(self.track) // 2:
+                self._compact_tracks()
+            else:
+                grown = np.empty((max(needed, len(self.track) * 2), 2), dtype=np.float64)
+                grown[:self._track_used] = self.track[:self._track_used]
+                self.track = grown
+        start = self._track_used
+        self.track[start:start + len(points)] = points
+        self._track_used += len(points)
+        return start
+
+    def _compact_tracks(self):
+        """Reubica los recorridos activos al inicio de self.track"""
+        compacted = np.empty_like(self.track)
+        used = 0
+        for slot in np.flatnonzero(self.active):
+            start, length = self.track_start[slot], self.steps[slot]
+            compacted[used:used + length] = self.track[start:start + length]
+            self.track_start[slot] = used
+            used += length
+        self.track = compacted
+        self._track_used = used
+        self._track_garbage = 0
+
+    def add(self, order_id: int, start_lat: float, start_lng: float, end_lat: float, end_lng: float,
+            duration_seconds: int = 60,
+            waypoints: Optional[Sequence[Tuple[float, float]]] = None) -> asyncio.Future:
         """
-        Simula el movimiento de un repartidor desde A hasta B
+        Registra una simulación sin esperar a que termine
+
+        Args:
+            waypoints: Puntos (lat, lng) de la ruta por calles; sin ellos el
+                repartidor va en línea recta de A a B
+
+        Returns:
+            Future que se resuelve con True al llegar o False si se cancela
         """
         if order_id in self.active_simulations:
-            return # Ya existe una simulación
+            return self._futures[order_id]
 
-        print(f"🚀 Iniciando simulación de entrega para Orden #{order_id}")
-        self.active_simulations[order_id] = True
-        
-        # Ajuste de coordenadas: Usar ubicaciones de Medellín como base
         if start_lat == 0 or end_lat == 0:
-            # El Poblado (Parque Lleras)
-            start_lat, start_lng = 6.2092, -75.5676
-            # Laureles (Segundo Parque)
-            end_lat, end_lng = 6.2425, -75.5894
-
-        # Pasos de actualización (cada 2 segundos)
-        steps = duration_seconds // 2
-        
-        lat_step = (end_lat - start_lat) / steps
-        lng_step = (end_lng - start_lng) / steps
-        
-        current_lat = start_lat
-        current_lng = start_lng
-        
-        for i in range(steps):
-            if order_id not in self.active_simulations:
-                break # Cancelado
-                
-            # Agregar movimiento más "orgánico" (zig-zag leve)
-            noise_lat = (math.sin(i * 0.5) * 0.00005)
-            noise_lng = (math.cos(i * 0.5) * 0.00005)
-            
-            current_lat += lat_step + noise_lat
-            current_lng += lng_step + noise_lng
-            
-            payload = {
-                "type": "location_update",
-                "lat": current_lat,
-                "lng": current_lng,
-                "progress": int((i / steps) * 100),
-                "eta_minutes": int((steps - i) * 2 / 60) + 1
-            }
-            
-            await manager.broadcast(order_id, payload)
-            await asyncio.sleep(2)
-            
-        # Finalizar
-        await manager.broadcast(order_id, {
-            "type": "status_update",
-            "status": "entregado",
-            "message": "¡Tu pedido ha llegado!"
-        })
-        
-        if order_id in self.active_simulations:
-            del self.active_simulations[order_id]
+            (start_lat, start_lng), (end_lat, end_lng) = DEFAULT_START, DEFAULT_END
+            waypoints = None
+        routed = waypoints is not None and len(waypoints) >= 2
+        if not routed:
+            waypoints = [(start_lat, start_lng), (end_lat, end_lng)]
+
+        if not self._free:
+            self._allocate(len(self.order_ids) * 2)
+        slot = self._free.pop()
+        steps = max(1, int(duration_seconds // self.tick_seconds))
+        self.order_ids[slot] = order_id
+        self.track_start[slot] = self._store_track(resample_path(waypoints, steps))
+        self.noise[slot] = 0.0 if routed else NOISE_AMPLITUDE
+        self.step[slot] = 0
+        self.steps[slot] = steps
+        self.active[slot] = True
+        self.paused[slot] = False
+
+        self.active_simulations[order_id] = slot
+        future = asyncio.get_running_loop().create_future()
+        self._futures[order_id] = future
+        self._ensure_ticker()
+        return future
+
+    async def start_simulation(self, order_id: int, start_lat: float, start_lng: float, end_lat: float,
+                               end_lng: float, duration_seconds: int = 60,
+                               waypoints: Optional[Sequence[Tuple[float, float]]] = None) -> bool:
+        """
+        Simula el movimiento de un repartidor desde A hasta B (siguiendo waypoints si se dan)
+
+        Returns:
+            True si el repartidor llegó, False si la simulación se canceló
+        """
+        if order_id not in self.active_simulations:
+            print(f"🚀 Iniciando simulación de entrega para Orden #{order_id}")
+        return await self.add(order_id, start_lat, start_lng, end_lat, end_lng, duration_seconds, waypoints)
+
+    def _finish(self, order_id: int, arrived: bool):
+        slot = self.active_simulations.pop(order_id)
+        self.active[slot] = False
+        self.order_ids[slot] = -1
+        self._track_garbage += int(self.steps[slot])
+        self._free.append(slot)
+        future = self._futures.pop(order_id)
+        if not future.done():
+            future.set_result(arrived)
 
     def stop_simulation(self, order_id: int):
+        """Cancela una simulación"""
         if order_id in self.active_simulations:
-            del self.active_simulations[order_id]
+            self._finish(order_id, False)
+
+    def pause_simulation(self, order_id: int) -> bool:
+        if order_id not in self.active_simulations:
+            return False
+        self.paused[self.active_simulations[order_id]] = True
+        return True
+
+    def resume_simulation(self, order_id: int) -> bool:
+        if order_id not in self.active_simulations:
+            return False
+        self.paused[self.active_simulations[order_id]] = False
+        return True
+
+    def advance(self) -> Tuple[List[Tuple[int, Union[dict, str]]], List[int]]:
+        """
+        Avanza un paso todas las simulaciones activas y no pausadas
+
+        Returns:
+            Tupla (mensajes [(order_id, dict o JSON)], órdenes que llegaron a destino)
+        """
+        running = self.active & ~self.paused
+        # Las que ya emitieron su último paso en el tick anterior llegan ahora
+        arrived_mask = running & (self.step >= self.steps)
+        arrived = self.order_ids[arrived_mask].tolist()
+
+        slots = np.flatnonzero(running & ~arrived_mask)
+        messages: List[Tuple[int, Union[dict, str]]] = [
+            (order_id, {"type": "status_update", "status": "entregado", "message": "¡Tu pedido ha llegado!"})
+            for order_id in arrived
+        ]
+        if slots.size == 0:
+            return messages, arrived
+
+        i = self.step[slots]
+        position = self.track[self.track_start[slots] + i]
+        noise = self.noise[slots]
+        lat = position[:, 0] + np.sin(i * 0.5) * noise
+        lng = position[:, 1] + np.cos(i * 0.5) * noise
+        steps = self.steps[slots]
+        progress = (i * 100) // steps
+        eta = ((steps - i) * self.tick_seconds / 60).astype(np.int64) + 1
+        self.step[slots] = i + 1
+
+        # Los campos son numéricos: el JSON se arma directo, sin pasar por json.dumps por mensaje
+        for order_id, lat, lng, prog, eta_minutes in zip(
+            self.order_ids[slots].tolist(), lat.tolist(), lng.tolist(),
+            progress.tolist(), eta.tolist()
+        ):
+            messages.append((order_id, LOCATION_UPDATE % (lat, lng, prog, eta_minutes)))
+        return messages, arrived
+
+    async def tick(self):
+        messages, arrived = self.advance()
+        futures = [(order_id, self._futures[order_id]) for order_id in arrived]
+        if messages:
+            await self.broadcaster.broadcast_many(messages)
+        for order_id, future in futures:
+            # Durante el broadcast pudo cancelarse (stop_simulation) o reiniciarse con otro future
+            if self._futures.get(order_id) is future:
+                self._finish(order_id, True)
+
+    def _ensure_ticker(self):
+        loop = asyncio.get_running_loop()
+        if self._ticker is None or self._ticker.done() or self._loop is not loop:
+            self._loop = loop
+            self._ticker = loop.create_task(self._run())
+
+    async def _run(self):
+        while self.active_simulations:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"❌ Error en el tick de simulación: {e}")
 
 simulation_service = SimulationService()
@@ -0,0 +1,191 @@
+"""
+Índice espacial en memoria para consultas por cercanía
+Cuadrícula de celdas lat/lng (estilo geohash) que evita recorrer todos los puntos
+"""
+
+import math
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.utils import calculate_distance, distances_from
+
+# Kilómetros por grado de latitud (aprox. constante)
+KM_PER_DEG_LAT = 111.32
+
+# A partir de cuántos candidatos conviene calcular distancias con NumPy
+VECTORIZE_THRESHOLD = 32
+
+
+class GeoGrid:
+    """
+    Índice espacial basado en una cuadrícula uniforme de grados.
+
+    Cada punto se guarda en la celda (floor(lat / cell), floor(lng / cell)).
+    Las consultas solo revisan las celdas que intersectan el radio pedido,
+    por lo que el costo depende de los puntos cercanos y no del total.
+    Los puntos marcados como no disponibles conservan su posición pero no
+    aparecen en las consultas.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.01):
+        # 0.01° ≈ 1.1 km en Medellín
+        self.cell_size = cell_size_deg
+        self.cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self.positions: Dict[Hashable, Tuple[float, float]] = {}
+        self.available: Dict[Hashable, bool] = {}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.positions
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def _add_to_cell(self, key: Hashable, lat: float, lng: float):
+        self.cells.setdefault(self._cell(lat, lng), set()).add(key)
+
+    def _remove_from_cell(self, key: Hashable, lat: float, lng: float):
+        cell = self._cell(lat, lng)
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+
+    def upsert(self, key: Hashable, lat: float, lng: float, available: bool = True):
+        """
+        Inserta o actualiza la posición y disponibilidad de un punto
+
+        Args:
+            key: Identificador del punto (ej. ID del repartidor)
+            lat: Latitud actual
+            lng: Longitud actual
+            available: Si el punto debe aparecer en las consultas
+        """
+        if key in self.positions and self.available[key]:
+            old_lat, old_lng = self.positions[key]
+            self._remove_from_cell(key, old_lat, old_lng)
+        self.positions[key] = (lat, lng)
+        self.available[key] = available
+        if available:
+            self._add_to_cell(key, lat, lng)
+
+    def set_available(self, key: Hashable, available: bool):
+        """Cambia la disponibilidad de un punto existente sin mover su posición"""
+        if key not in self.positions or self.available[key] == available:
+            return
+        lat, lng = self.positions[key]
+        if available:
+            self._add_to_cell(key, lat, lng)
+        else:
+            self._remove_from_cell(key, lat, lng)
+        self.available[key] = available
+
+    def remove(self, key: Hashable):
+        """Elimina un punto del índice"""
+        if key not in self.positions:
+            return
+        if self.available[key]:
+            lat, lng = self.positions[key]
+            self._remove_from_cell(key, lat, lng)
+        del self.positions[key]
+        del self.available[key]
+
+    def clear(self):
+        self.cells.clear()
+        self.positions.clear()
+        self.available.clear()
+
+    def cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        """Celda de la cuadrícula que contiene el punto"""
+        return self._cell(lat, lng)
+
+    def cells_around(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, int]]:
+        """Celdas (ocupadas o no) que cubren el círculo de búsqueda"""
+        return self._ring_cells(lat, lng, radius_km)
+
+    def _ring_cells(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, int]]:
+        """Celdas que cubren el rectángulo que contiene el círculo de búsqueda"""
+        ci, cj = self._cell(lat, lng)
+        cell_km_lat = self.cell_size * KM_PER_DEG_LAT
+        cell_km_lng = cell_km_lat * max(math.cos(math.radians(lat)), 1e-6)
+        di = math.ceil(radius_km / cell_km_lat)
+        dj = math.ceil(radius_km / cell_km_lng)
+        return [(i, j) for i in range(ci - di, ci + di + 1) for j in range(cj - dj, cj + dj + 1)]
+
+    def _candidates(self, lat: float, lng: float, radius_km: float) -> List[Hashable]:
+        candidates = []
+        # Si el radio cubre más celdas de las que existen, recorrer las existentes
+        cells = None if math.isinf(radius_km) else self._ring_cells(lat, lng, radius_km)
+        if cells is None or len(cells) > len(self.cells):
+            for bucket in self.cells.values():
+                candidates.extend(bucket)
+            return candidates
+        for cell in cells:
+            bucket = self.cells.get(cell)
+            if bucket:
+                candidates.extend(bucket)
+        return candidates
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[Hashable, float]]:
+        """
+        Obtiene los puntos disponibles dentro de un radio
+
+        Args:
+            lat: Latitud del centro
+            lng: Longitud del centro
+            radius_km: Radio de búsqueda en kilómetros
+
+        Returns:
+            Lista de tuplas (key, distancia_km) ordenada por distancia
+        """
+        candidates = self._candidates(lat, lng, radius_km)
+        if len(candidates) >= VECTORIZE_THRESHOLD:
+            coords = np.array([self.positions[key] for key in candidates])
+            distances = distances_from(lat, lng, coords[:, 0], coords[:, 1])
+            inside = np.flatnonzero(distances <= radius_km)
+            result = [(candidates[i], float(distances[i])) for i in inside]
+        else:
+            result = []
+            for key in candidates:
+                p_lat, p_lng = self.positions[key]
+                distance = calculate_distance(lat, lng, p_lat, p_lng)
+                if distance <= radius_km:
+                    result.append((key, distance))
+        result.sort(key=lambda x: x[1])
+        return result
+
+    def nearest(self, lat: float, lng: float, k: int = 1,
+                max_distance_km: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Obtiene los k puntos disponibles más cercanos
+
+        Expande el radio de búsqueda anillo por anillo hasta reunir k puntos
+        cuya distancia esté garantizada dentro del área revisada.
+
+        Args:
+            lat: Latitud del centro
+            lng: Longitud del centro
+            k: Número de vecinos a retornar
+            max_distance_km: Distancia máxima opcional
+
+        Returns:
+            Lista de tuplas (key, distancia_km) ordenada por distancia
+        """
+        if k <= 0 or not self.cells:
+            return []
+        radius = self.cell_size * KM_PER_DEG_LAT
+        while True:
+            if max_distance_km is not None and radius >= max_distance_km:
+                return self.within_radius(lat, lng, max_distance_km)[:k]
+            # Si el anillo supera las celdas ocupadas, revisar todos los puntos de una vez
+            if len(self._ring_cells(lat, lng, radius)) > len(self.cells):
+                limit = math.inf if max_distance_km is None else max_distance_km
+                return self.within_radius(lat, lng, limit)[:k]
+            found = self.within_radius(lat, lng, radius)
+            if len(found) >= k:
+                return found[:k]
+            radius *= 2
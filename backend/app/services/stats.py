@@ -0,0 +1,256 @@
+"""
+Estadísticas materializadas del panel de admin
+Contadores globales y agregados por hora/día que se actualizan en la misma
+transacción que crea o cambia un pedido, en lugar de recorrer las tablas completas
+en cada carga del dashboard
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Business, Order, OrderStatsRollup, StatsCounter, User
+from app.services.order_events import backfill_order_events, replay_events
+
+GRANULARITIES = ("hour", "day")
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Inicio de la hora o del día que contiene `moment`"""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Granularidad desconocida: {granularity}")
+
+
+def _upsert_add(conn: Connection, model, key_names: List[str], rows: List[Dict]):
+    """
+    INSERT de cada fila o suma de sus incrementos si ya existe
+
+    Con SQLite y PostgreSQL todas las filas van en un solo statement, para que la
+    transacción que cambia el pedido siga siendo corta.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    increments = [name for name in rows[0] if name not in key_names]
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_names,
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments},
+        )
+        conn.execute(stmt)
+        return
+    # Otros motores: UPDATE y, si no había fila, INSERT
+    for row in rows:
+        conditions = [table.c[name] == row[name] for name in key_names]
+        result = conn.execute(
+            update(table).where(*conditions).values({name: table.c[name] + row[name] for name in increments})
+        )
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(**row))
+
+
+def add_counters(conn: Connection, increments: Dict[str, float]):
+    _upsert_add(conn, StatsCounter, ["key"],
+                [{"key": key, "value": value} for key, value in increments.items() if value])
+
+
+def record_status_event(conn: Connection, business_id: Optional[int], status: str, total: Optional[float],
+                        at: Optional[datetime] = None, count: int = 1):
+    """Suma un pedido que entró a `status` en los agregados por hora y por día"""
+    at = at or datetime.now()
+    _upsert_add(conn, OrderStatsRollup, ["granularity", "bucket", "business_id", "status"], [
+        {"granularity": granularity, "bucket": bucket_start(at, granularity),
+         "business_id": business_id or 0, "status": status,
+         "orders": count, "revenue": (total or 0) * count}
+        for granularity in GRANULARITIES
+    ])
+
+
+def record_status_change(conn: Connection, business_id: Optional[int], total: Optional[float],
+                         old_status: Optional[str], new_status: str):
+    """
+    Registra un cambio de estado de un pedido
+
+    Los UPDATE masivos sobre orders (ej. claim_order) no disparan los eventos del ORM
+    y deben llamar a esta función con el estado anterior.
+    """
+    if old_status == new_status:
+        return
+    counters = {f"status:{new_status}": 1}
+    if old_status:
+        counters[f"status:{old_status}"] = -1
+    add_counters(conn, counters)
+    record_status_event(conn, business_id, new_status, total)
+
+
+@event.listens_for(Order, "after_insert")
+def _order_created(mapper, connection, target: Order):
+    add_counters(connection, {"orders": 1, "revenue": target.total or 0, f"status:{target.status}": 1})
+    record_status_event(connection, target.business_id, target.status, target.total)
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target: Order):
+    history = inspect(target).attrs.status.history
+    if history.has_changes() and history.deleted:
+        record_status_change(connection, target.business_id, target.total, history.deleted[0], target.status)
+
+
+@event.listens_for(Order, "after_delete")
+def _order_deleted(mapper, connection, target: Order):
+    add_counters(connection, {"orders": -1, "revenue": -(target.total or 0), f"status:{target.status}": -1})
+
+
+@event.listens_for(User, "after_insert")
+def _user_created(mapper, connection, target: User):
+    add_counters(connection, {"users": 1})
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User):
+    add_counters(connection, {"users": -1})
+
+
+@event.listens_for(Business, "after_insert")
+def _business_created(mapper, connection, target: Business):
+    add_counters(connection, {"businesses": 1})
+
+
+@event.listens_for(Business, "after_delete")
+def _business_deleted(mapper, connection, target: Business):
+    add_counters(connection, {"businesses": -1})
+
+
+def read_counters(rows) -> Dict:
+    """Convierte las filas (key, value) de stats_counters en la respuesta del dashboard"""
+    values = {key: value for key, value in rows}
+    return {
+        "total_orders": int(values.get("orders", 0)),
+        "total_sales": values.get("revenue", 0),
+        "total_users": int(values.get("users", 0)),
+        "total_businesses": int(values.get("businesses", 0)),
+        "orders_by_status": {
+            key.split(":", 1)[1]: int(value) for key, value in values.items()
+            if key.startswith("status:") and value
+        },
+    }
+
+
+def range_query(start: datetime, end: datetime, granularity: str = "hour", business_id: Optional[int] = None):
+    """SELECT de los agregados en [start, end), listo para ejecutar en una sesión sync o async"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidad desconocida: {granularity}")
+    stmt = (
+        select(OrderStatsRollup.bucket, OrderStatsRollup.status,
+               func.sum(OrderStatsRollup.orders), func.sum(OrderStatsRollup.revenue))
+        .where(
+            OrderStatsRollup.granularity == granularity,
+            OrderStatsRollup.bucket >= bucket_start(start, granularity),
+            OrderStatsRollup.bucket < end,
+        )
+        .group_by(OrderStatsRollup.bucket, OrderStatsRollup.status)
+        .order_by(OrderStatsRollup.bucket)
+    )
+    if business_id is not None:
+        stmt = stmt.where(OrderStatsRollup.business_id == business_id)
+    return stmt
+
+
+def series_from_rows(rows) -> List[Dict]:
+    """Agrupa las filas de range_query por bucket: [{bucket, orders: {estado: n}, revenue: {estado: $}}]"""
+    series: List[Dict] = []
+    for bucket, status, orders, revenue in rows:
+        if not series or series[-1]["bucket"] != bucket:
+            series.append({"bucket": bucket, "orders": {}, "revenue": {}})
+        series[-1]["orders"][status] = int(orders or 0)
+        series[-1]["revenue"][status] = revenue or 0
+    return series
+
+
+def rebuild_stats(db: Session) -> Dict:
+    """
+    Reconstruye contadores y agregados desde las tablas
+
+    Los contadores salen de orders, users y businesses; los agregados se rearman
+    reproduciendo el log order_events (antes se migra el status_history heredado
+    de los pedidos que aún no tienen eventos).
+
+    Returns:
+        Contadores resultantes (mismo formato que el dashboard)
+    """
+    backfill_order_events(db)
+    conn = db.connection()
+    conn.execute(delete(StatsCounter))
+    conn.execute(delete(OrderStatsRollup))
+
+    counters: Dict[str, float] = {
+        "users": db.scalar(select(func.count(User.id))) or 0,
+        "businesses": db.scalar(select(func.count(Business.id))) or 0,
+        "orders": 0,
+        "revenue": 0,
+    }
+    for status, orders, revenue in db.execute(
+        select(Order.status, func.count(Order.id), func.sum(Order.total)).group_by(Order.status)
+    ):
+        counters["orders"] += orders
+        counters["revenue"] += revenue or 0
+        counters[f"status:{status}"] = orders
+
+    # (granularity, bucket, business_id, status) -> [pedidos, total]
+    rollups: Dict[tuple, list] = {}
+    # Último estado de cada pedido: igual que record_status_change, repetir el estado no cuenta
+    last_status: Dict[int, str] = {}
+    for _, order_id, ts, status, _, business_id, total in replay_events(db):
+        if last_status.get(order_id) == status:
+            continue
+        last_status[order_id] = status
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(ts, granularity), business_id or 0, status)
+            acc = rollups.setdefault(key, [0, 0.0])
+            acc[0] += 1
+            acc[1] += total or 0
+
+    if counters:
+        conn.execute(StatsCounter.__table__.insert(),
+                     [{"key": key, "value": value} for key, value in counters.items()])
+    if rollups:
+        conn.execute(OrderStatsRollup.__table__.insert(), [
+            {"granularity": g, "bucket": b, "business_id": biz, "status": s, "orders": n, "revenue": r}
+            for (g, b, biz, s), (n, r) in rollups.items()
+        ])
+    db.commit()
+    return read_counters(counters.items())
+
+
+def ensure_stats(db: Session):
+    """
+    Arma las estadísticas la primera vez o si los totales no coinciden con las tablas
+
+    Los procesos que no importan este módulo (ej. scripts de carga) no registran los
+    eventos del ORM y los borrados masivos no los disparan: en esos casos los
+    contadores de pedidos, usuarios o negocios quedan desfasados y se reconstruyen.
+    """
+    stored = dict(db.execute(
+        select(StatsCounter.key, StatsCounter.value)
+        .where(StatsCounter.key.in_(("orders", "users", "businesses")))
+    ).all())
+    actual = {
+        "orders": db.scalar(select(func.count(Order.id))) or 0,
+        "users": db.scalar(select(func.count(User.id))) or 0,
+        "businesses": db.scalar(select(func.count(Business.id))) or 0,
+    }
+    if not stored or any(int(stored.get(key, 0)) != count for key, count in actual.items()):
+        stats = rebuild_stats(db)
+        print(f"📊 Estadísticas materializadas: {stats['total_orders']} pedidos")
@@ -0,0 +1,143 @@
+"""
+Cola interna de trabajos en segundo plano
+Los efectos secundarios de una solicitud (correos, notificaciones, despacho) se
+encolan y corren fuera de ella, con un tope de trabajos simultáneos, para que la
+respuesta salga apenas se confirma la transacción. Los trabajos largos que pasan
+casi todo el tiempo esperando (la demo de seguimiento de un pedido) corren como
+tareas sueltas, fuera de ese tope
+"""
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+WORK_QUEUE_MAX_SIZE = int(os.getenv("WORK_QUEUE_MAX_SIZE", "10000"))
+# Trabajos de la cola corriendo a la vez (correos, notificaciones, despacho)
+WORK_QUEUE_CONCURRENCY = int(os.getenv("WORK_QUEUE_CONCURRENCY", "200"))
+
+
+class WorkQueue:
+    """
+    Cola acotada de corrutinas.
+
+    Un despachador toma los trabajos en orden de llegada y los lanza como tareas
+    mientras haya cupo (`concurrency`). `submit` nunca espera: si la cola está llena
+    devuelve False y quien encola decide cómo seguir. `spawn` lanza trabajos largos
+    sin ocupar cupo; al cerrar se cancelan sin esperarlos.
+    """
+
+    def __init__(self, max_size: int = WORK_QUEUE_MAX_SIZE, concurrency: int = WORK_QUEUE_CONCURRENCY):
+        self.max_size = max_size
+        self.concurrency = concurrency
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Set[asyncio.Task] = set()
+        self._detached: Set[asyncio.Task] = set()
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        # El despachador pertenece a un event loop; si cambia (ej. tests), se recrea
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._running = set()
+        self._detached = set()
+        self._dispatcher = loop.create_task(self._dispatch())
+
+    def submit(self, job: Callable[..., Awaitable], *args, **kwargs) -> bool:
+        """
+        Encola `job(*args, **kwargs)` para correrlo en segundo plano
+
+        Returns:
+            True si quedó en cola, False si la cola está llena
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        try:
+            self._queue.put_nowait((job, args, kwargs))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def spawn(self, job: Callable[..., Awaitable], *args, **kwargs) -> asyncio.Task:
+        """Corre `job(*args, **kwargs)` como tarea suelta, sin ocupar cupo de la cola"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+        self.submitted += 1
+        task = loop.create_task(self._call(job, args, kwargs))
+        self._detached.add(task)
+        task.add_done_callback(self._detached.discard)
+        return task
+
+    async def _dispatch(self):
+        while True:
+            job, args, kwargs = await self._queue.get()
+            await self._slots.acquire()
+            task = self._loop.create_task(self._run(job, args, kwargs))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _call(self, job: Callable[..., Awaitable], args, kwargs):
+        try:
+            await job(*args, **kwargs)
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Error en trabajo en segundo plano {getattr(job, '__name__', job)}: {e}")
+
+    async def _run(self, job: Callable[..., Awaitable], args, kwargs):
+        try:
+            await self._call(job, args, kwargs)
+        finally:
+            self._slots.release()
+            self._queue.task_done()
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Espera a que terminen los trabajos encolados y los que están corriendo (no los sueltos)"""
+        if self._queue is None:
+            return
+        await asyncio.wait_for(self._queue.join(), timeout)
+
+    async def close(self, timeout: float = 10.0):
+        """Espera los trabajos de la cola hasta `timeout` y cancela lo que quede (y los sueltos)"""
+        if self._queue is None:
+            return
+        try:
+            await self.drain(timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Quedaron {self._queue.qsize() + len(self._running)} trabajos sin terminar al cerrar")
+        tasks = [self._dispatcher, *self._running, *self._detached]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop = None
+        self._queue = None
+        self._slots = None
+        self._dispatcher = None
+        self._running = set()
+        self._detached = set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": len(self._running),
+            "detached": len(self._detached),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+work_queue = WorkQueue()
@@ -5,10 +5,12 @@ Funciones comunes para manejo de datos JSON y cálculos
 
 import json
 import os
-from typing import List, Dict
+from typing import List, Dict, Sequence, Tuple
 import math
 from datetime import datetime
 
+import numpy as np
+
 # Directorio donde se almacenan los archivos JSON
 # Usar ruta absoluta basada en la ubicación de este archivo
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -79,6 +81,71 @@ def calculate_distance(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     return R * c
 
 
+# Radio de la Tierra en kilómetros
+EARTH_RADIUS_KM = 6371.0
+
+
+def _as_coordinate_array(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Convierte una secuencia de pares (lat, lng) en un arreglo (n, 2) de float64"""
+    array = np.asarray(points, dtype=np.float64)
+    if array.ndim == 1:
+        array = array.reshape(-1, 2)
+    return array
+
+
+def distances_from(lat: float, lng: float, lats: Sequence[float], lngs: Sequence[float],
+                   mode: str = "haversine") -> np.ndarray:
+    """
+    Calcula en un solo paso vectorizado la distancia de un origen a muchos destinos
+
+    Args:
+        lat: Latitud del origen
+        lng: Longitud del origen
+        lats: Latitudes de los destinos
+        lngs: Longitudes de los destinos
+        mode: "haversine" (exacto) o "equirectangular" (aproximación rápida
+            válida para distancias cortas, como las de Medellín)
+
+    Returns:
+        Arreglo con la distancia en kilómetros a cada destino
+    """
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lng2 = np.radians(np.asarray(lngs, dtype=np.float64))
+    return _distance_kernel(math.radians(lat), math.radians(lng), lat2, lng2, mode)
+
+
+def distance_matrix(origins: Sequence[Tuple[float, float]],
+                    destinations: Sequence[Tuple[float, float]],
+                    mode: str = "haversine") -> np.ndarray:
+    """
+    Calcula la matriz de distancias entre muchos orígenes y muchos destinos
+
+    Args:
+        origins: Secuencia de pares (lat, lng) de origen (n)
+        destinations: Secuencia de pares (lat, lng) de destino (m)
+        mode: "haversine" o "equirectangular"
+
+    Returns:
+        Matriz (n, m) con las distancias en kilómetros
+    """
+    o = np.radians(_as_coordinate_array(origins))
+    d = np.radians(_as_coordinate_array(destinations))
+    return _distance_kernel(o[:, 0:1], o[:, 1:2], d[:, 0][np.newaxis, :], d[:, 1][np.newaxis, :], mode)
+
+
+def _distance_kernel(lat1, lng1, lat2, lng2, mode: str) -> np.ndarray:
+    """Núcleo vectorizado común; recibe ángulos en radianes con formas compatibles"""
+    if mode == "haversine":
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    if mode == "equirectangular":
+        x = (lng2 - lng1) * np.cos((lat1 + lat2) / 2)
+        y = lat2 - lat1
+        return EARTH_RADIUS_KM * np.sqrt(x * x + y * y)
+    raise ValueError(f"Modo de distancia desconocido: {mode}")
+
+
 def get_current_timestamp() -> str:
     """
     Retorna el timestamp actual en formato ISO 8601
@@ -1,33 +1,177 @@
-from typing import List, Dict
+import asyncio
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple, Union
 from fastapi import WebSocket
+from app.services.broadcast import BroadcastBackend, create_broadcast_backend
+
+# Mensajes pendientes por conexión: si un cliente lento se atrasa, se descartan los más viejos
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "32"))
+# Tiempo máximo de un envío antes de dar la conexión por muerta
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+# Un solo encoder reutilizado (json.dumps con opciones crea uno nuevo en cada llamada)
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+class ClientConnection:
+    """
+    Un socket conectado con su propia cola de salida.
+
+    Una tarea dedicada envía los mensajes en orden; así un teléfono lento solo se
+    atrasa a sí mismo y no a los demás clientes de la misma orden. La cola pertenece
+    al event loop de la conexión: `enqueue` desde otro hilo o loop le pasa el mensaje
+    a ese loop con call_soon_threadsafe.
+    """
+
+    def __init__(self, websocket: WebSocket, order_id: int, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.order_id = order_id
+        self.manager = manager
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.dropped = 0
+        self.task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = self.loop.create_task(self._sender())
+
+    def enqueue(self, text: str):
+        if self.loop is not None and not self._on_own_loop():
+            self.loop.call_soon_threadsafe(self._put, text)
+        else:
+            self._put(text)
+
+    def _on_own_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            # Hilo sin event loop
+            return False
+
+    def _put(self, text: str):
+        if self.queue.full():
+            # Cliente atrasado: priorizar los mensajes más recientes
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(text)
+
+    async def _sender(self):
+        while True:
+            text = await self.queue.get()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error enviando mensaje WS a la orden #{self.order_id}: {e!r}")
+                await self.manager.evict(self)
+                return
+
 
 class ConnectionManager:
-    def __init__(self):
-        # Maps order_id to list of active websockets
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+    """
+    Sockets de tracking abiertos en este worker.
+
+    `broadcast` publica en el backend de difusión (memoria o Redis); el backend
+    devuelve el mensaje a cada worker suscrito, que lo entrega a sus sockets locales.
+    """
+
+    def __init__(self, backend: Optional[BroadcastBackend] = None):
+        self.backend = backend or create_broadcast_backend()
+        # Maps order_id to the active connections (websocket -> ClientConnection)
+        self.active_connections: Dict[int, Dict[WebSocket, ClientConnection]] = {}
+        self.evicted = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """Conecta el backend de difusión (una vez por event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            await self.backend.start(self.deliver_local)
+
+    async def close(self):
+        await self.backend.close()
+        self._loop = None
 
     async def connect(self, websocket: WebSocket, order_id: int):
+        await self.start()
         await websocket.accept()
+        client = ClientConnection(websocket, order_id, self)
         if order_id not in self.active_connections:
-            self.active_connections[order_id] = []
-        self.active_connections[order_id].append(websocket)
+            self.active_connections[order_id] = {}
+            await self.backend.subscribe(order_id)
+        self.active_connections[order_id][websocket] = client
+        client.start()
         print(f"🔌 Cliente conectado a la orden #{order_id}")
 
+    def _remove(self, websocket: WebSocket, order_id: int) -> Optional[ClientConnection]:
+        clients = self.active_connections.get(order_id)
+        if not clients:
+            return None
+        client = clients.pop(websocket, None)
+        if not clients:
+            del self.active_connections[order_id]
+            asyncio.get_running_loop().create_task(self._unsubscribe(order_id))
+        return client
+
+    async def _unsubscribe(self, order_id: int):
+        # Pudo reconectarse alguien a la misma orden mientras tanto
+        if order_id not in self.active_connections:
+            await self.backend.unsubscribe(order_id)
+
     def disconnect(self, websocket: WebSocket, order_id: int):
-        if order_id in self.active_connections:
-            if websocket in self.active_connections[order_id]:
-                self.active_connections[order_id].remove(websocket)
-            if not self.active_connections[order_id]:
-                del self.active_connections[order_id]
+        client = self._remove(websocket, order_id)
+        if client is not None and client.task is not None:
+            client.task.cancel()
         print(f"🔌 Cliente desconectado de la orden #{order_id}")
 
+    async def evict(self, client: ClientConnection):
+        """Saca una conexión que falló o no responde y la cierra"""
+        if self._remove(client.websocket, client.order_id) is None:
+            return
+        self.evicted += 1
+        try:
+            await asyncio.wait_for(client.websocket.close(code=1011), WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+        print(f"🔌 Conexión expulsada de la orden #{client.order_id}")
+
     async def broadcast(self, order_id: int, message: dict):
-        if order_id in self.active_connections:
-            for connection in self.active_connections[order_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error enviando mensaje WS: {e}")
-                    # Podríamos desconectar aquí si falla repetidamente
+        """
+        Publica un mensaje para todos los clientes de la orden, en cualquier worker
+
+        El mensaje se serializa una sola vez; no se espera a los envíos.
+        """
+        await self.start()
+        await self.backend.publish(order_id, _encoder.encode(message))
+
+    async def broadcast_many(self, messages: Iterable[Tuple[int, Union[dict, str]]]):
+        """
+        Publica en lote mensajes de varias órdenes (ej. todas las posiciones de un tick)
+
+        Cada mensaje puede ser un dict o un texto JSON ya serializado.
+        """
+        await self.start()
+        await self.backend.publish_many([
+            (order_id, message if isinstance(message, str) else _encoder.encode(message))
+            for order_id, message in messages
+        ])
+
+    async def deliver_local(self, order_id: int, text: str) -> int:
+        """
+        Encola un mensaje ya serializado en los sockets de este worker
+
+        Returns:
+            Número de conexiones a las que se encoló
+        """
+        clients = self.active_connections.get(order_id)
+        if not clients:
+            return 0
+        for client in list(clients.values()):
+            client.enqueue(text)
+        return len(clients)
 
 manager = ConnectionManager()
@@ -0,0 +1,28 @@
+"""
+Recalcula los acumulados de reseñas y la calificación de todos los negocios
+
+Necesario una vez al actualizar una base existente (las columnas nuevas arrancan
+en cero) y al cambiar RATING_MODE o RATING_HALF_LIFE_DAYS.
+
+Uso (desde la carpeta backend):
+    python backfill_ratings.py
+"""
+
+from app.database import SessionLocal, engine
+from app.schema import upgrade_schema
+from app.services.ratings import RATING_MODE, backfill_ratings
+
+
+def main():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    try:
+        print(f"⭐ Recalculando calificaciones (modo {RATING_MODE})...")
+        ratings = backfill_ratings(db)
+        print(f"✅ {len(ratings)} negocios con reseñas actualizados.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Benchmarks y pruebas de carga (ver el docstring de cada módulo)
+Utilidades compartidas: base SQLite temporal y percentiles de latencia
+"""
+
+import os
+import statistics
+import tempfile
+from typing import Sequence, Tuple
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """
+    Apunta DATABASE_URL a una base SQLite nueva en un directorio temporal
+
+    Debe llamarse antes de importar app.database (el engine se crea al importarlo).
+
+    Returns:
+        Directorio temporal de la base
+    """
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, name)}"
+    return tmp_dir
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Percentil `pct` (0 a 1) de tiempos en segundos, en milisegundos"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000 if values else float("nan")
+
+
+def latency_summary(times: Sequence[float]) -> Tuple[float, float]:
+    """(p50, p95) en milisegundos de tiempos en segundos"""
+    return statistics.median(times) * 1000, percentile(times, 0.95)
@@ -0,0 +1,110 @@
+"""
+Benchmark: carga del dashboard de admin con muchos pedidos
+Compara las consultas anteriores de get_admin_stats (count() de orders, users y
+businesses, SUM(total) y los últimos pedidos por created_at) contra la lectura de
+los contadores materializados, sobre una base SQLite temporal. También mide la
+reconstrucción completa (rebuild_stats) y una consulta por rango de 30 días.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_admin_stats [num_pedidos]
+"""
+
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database()
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import Business, Order, StatsCounter, User  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.stats import range_query, read_counters, rebuild_stats, series_from_rows  # noqa: E402
+
+NUM_ORDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+BUSINESSES = 100
+USERS = 5_000
+STATUSES = ["pendiente", "preparando", "en_camino", "entregado", "cancelado"]
+REPEAT = 20
+
+
+def seed():
+    upgrade_schema(engine)
+    rng = random.Random(1)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(Business), [{"id": b, "name": f"Negocio {b}"} for b in range(1, BUSINESSES + 1)])
+        conn.execute(insert(User), [{"id": u, "email": f"u{u}@delivery.com", "role": "buyer"}
+                                    for u in range(1, USERS + 1)])
+        for start in range(0, NUM_ORDERS, 20_000):
+            rows = []
+            for _ in range(start, min(start + 20_000, NUM_ORDERS)):
+                created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+                status = rng.choice(STATUSES)
+                rows.append({
+                    "user_id": rng.randint(1, USERS), "business_id": rng.randint(1, BUSINESSES),
+                    "total": rng.randint(5, 200) * 1000, "status": status, "created_at": created,
+                    "status_history": [{"status": "pendiente", "timestamp": created.isoformat()},
+                                       {"status": status, "timestamp": (created + timedelta(minutes=20)).isoformat()}],
+                    "products": [],
+                })
+            conn.execute(insert(Order), rows)
+
+
+def legacy_stats(db):
+    """Réplica de get_admin_stats antes de los contadores"""
+    return {
+        "total_orders": db.query(Order).count(),
+        "total_sales": db.query(func.sum(Order.total)).scalar() or 0,
+        "total_users": db.query(User).count(),
+        "total_businesses": db.query(Business).count(),
+        "recent_orders": db.query(Order).order_by(Order.created_at.desc()).limit(5).all(),
+    }
+
+
+def materialized_stats(db):
+    counters = db.execute(select(StatsCounter.key, StatsCounter.value)).all()
+    recent = db.execute(select(Order).order_by(Order.id.desc()).limit(5)).scalars().all()
+    return {**read_counters(counters), "recent_orders": recent}
+
+
+def thirty_days(db):
+    end = datetime.now()
+    return series_from_rows(db.execute(range_query(end - timedelta(days=30), end, "day")).all())
+
+
+def timed(fn):
+    times = []
+    for _ in range(REPEAT):
+        db = SessionLocal()
+        start = time.perf_counter()
+        fn(db)
+        times.append(time.perf_counter() - start)
+        db.close()
+    return statistics.median(times) * 1000
+
+
+def main():
+    seed()
+    db = SessionLocal()
+    start = time.perf_counter()
+    stats = rebuild_stats(db)
+    rebuild = time.perf_counter() - start
+    db.close()
+    assert stats["total_orders"] == NUM_ORDERS
+
+    print(f"{NUM_ORDERS:,} pedidos, {USERS:,} usuarios, {BUSINESSES} negocios "
+          f"(rebuild_stats: {rebuild:.1f}s)\n")
+    print(f"{'consulta':<32} | {'mediana':>10}")
+    print(f"{'dashboard anterior':<32} | {timed(legacy_stats):>7.2f} ms")
+    print(f"{'dashboard materializado':<32} | {timed(materialized_stats):>7.2f} ms")
+    print(f"{'rango 30 días por día':<32} | {timed(thirty_days):>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
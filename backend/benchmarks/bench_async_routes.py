@@ -0,0 +1,129 @@
+"""
+Benchmark: latencia de las rutas con la capa asíncrona de DB
+Levanta el servidor con uvicorn (en otro proceso) sobre una base temporal, abre clientes WebSocket
+de seguimiento y mide la latencia p50/p99 de las rutas de catálogo y pedidos
+bajo carga concurrente, junto con la latencia de ping de los sockets (que
+refleja si el event loop queda bloqueado por las consultas).
+
+Requiere uvicorn con soporte WebSocket (pip install "uvicorn[standard]") y httpx.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_async_routes
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import percentile, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+import websockets  # noqa: E402
+
+from app.auth_utils import get_password_hash  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import Business, Order, Product, User  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+
+PORT = 8765
+BUSINESSES = 50
+PRODUCTS_PER_BUSINESS = 20
+ORDERS = 300
+WS_CLIENTS = 200
+HTTP_WORKERS = 16
+DURATION_SECONDS = 10
+
+
+def seed():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    db.add(User(id=1, email="bench@delivery.com", hashed_password=get_password_hash("bench"),
+                full_name="Bench", role="buyer"))
+    for b in range(1, BUSINESSES + 1):
+        db.add(Business(id=b, name=f"Negocio {b}", category="Restaurante", latitude=6.24, longitude=-75.56,
+                        delivery_time=30, rating=4.5, is_open=True))
+        db.add_all(Product(business_id=b, name=f"Producto {b}-{i}", price=1000 + i, description="...",
+                           category=random.choice(["Comida", "Bebidas", "Postres"]), available=True, source="Local")
+                   for i in range(PRODUCTS_PER_BUSINESS))
+    db.add_all(Order(user_id=1, business_id=random.randint(1, BUSINESSES), customer_name="Bench", total=10_000,
+                     status="entregado", products=[], status_history=[]) for _ in range(ORDERS))
+    db.commit()
+    db.close()
+
+
+async def http_worker(client, token, stop, latencies):
+    rng = random.Random()
+    headers = {"Authorization": f"Bearer {token}"}
+    routes = {
+        "negocios": lambda: "/api/delivery/businesses",
+        "productos negocio": lambda: f"/api/delivery/businesses/{rng.randint(1, BUSINESSES)}/products",
+        "productos categoría": lambda: "/api/delivery/products?category=bebidas",
+        "mis pedidos": lambda: "/api/delivery/orders/mine",
+    }
+    while time.perf_counter() < stop:
+        label = rng.choice(list(routes))
+        start = time.perf_counter()
+        r = await client.get(routes[label](), headers=headers)
+        r.raise_for_status()
+        latencies.setdefault(label, []).append(time.perf_counter() - start)
+
+
+async def ws_client(order_id, stop, pings):
+    async with websockets.connect(f"ws://127.0.0.1:{PORT}/ws/orders/{order_id}") as ws:
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            pong = await ws.ping()
+            await pong
+            pings.append(time.perf_counter() - start)
+            await asyncio.sleep(0.5)
+
+
+async def run_load():
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=30,
+                                 limits=httpx.Limits(max_connections=HTTP_WORKERS)) as client:
+        r = await client.post("/api/auth/token", data={"username": "bench@delivery.com", "password": "bench"})
+        token = r.json()["access_token"]
+        stop = time.perf_counter() + DURATION_SECONDS
+        latencies, pings = {}, []
+        tasks = [ws_client(i % ORDERS + 1, stop, pings) for i in range(WS_CLIENTS)]
+        tasks += [http_worker(client, token, stop, latencies) for _ in range(HTTP_WORKERS)]
+        await asyncio.gather(*tasks)
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{WS_CLIENTS} WebSockets abiertos, {HTTP_WORKERS} clientes HTTP, {DURATION_SECONDS}s "
+          f"→ {total / DURATION_SECONDS:.0f} req/s\n")
+    for route, values in sorted(latencies.items()):
+        print(f"  {route:>20}: p50 {percentile(values, 0.50):7.1f} ms | p99 {percentile(values, 0.99):7.1f} ms "
+              f"| n={len(values)}")
+    if pings:
+        print(f"\n  {'ping WebSocket':>20}: p50 {percentile(pings, 0.50):7.1f} ms | p99 {percentile(pings, 0.99):7.1f} ms "
+              f"| media {statistics.mean(pings) * 1000:.1f} ms")
+
+
+def main():
+    seed()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=os.environ.copy(), stdout=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{PORT}/api/health")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        asyncio.run(run_load())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark: throughput de rutas autenticadas con y sin caché de usuarios
+Corre la app en el mismo proceso (httpx sobre ASGI, sin red) con una base temporal
+y varios vendedores que consultan su dashboard en paralelo. Compara get_current_user
+decodificando el JWT y consultando users en cada petición contra la caché de tokens.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_auth_cache
+"""
+
+import asyncio
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+
+from app.auth_utils import create_access_token  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Business, User  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.auth_cache import principal_cache  # noqa: E402
+
+SELLERS = 50
+CONCURRENCY = 16
+REQUESTS = 4000
+ROUTES = ("/api/auth/me", "/api/delivery/seller/orders?limit=5")
+
+
+def seed():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    tokens = []
+    for i in range(1, SELLERS + 1):
+        business = Business(id=i, name=f"Negocio {i}", category="Restaurante", latitude=6.24, longitude=-75.56)
+        user = User(id=i, email=f"seller{i}@delivery.com", hashed_password="-", full_name=f"Vendedor {i}",
+                    role="seller", business_id=i)
+        db.add_all([business, user])
+        tokens.append(create_access_token({"sub": user.email, "uid": i, "role": "seller"}))
+    db.commit()
+    db.close()
+    return tokens
+
+
+async def run(route, tokens):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(REQUESTS))
+
+        async def worker():
+            for n in counter:
+                r = await client.get(route, headers={"Authorization": f"Bearer {tokens[n % len(tokens)]}"})
+                r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+async def main():
+    tokens = seed()
+    print(f"{SELLERS} vendedores, {CONCURRENCY} clientes concurrentes, {REQUESTS} peticiones por ruta\n")
+    print(f"{'ruta':<38} | {'sin caché':>10} | {'con caché':>10}")
+    for route in ROUTES:
+        principal_cache.max_size = 0  # Cada entrada se descarta al guardarla
+        principal_cache.clear()
+        uncached = await run(route, tokens)
+        principal_cache.max_size = SELLERS * 2
+        principal_cache.clear()
+        cached = await run(route, tokens)
+        print(f"{route:<38} | {uncached:>8,.0f}/s | {cached:>8,.0f}/s")
+    print(f"\n{principal_cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark: difusión entre workers con los backends de pub/sub
+Simula dos workers (dos ConnectionManager con su propio backend) con sockets de
+tracking repartidos entre ambos. Cada mensaje se publica una vez desde el worker A
+y se verifica que llegue a todos los sockets de los dos workers.
+
+El backend Redis se prueba contra un servidor local compatible (fakeredis sobre TCP),
+o contra un Redis real si se pasa su URL.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_broadcast_backends [redis://host:6379/0]
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+
+import app.websockets as ws
+from app.services.broadcast import MemoryBroadcast, RedisBroadcast
+from app.websockets import ConnectionManager
+
+NUM_ORDERS = 50
+SOCKETS_PER_ORDER = 4
+NUM_MESSAGES = 20
+STAND_IN_ADDRESS = ("127.0.0.1", 6390)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.received = {}
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text: str):
+        message = json.loads(text)
+        self.received[(message["order_id"], message["seq"])] = time.perf_counter()
+
+
+def start_stand_in():
+    from fakeredis import TcpFakeServer
+    server = TcpFakeServer(STAND_IN_ADDRESS, server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"redis://{STAND_IN_ADDRESS[0]}:{STAND_IN_ADDRESS[1]}/0"
+
+
+async def run(label, worker_a, worker_b):
+    # La mitad de los sockets de cada orden en cada worker
+    sockets = []
+    for order_id in range(NUM_ORDERS):
+        for i in range(SOCKETS_PER_ORDER):
+            sock = FakeSocket()
+            await (worker_a if i % 2 == 0 else worker_b).connect(sock, order_id)
+            sockets.append((order_id, sock))
+    await asyncio.sleep(0.2)  # Dejar que se confirmen las suscripciones
+
+    sent_at = {}
+    start = time.perf_counter()
+    for seq in range(NUM_MESSAGES):
+        for order_id in range(NUM_ORDERS):
+            sent_at[(order_id, seq)] = time.perf_counter()
+            await worker_a.broadcast(order_id, {"type": "location_update", "order_id": order_id, "seq": seq})
+    publish_time = time.perf_counter() - start
+
+    deadline = time.perf_counter() + 30
+    while any(len(s.received) < NUM_MESSAGES for _, s in sockets) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+
+    missing = sum(NUM_MESSAGES - len(s.received) for _, s in sockets)
+    wrong = sum(1 for order_id, s in sockets for key in s.received if key[0] != order_id)
+    latencies = sorted(t - sent_at[key] for _, s in sockets for key, t in s.received.items())
+    total = NUM_ORDERS * NUM_MESSAGES
+    print(f"{label:<8} | {total / publish_time:>10,.0f} msg/s | {statistics.median(latencies) * 1000:7.2f} ms | "
+          f"{latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms | {missing} | {wrong}")
+    assert missing == 0 and wrong == 0
+
+    for worker in (worker_a, worker_b):
+        await worker.close()
+
+
+async def main():
+    print(f"2 workers, {NUM_ORDERS} órdenes x {SOCKETS_PER_ORDER} sockets, {NUM_MESSAGES} mensajes por orden\n")
+    print(f"{'backend':<8} | {'publicación':>16} | {'p50':>10} | {'p99':>10} | perdidos | cruzados")
+
+    # En memoria cada worker solo ve lo que él mismo publica: se comparte un backend
+    # para medir el costo base de la entrega (equivale a un único proceso)
+    memory = MemoryBroadcast()
+    single = ConnectionManager(memory)
+    await run("memory", single, single)
+
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+    else:
+        _, url = start_stand_in()
+    await run("redis", ConnectionManager(RedisBroadcast(url)), ConnectionManager(RedisBroadcast(url)))
+
+
+if __name__ == "__main__":
+    ws.print = lambda *args, **kwargs: None
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+"""
+Benchmark: importación de un catálogo grande de productos
+Genera un catálogo de 200k SKUs y compara la carga anterior de migrate_db.py
+(json.load del archivo completo y un Product del ORM por fila) contra
+import_catalog de app/services/catalog_import.py en JSON, NDJSON y CSV, sobre
+bases SQLite temporales. También corta una importación a mitad de camino y la
+reanuda desde el checkpoint, y reimporta el archivo con precios nuevos (upsert).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_catalog_import
+"""
+
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+
+from benchmarks import use_temp_database
+
+TMP_DIR = use_temp_database()
+
+from sqlalchemy import create_engine, func, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.models import Business, Product  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services import catalog_import  # noqa: E402
+from app.services.catalog_import import import_catalog  # noqa: E402
+
+SKUS = 200_000
+BUSINESSES = 20
+# Lote en el que se simula la caída durante la prueba de reanudación
+FAIL_AT_BATCH = 20
+
+
+def make_rows(price_offset=0):
+    rng = random.Random(3)
+    for i in range(SKUS):
+        yield {
+            "business_id": i % BUSINESSES + 1, "sku": f"SKU-{i:07d}", "name": f"Producto {i}",
+            "price": rng.randint(1_000, 90_000) + price_offset, "description": "Producto de supermercado",
+            "category": rng.choice(("Lácteos", "Aseo", "Despensa", "Bebidas")), "image": "", "available": True,
+        }
+
+
+def write_files(price_offset=0, suffix=""):
+    paths = {fmt: os.path.join(TMP_DIR, f"catalogo{suffix}.{fmt}") for fmt in ("json", "ndjson", "csv")}
+    with open(paths["json"], "w", encoding="utf-8") as f:
+        f.write("[\n" + ",\n".join(json.dumps(r, ensure_ascii=False) for r in make_rows(price_offset)) + "\n]")
+    with open(paths["ndjson"], "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in make_rows(price_offset))
+    with open(paths["csv"], "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(next(make_rows())))
+        writer.writeheader()
+        writer.writerows(make_rows(price_offset))
+    return paths
+
+
+def new_database(name):
+    engine = create_engine(f"sqlite:///{os.path.join(TMP_DIR, name)}")
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Business), [{"id": b, "name": f"Supermercado {b}"} for b in range(1, BUSINESSES + 1)])
+    return engine, sessionmaker(bind=engine, autoflush=False)
+
+
+def legacy_import(db, path):
+    """Réplica de la carga de productos de migrate_db.py antes de import_catalog"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+        for item in data:
+            db.add(Product(business_id=item["business_id"], name=item["name"], price=item["price"],
+                           description=item["description"], category=item["category"],
+                           available=item.get("available", True), image=item.get("image", ""), source="Local"))
+    db.commit()
+
+
+def measure(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(name, fn):
+    """Pico de memoria de Python en MB, en una corrida aparte (tracemalloc frena la medición de tiempo)"""
+    engine, Session = new_database(name)
+    db = Session()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(db)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    db.close()
+    return peak
+
+
+def count_products(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count(Product.id)))
+
+
+def resume_run(paths):
+    engine, Session = new_database("resume.db")
+    original = catalog_import.upsert_products
+    calls = {"n": 0}
+
+    def failing_upsert(conn, rows):
+        calls["n"] += 1
+        if calls["n"] == FAIL_AT_BATCH:
+            raise RuntimeError("caída simulada")
+        original(conn, rows)
+
+    catalog_import.upsert_products = failing_upsert
+    db = Session()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_catalog(db, paths["ndjson"])
+    except RuntimeError:
+        db.rollback()
+    finally:
+        catalog_import.upsert_products = original
+        db.close()
+    saved = count_products(engine)
+
+    db = Session()
+    stats, elapsed = measure(lambda: import_catalog(db, paths["ndjson"]))
+    db.close()
+    return saved, stats, elapsed, count_products(engine)
+
+
+def main():
+    print(f"Generando catálogo de {SKUS:,} SKUs en {BUSINESSES} negocios...")
+    paths = write_files()
+    sizes = {fmt: os.path.getsize(p) / 1e6 for fmt, p in paths.items()}
+
+    print(f"\n{'carga':<32} | {'tiempo':>7} | {'filas/s':>8} | {'productos':>9}")
+    engine, Session = new_database("legacy.db")
+    db = Session()
+    _, elapsed = measure(lambda: legacy_import(db, paths["json"]))
+    db.close()
+    print(f"{'ORM fila a fila (json)':<32} | {elapsed:>6.1f}s | {SKUS / elapsed:>8,.0f} | {count_products(engine):>9,}")
+
+    for fmt in ("json", "ndjson", "csv"):
+        engine, Session = new_database(f"stream_{fmt}.db")
+        db = Session()
+        _, elapsed = measure(lambda: import_catalog(db, paths[fmt]))
+        db.close()
+        label = f"import_catalog ({fmt}, {sizes[fmt]:.0f} MB)"
+        print(f"{label:<32} | {elapsed:>6.1f}s | {SKUS / elapsed:>8,.0f} | {count_products(engine):>9,}")
+
+    # Reimportación con precios nuevos sobre la última base: actualiza sin duplicar
+    updated = write_files(price_offset=100, suffix="_v2")
+    db = Session()
+    _, elapsed = measure(lambda: import_catalog(db, updated["csv"]))
+    db.close()
+    print(f"{'reimportación (upsert, csv)':<32} | {elapsed:>6.1f}s | {SKUS / elapsed:>8,.0f} | "
+          f"{count_products(engine):>9,}")
+
+    print("\nPico de memoria (json):")
+    print(f"  ORM fila a fila: {peak_memory('legacy_mem.db', lambda db: legacy_import(db, paths['json'])):,.0f} MB")
+    print(f"  import_catalog:  {peak_memory('stream_mem.db', lambda db: import_catalog(db, paths['json'])):,.0f} MB")
+
+    saved, stats, elapsed, total = resume_run(paths)
+    print(f"\nReanudación: caída en el lote {FAIL_AT_BATCH} con {saved:,} productos confirmados; "
+          f"la segunda ejecución leyó {stats.read - stats.resumed_from:,} filas en {elapsed:.1f}s "
+          f"y dejó {total:,} productos")
+
+
+if __name__ == "__main__":
+    main()
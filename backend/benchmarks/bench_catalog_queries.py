@@ -0,0 +1,122 @@
+"""
+Benchmark: listado de productos por categoría con 100k productos
+Compara el filtrado anterior (cargar todos los productos locales y filtrar en Python)
+contra el filtrado en SQL, sin y con los índices compuestos del catálogo.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_catalog_queries [num_productos]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Business, Product
+from app.routes.delivery import catalog_products_query
+
+NUM_PRODUCTS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+NUM_BUSINESSES = 500
+CATEGORIES = ["Comida", "Bebidas", "Panadería", "Lácteos", "Aseo", "Frutas", "Carnes", "Snacks",
+              "Congelados", "Mascotas", "Licores", "Farmacia", "Granos", "Enlatados", "Postres", "Café"]
+CATALOG_INDEXES = ("ix_products_source_category_available", "ix_products_business_available")
+REPEAT = 20
+
+
+def seed(engine):
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(Business.__table__.insert(), [
+            {"id": b, "name": f"Negocio {b}", "latitude": 6.24, "longitude": -75.56} for b in range(1, NUM_BUSINESSES + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [
+            {
+                "id": i,
+                "business_id": rng.randint(1, NUM_BUSINESSES),
+                "name": f"Producto {i}",
+                "price": rng.randint(1000, 50000),
+                "category": rng.choice(CATEGORIES),
+                "available": rng.random() < 0.9,
+                # Parte del catálogo viene de integraciones externas
+                "source": "Local" if rng.random() < 0.8 else "Jumbo",
+            }
+            for i in range(1, NUM_PRODUCTS + 1)
+        ])
+        conn.execute(text("ANALYZE"))
+
+
+def legacy_by_category(db, category):
+    """Réplica del código anterior: todos los productos locales y filtro en Python"""
+    products = db.execute(select(Product).where(Product.source == "Local")).scalars().all()
+    return [p for p in products if p.category and p.category.lower() == category.lower() and p.available]
+
+
+def sql_by_category(db, category):
+    return db.execute(catalog_products_query(category)).scalars().all()
+
+
+def sql_by_business(db, business_id):
+    return db.execute(
+        select(Product).where(Product.business_id == business_id, Product.available == True)
+    ).scalars().all()
+
+
+def measure(Session, fn, args):
+    samples = []
+    for arg in args:
+        with Session() as db:
+            start = time.perf_counter()
+            fn(db, arg)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            for name in CATALOG_INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+        print(f"Sembrando {NUM_PRODUCTS} productos...")
+        seed(engine)
+        Session = sessionmaker(bind=engine)
+
+        rng = random.Random(7)
+        categories = [rng.choice(CATEGORIES).upper() for _ in range(REPEAT)]
+        businesses = [rng.randint(1, NUM_BUSINESSES) for _ in range(REPEAT)]
+
+        results = {
+            "categoría: Python (antes)": measure(Session, legacy_by_category, categories[:5]),
+            "categoría: SQL sin índice": measure(Session, sql_by_category, categories),
+            "negocio: SQL sin índice": measure(Session, sql_by_business, businesses),
+        }
+
+        # Ruta de migración: los mismos índices que upgrade_schema crea en un delivery.db existente
+        with engine.begin() as conn:
+            for index in Product.__table__.indexes:
+                if index.name in CATALOG_INDEXES:
+                    index.create(bind=conn)
+            conn.execute(text("ANALYZE"))
+        results["categoría: SQL con índice"] = measure(Session, sql_by_category, categories)
+        results["negocio: SQL con índice"] = measure(Session, sql_by_business, businesses)
+
+        with Session() as db:
+            expected = {p.id for p in legacy_by_category(db, categories[0])}
+            assert expected == {p.id for p in sql_by_category(db, categories[0])}
+
+        baseline = results["categoría: Python (antes)"]
+        print(f"{'consulta':<28} | {'mediana':>11} | vs antes")
+        for label, ms in results.items():
+            print(f"{label:<28} | {ms:8.2f} ms | {baseline / ms:6.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
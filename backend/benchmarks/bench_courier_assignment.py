@@ -0,0 +1,93 @@
+"""
+Prueba de carga: asignación concurrente de repartidores
+Muchos workers intentan asignar pedidos a repartidores al mismo tiempo y se
+verifica que ningún repartidor ni pedido quede asignado dos veces. La misma
+verificación, en versión corta, corre en test_services.py.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_courier_assignment
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Courier, Order
+from app.services.couriers import assign_courier
+
+COURIERS = 200
+ORDERS = 1_000
+WORKERS = 16
+ATTEMPTS_PER_WORKER = 300
+
+
+def setup_database(path: str):
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    db = Session()
+    db.add_all(Courier(name=f"Repartidor {i}", phone=str(i), lat=6.24, lng=-75.56, available=True)
+               for i in range(COURIERS))
+    db.add_all(Order(customer_name=f"Cliente {i}", status="preparando", business_lat=6.24, business_lng=-75.56)
+               for i in range(ORDERS))
+    db.commit()
+    db.close()
+    return engine, Session
+
+
+def worker(Session, seed: int, results: list):
+    rng = random.Random(seed)
+    db = Session()
+    try:
+        for _ in range(ATTEMPTS_PER_WORKER):
+            courier_id = rng.randint(1, COURIERS)
+            order_id = rng.randint(1, ORDERS)
+            assigned, reason = assign_courier(db, courier_id, order_id)
+            results.append((assigned, reason, courier_id, order_id))
+    finally:
+        db.close()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = setup_database(os.path.join(tmp, "bench.db"))
+        results = []
+        threads = [threading.Thread(target=worker, args=(Session, seed, results)) for seed in range(WORKERS)]
+
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        db = Session()
+        couriers = {c.id: c for c in db.query(Courier).all()}
+        orders = db.query(Order).filter(Order.delivery_person_id.isnot(None)).all()
+
+        # Invariantes: un pedido por repartidor y un repartidor por pedido
+        per_courier = Counter(o.delivery_person_id for o in orders)
+        assert all(n == 1 for n in per_courier.values()), "Repartidor asignado a más de un pedido"
+        for order in orders:
+            courier = couriers[order.delivery_person_id]
+            assert not courier.available and courier.current_order_id == order.id, "Estado inconsistente"
+        wins = [r for r in results if r[0]]
+        assert len(wins) == len(orders) == len(set(r[3] for r in wins)), "Pedido reclamado dos veces"
+        db.close()
+        engine.dispose()
+
+        reasons = Counter(r[1] for r in results)
+        print(f"{len(results)} intentos en {elapsed:.2f}s ({len(results) / elapsed:.0f} asignaciones/s) "
+              f"con {WORKERS} workers")
+        print(f"asignados={reasons['ok']} repartidor_ocupado={reasons['courier']} pedido_tomado={reasons['order']}")
+        print("✅ Sin asignaciones duplicadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Prueba de carga: lecturas y escrituras concurrentes sobre SQLite
+Compara el engine anterior (journal por defecto, sin PRAGMAs) contra
+create_db_engine (WAL, synchronous=NORMAL, busy_timeout, mmap y cache)
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_db_concurrency
+"""
+
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, create_db_engine
+from app.models import Business, Order
+
+READERS = 8
+WRITERS = 4
+DURATION_SECONDS = 5
+BUSINESSES = 20
+SEED_ORDERS = 5_000
+
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all(Business(id=i, name=f"Negocio {i}", latitude=6.24, longitude=-75.56) for i in range(1, BUSINESSES + 1))
+    db.add_all(Order(business_id=random.randint(1, BUSINESSES), customer_name="Cliente", total=10_000,
+                     status="pendiente", products=[], status_history=[]) for _ in range(SEED_ORDERS))
+    db.commit()
+    db.close()
+
+
+def run(label: str, engine):
+    seed(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    stop = time.perf_counter() + DURATION_SECONDS
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader(seed_value):
+        rng = random.Random(seed_value)
+        local = errors = 0
+        while time.perf_counter() < stop:
+            db = Session()
+            try:
+                db.query(Order).filter(Order.business_id == rng.randint(1, BUSINESSES)) \
+                    .order_by(Order.id.desc()).limit(20).all()
+                local += 1
+            except OperationalError:
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            counts["reads"] += local
+            counts["errors"] += errors
+
+    def writer(seed_value):
+        rng = random.Random(seed_value)
+        local = errors = 0
+        while time.perf_counter() < stop:
+            db = Session()
+            try:
+                db.add(Order(business_id=rng.randint(1, BUSINESSES), customer_name="Cliente", total=5_000,
+                             status="pendiente", products=[{"product_id": 1, "quantity": 1}], status_history=[]))
+                db.commit()
+                local += 1
+            except OperationalError:
+                db.rollback()
+                errors += 1
+            finally:
+                db.close()
+        with lock:
+            counts["writes"] += local
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(100 + i,)) for i in range(WRITERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+
+    print(f"{label:>10} | lecturas {counts['reads'] / DURATION_SECONDS:8.0f}/s | "
+          f"escrituras {counts['writes'] / DURATION_SECONDS:7.0f}/s | errores (database is locked) {counts['errors']}")
+
+
+if __name__ == "__main__":
+    print(f"{READERS} lectores + {WRITERS} escritores durante {DURATION_SECONDS}s\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        before = os.path.join(tmp, "antes.db")
+        run("antes", create_engine(f"sqlite:///{before}", connect_args={"check_same_thread": False}))
+        after = os.path.join(tmp, "despues.db")
+        run("después", create_db_engine(f"sqlite:///{after}"))
@@ -0,0 +1,164 @@
+"""
+Benchmark: descubrimiento de negocios cercanos con 50k negocios
+Corre la app en el mismo proceso (httpx sobre ASGI, sin red) con una base temporal
+y compara:
+
+- Antes: GET /api/delivery/businesses (todos los negocios, servidos desde la caché
+  del catálogo) y el orden por cercanía hecho en el cliente.
+- Consulta SQL por rectángulo de coordenadas y puntaje en Python, sin índice espacial.
+- GET /api/delivery/businesses/discover: GeoGrid precalculado, solo las celdas
+  cercanas, con paginación por cursor.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_discovery
+"""
+
+import asyncio
+import math
+import random
+import statistics
+import time
+
+from benchmarks import latency_summary, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.database import AsyncSessionLocal, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Business  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.business_index import (  # noqa: E402
+    DISCOVERY_WEIGHT_DISTANCE, business_index, static_score
+)
+from app.utils import calculate_distance  # noqa: E402
+
+BUSINESSES = 50_000
+OPEN_RATE = 0.85
+REQUESTS = 50
+PAGE_SIZE = 20
+RADII_KM = (2, 5, 10)
+# Área metropolitana de Medellín
+LAT_RANGE = (6.10, 6.40)
+LNG_RANGE = (-75.70, -75.45)
+
+
+def seed():
+    upgrade_schema(engine)
+    rng = random.Random(5)
+    with engine.begin() as conn:
+        conn.execute(insert(Business), [
+            {"id": b, "name": f"Negocio {b}", "category": rng.choice(("Restaurante", "Farmacia", "Supermercado")),
+             "address": f"Calle {b % 100} # {b % 80}-{b % 50}", "phone": "3000000000",
+             "latitude": rng.uniform(*LAT_RANGE), "longitude": rng.uniform(*LNG_RANGE),
+             "rating": round(rng.uniform(3.0, 5.0), 1), "delivery_time": rng.randint(10, 60),
+             "is_open": rng.random() < OPEN_RATE}
+            for b in range(1, BUSINESSES + 1)
+        ])
+
+
+def customers(n):
+    rng = random.Random(9)
+    return [(rng.uniform(6.20, 6.30), rng.uniform(-75.62, -75.53)) for _ in range(n)]
+
+
+def client_side_rank(businesses, lat, lng, radius_km):
+    """Lo que hacía el frontend con el listado completo"""
+    ranked = []
+    for b in businesses:
+        if not b["is_open"]:
+            continue
+        distance = calculate_distance(lat, lng, b["latitude"], b["longitude"])
+        if distance <= radius_km:
+            score = static_score(b["rating"], b["delivery_time"]) + DISCOVERY_WEIGHT_DISTANCE * (1 - distance / radius_km)
+            ranked.append((-score, b["id"]))
+    ranked.sort()
+    return ranked[:PAGE_SIZE]
+
+
+def bbox_rank(lat, lng, radius_km):
+    """Alternativa sin índice espacial: rectángulo en SQL y puntaje en Python"""
+    dlat = radius_km / 111.32
+    dlng = radius_km / (111.32 * math.cos(math.radians(lat)))
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Business.id, Business.latitude, Business.longitude, Business.rating, Business.delivery_time)
+            .where(Business.is_open == True,
+                   Business.latitude.between(lat - dlat, lat + dlat),
+                   Business.longitude.between(lng - dlng, lng + dlng))
+        ).all()
+        ranked = []
+        for business_id, b_lat, b_lng, rating, delivery_time in rows:
+            distance = calculate_distance(lat, lng, b_lat, b_lng)
+            if distance <= radius_km:
+                score = static_score(rating, delivery_time) + DISCOVERY_WEIGHT_DISTANCE * (1 - distance / radius_km)
+                ranked.append((-score, business_id))
+        ranked.sort()
+        page = [business_id for _, business_id in ranked[:PAGE_SIZE]]
+        return db.execute(select(Business).where(Business.id.in_(page))).scalars().all()
+
+
+async def main():
+    seed()
+    points = customers(REQUESTS)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        print(f"{BUSINESSES:,} negocios ({OPEN_RATE:.0%} abiertos), {REQUESTS} clientes, página de {PAGE_SIZE}\n")
+
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            await db.run_sync(business_index.reload)
+            print(f"Carga del índice espacial: {(time.perf_counter() - start) * 1000:.0f} ms "
+                  f"({len(business_index.grid.cells):,} celdas)\n")
+
+        await client.get("/api/delivery/businesses")  # llenar la caché del catálogo
+        times, size = [], 0
+        for lat, lng in points[:10]:
+            start = time.perf_counter()
+            r = await client.get("/api/delivery/businesses")
+            client_side_rank(r.json()["businesses"], lat, lng, 5)
+            times.append(time.perf_counter() - start)
+            size = len(r.content)
+        p50, p95 = latency_summary(times)
+        print(f"Antes: listado completo ({size / 1e6:.1f} MB por respuesta) + orden en el cliente (5 km): "
+              f"p50 {p50:.0f} ms, p95 {p95:.0f} ms\n")
+
+        print(f"{'radio':>6} | {'rectángulo SQL p50':>18} | {'discover p50':>12} | {'discover p95':>12} | "
+              f"{'página 5 p50':>12} | {'abiertos en radio':>17}")
+        for radius in RADII_KM:
+            bbox_times, times, deep_times, totals = [], [], [], []
+            for lat, lng in points:
+                start = time.perf_counter()
+                bbox_rank(lat, lng, radius)
+                bbox_times.append(time.perf_counter() - start)
+
+                params = {"lat": lat, "lng": lng, "radius_km": radius, "limit": PAGE_SIZE}
+                start = time.perf_counter()
+                r = await client.get("/api/delivery/businesses/discover", params=params)
+                times.append(time.perf_counter() - start)
+                body = r.json()
+                totals.append(body["total"])
+
+                # Recorrer hasta la quinta página con el cursor y medir la última
+                cursor, elapsed = body["next_cursor"], 0.0
+                for _ in range(4):
+                    if not cursor:
+                        break
+                    start = time.perf_counter()
+                    body = (await client.get("/api/delivery/businesses/discover",
+                                             params={**params, "cursor": cursor})).json()
+                    elapsed = time.perf_counter() - start
+                    cursor = body["next_cursor"]
+                if elapsed:
+                    deep_times.append(elapsed)
+            bbox_p50, _ = latency_summary(bbox_times)
+            p50, p95 = latency_summary(times)
+            deep_p50, _ = latency_summary(deep_times) if deep_times else (float("nan"), None)
+            print(f"{radius:>3} km | {bbox_p50:>15.1f} ms | {p50:>9.1f} ms | {p95:>9.1f} ms | "
+                  f"{deep_p50:>9.1f} ms | {statistics.median(totals):>17,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
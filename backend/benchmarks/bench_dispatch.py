@@ -0,0 +1,95 @@
+"""
+Benchmark: despacho de pedidos
+Simula varias ventanas de pedidos y compara la distancia total de recogida y la
+latencia de asignación de:
+  - "primero disponible" (comportamiento anterior: Courier.available == True .first())
+  - greedy (el par más cercano primero)
+  - batch (asignación óptima con el algoritmo húngaro)
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_dispatch
+"""
+
+import random
+import time
+
+from app.services.dispatch import plan_assignments
+from app.services.spatial import GeoGrid
+from app.utils import calculate_distance
+
+LAT_RANGE = (6.15, 6.35)
+LNG_RANGE = (-75.65, -75.50)
+
+COURIERS = 400
+WINDOWS = 60
+ORDERS_PER_WINDOW = 40
+BUSY_WINDOWS = 5  # Ventanas que un repartidor tarda en quedar libre otra vez
+
+
+def random_point(rng):
+    return (rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+
+
+def simulate(strategy: str, seed: int = 1):
+    rng = random.Random(seed)
+    positions = {i: random_point(rng) for i in range(COURIERS)}
+    busy_until = {i: -1 for i in range(COURIERS)}
+    grid = GeoGrid()
+    for cid, (lat, lng) in positions.items():
+        grid.upsert(cid, lat, lng)
+
+    total_km = 0.0
+    assigned = unassigned = 0
+    solve_ms = []
+
+    for window in range(WINDOWS):
+        # Liberar repartidores que terminaron su entrega
+        for cid, until in busy_until.items():
+            if until == window:
+                grid.set_available(cid, True)
+
+        orders = [(random_point(rng), random_point(rng)) for _ in range(ORDERS_PER_WINDOW)]
+        pickups = [pickup for pickup, _ in orders]
+
+        start = time.perf_counter()
+        if strategy == "first":
+            available = sorted(cid for cid, ok in grid.available.items() if ok)
+            pairs = list(zip(range(len(pickups)), range(len(available))))
+            candidates = available
+        else:
+            candidate_ids = set()
+            for lat, lng in pickups:
+                candidate_ids.update(cid for cid, _ in grid.nearest(lat, lng, k=len(pickups) + 4))
+            candidates = sorted(candidate_ids)
+            pairs = plan_assignments(pickups, [grid.positions[c] for c in candidates], mode=strategy)
+        solve_ms.append((time.perf_counter() - start) * 1000)
+
+        for row, col in pairs:
+            cid = candidates[col]
+            pickup, dropoff = orders[row]
+            total_km += calculate_distance(*grid.positions[cid], *pickup)
+            # El repartidor termina en la dirección del cliente
+            grid.upsert(cid, dropoff[0], dropoff[1], available=False)
+            busy_until[cid] = window + BUSY_WINDOWS
+        assigned += len(pairs)
+        unassigned += len(orders) - len(pairs)
+
+    solve_ms.sort()
+    return {
+        "km": total_km,
+        "assigned": assigned,
+        "unassigned": unassigned,
+        "p50": solve_ms[len(solve_ms) // 2],
+        "p99": solve_ms[int(len(solve_ms) * 0.99) - 1],
+    }
+
+
+if __name__ == "__main__":
+    print(f"{COURIERS} repartidores, {WINDOWS} ventanas x {ORDERS_PER_WINDOW} pedidos\n")
+    baseline = None
+    for name in ("first", "greedy", "batch"):
+        r = simulate(name)
+        baseline = baseline or r["km"]
+        print(f"{name:>7} | km recogida {r['km']:9.1f} ({r['km'] / baseline * 100:5.1f}%) | "
+              f"km/pedido {r['km'] / max(r['assigned'], 1):5.2f} | asignados {r['assigned']} "
+              f"sin repartidor {r['unassigned']} | latencia p50 {r['p50']:6.2f} ms p99 {r['p99']:6.2f} ms")
@@ -0,0 +1,69 @@
+"""
+Benchmark: motor de distancias vectorizado
+Compara calculate_distance (escalar) contra distances_from / distance_matrix
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_distance
+"""
+
+import random
+import time
+
+import numpy as np
+
+from app.utils import calculate_distance, distances_from, distance_matrix
+
+LAT_RANGE = (6.15, 6.35)
+LNG_RANGE = (-75.65, -75.50)
+
+
+def random_points(n: int, seed: int):
+    rng = random.Random(seed)
+    return [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(n)]
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def one_to_many(n: int):
+    origin = random_points(1, 1)[0]
+    points = random_points(n, 2)
+    lats = np.array([p[0] for p in points])
+    lngs = np.array([p[1] for p in points])
+
+    scalar_ms = timed(lambda: [calculate_distance(origin[0], origin[1], lat, lng) for lat, lng in points])
+    hav_ms = timed(lambda: distances_from(origin[0], origin[1], lats, lngs))
+    eq_ms = timed(lambda: distances_from(origin[0], origin[1], lats, lngs, mode="equirectangular"))
+
+    exact = distances_from(origin[0], origin[1], lats, lngs)
+    approx = distances_from(origin[0], origin[1], lats, lngs, mode="equirectangular")
+    max_err_m = float(np.max(np.abs(exact - approx))) * 1000
+
+    print(f"1→{n:<8} escalar {scalar_ms:9.2f} ms | haversine {hav_ms:7.3f} ms ({scalar_ms / hav_ms:6.1f}x) | "
+          f"equirect {eq_ms:7.3f} ms ({scalar_ms / eq_ms:6.1f}x) | error máx {max_err_m:.3f} m")
+
+
+def many_to_many(n: int, m: int):
+    origins = random_points(n, 3)
+    destinations = random_points(m, 4)
+
+    scalar_ms = timed(lambda: [[calculate_distance(a, b, c, d) for c, d in destinations] for a, b in origins],
+                      repeat=1)
+    matrix_ms = timed(lambda: distance_matrix(origins, destinations))
+    eq_ms = timed(lambda: distance_matrix(origins, destinations, mode="equirectangular"))
+
+    print(f"{n}x{m:<6} escalar {scalar_ms:9.2f} ms | haversine {matrix_ms:7.3f} ms ({scalar_ms / matrix_ms:6.1f}x) | "
+          f"equirect {eq_ms:7.3f} ms ({scalar_ms / eq_ms:6.1f}x)")
+
+
+if __name__ == "__main__":
+    for size in (100, 10_000, 1_000_000):
+        one_to_many(size)
+    for n, m in ((50, 50), (200, 500), (1000, 1000)):
+        many_to_many(n, m)
@@ -0,0 +1,127 @@
+"""
+Benchmark: latencia de solicitud con y sin la cola de correos
+Levanta un servidor SMTP local (aiosmtpd) que simula la latencia de un proveedor real
+y compara el envío anterior (conexión nueva y envío síncrono dentro de la solicitud)
+contra EmailQueue (encolar y enviar en segundo plano sobre conexiones reutilizadas).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_email_queue [num_correos]
+"""
+
+import asyncio
+import smtplib
+import statistics
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from aiosmtpd.controller import Controller
+
+from app.services.email_queue import EmailQueue, OutgoingEmail, SMTPConnection
+
+NUM_EMAILS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+HOST, PORT = "127.0.0.1", 8025
+# Latencia simulada del proveedor: saludo (equivale a TLS + login) y cada DATA
+HANDSHAKE_DELAY = 0.05
+DATA_DELAY = 0.005
+SENDER = "pedidos@delivery.local"
+BODY = "<html><body><h2>Tu pedido está en movimiento</h2><p>Estado: EN CAMINO</p></body></html>"
+
+
+class SlowHandler:
+    """Acepta todo, contando conexiones y mensajes, con la latencia configurada"""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE_DELAY)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(DATA_DELAY)
+        self.messages += 1
+        return "250 OK"
+
+
+def legacy_send(to_email: str, subject: str, body: str):
+    """Réplica de _send_real_email anterior: conexión nueva por correo, dentro de la solicitud"""
+    msg = MIMEMultipart()
+    msg['From'] = SENDER
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    server = smtplib.SMTP(HOST, PORT)
+    server.sendmail(SENDER, to_email, msg.as_string())
+    server.quit()
+
+
+async def handle_request(mode: str, queue: EmailQueue, i: int) -> float:
+    """Simula la parte de correo de update_order_status y retorna su latencia"""
+    start = time.perf_counter()
+    if mode == "legacy":
+        legacy_send(f"cliente{i}@test.com", f"Actualización de Pedido #{i}", BODY)
+    else:
+        await queue.submit(OutgoingEmail(f"cliente{i}@test.com", f"Actualización de Pedido #{i}", BODY))
+    return time.perf_counter() - start
+
+
+async def loop_lag(stop: asyncio.Event, samples: list):
+    """Mide cuánto se retrasa el event loop (otras solicitudes esperando)"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - start - 0.001)
+
+
+async def run(mode: str, handler: SlowHandler):
+    handler.connections = handler.messages = 0
+    queue = EmailQueue(connection_factory=lambda: SMTPConnection(HOST, PORT, SENDER, starttls=False),
+                       pool_size=4, max_size=NUM_EMAILS)
+    stop, lag = asyncio.Event(), []
+    lag_task = asyncio.create_task(loop_lag(stop, lag))
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(handle_request(mode, queue, i) for i in range(NUM_EMAILS)))
+    responded = time.perf_counter() - start
+    await queue.drain()
+    delivered = time.perf_counter() - start
+    await queue.close()
+    stop.set()
+    await lag_task
+
+    latencies = sorted(latencies)
+    return {
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "responded": responded,
+        "delivered": delivered,
+        "lag": max(lag, default=0) * 1000,
+        "connections": handler.connections,
+        "messages": handler.messages,
+    }
+
+
+async def main():
+    handler = SlowHandler()
+    controller = Controller(handler, hostname=HOST, port=PORT)
+    controller.start()
+    try:
+        print(f"{NUM_EMAILS} solicitudes concurrentes que envían un correo cada una\n")
+        print(f"{'modo':<12} | {'p50':>9} | {'p99':>9} | {'respuestas':>10} | {'entregados':>10} | "
+              f"{'lag loop':>9} | conexiones")
+        for mode in ("legacy", "queue"):
+            r = await run(mode, handler)
+            assert r["messages"] == NUM_EMAILS, r
+            print(f"{mode:<12} | {r['p50']:6.2f} ms | {r['p99']:6.2f} ms | {r['responded']:8.2f} s | "
+                  f"{r['delivered']:8.2f} s | {r['lag']:6.1f} ms | {r['connections']}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
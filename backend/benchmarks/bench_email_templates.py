@@ -0,0 +1,118 @@
+"""
+Benchmark: mensajes por segundo al preparar correos de actualización de estado
+Compara el código anterior (f-string + MIMEMultipart por mensaje) contra las
+plantillas Jinja2 precompiladas con caché, mensaje a mensaje y en lote.
+Mide hasta tener el mensaje MIME listo para enviar (sin SMTP).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_email_templates [num_mensajes]
+"""
+
+import random
+import sys
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from app.services.email_templates import EmailTemplates, status_label
+
+NUM_MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+STATUSES = ("preparando", "en_camino", "entregado", "cancelado")
+SENDER = "pedidos@delivery.local"
+
+
+def legacy_body(order_id: int, new_status: str):
+    """Réplica del f-string de send_status_update anterior"""
+    subject = f"Actualización de Pedido #{order_id}"
+    body = f"""
+        <html>
+          <body>
+            <h2>Tu pedido está en movimiento</h2>
+            <p>El estado de tu pedido #{order_id} ha cambiado a:</p>
+            <h3 style="color: #D4AF37;">{new_status.upper().replace('_', ' ')}</h3>
+            <p>Puedes seguirlo en tiempo real en la aplicación.</p>
+          </body>
+        </html>
+        """
+    return subject, body
+
+
+def legacy_message(to_email: str, order_id: int, new_status: str) -> str:
+    """Réplica de send_status_update + _send_real_email anteriores"""
+    subject, body = legacy_body(order_id, new_status)
+    msg = MIMEMultipart()
+    msg['From'] = SENDER
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html'))
+    return msg.as_string()
+
+
+def mime(to_email: str, subject: str, body: str) -> str:
+    msg = MIMEText(body, 'html')
+    msg['From'] = SENDER
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    return msg.as_string()
+
+
+def run_legacy(updates):
+    return [legacy_message(*u) for u in updates]
+
+
+def run_single(templates, updates, render_only=False):
+    out = []
+    for to_email, order_id, status in updates:
+        body = templates.render("status_update", "es", order_id=order_id, status_label=status_label(status, "es"))
+        if render_only:
+            out.append(body)
+        else:
+            out.append(mime(to_email, templates.subject("status_update", "es", order_id=order_id), body))
+    return out
+
+
+def run_batch(templates, updates, render_only=False):
+    bodies = templates.render_batch("status_update", [
+        {"order_id": order_id, "status_label": status_label(status, "es")} for _, order_id, status in updates
+    ], "es")
+    if render_only:
+        return bodies
+    return [mime(to_email, templates.subject("status_update", "es", order_id=order_id), body)
+            for (to_email, order_id, _), body in zip(updates, bodies)]
+
+
+def run_uncached(templates, updates):
+    """Jinja2 sin la caché de esqueletos: un render completo por mensaje"""
+    template = templates.templates["es/status_update.html"]
+    return [template.render(order_id=order_id, status_label=status_label(status, "es"))
+            for _, order_id, status in updates]
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} | {NUM_MESSAGES / elapsed:>12,.0f} msg/s")
+
+
+def main():
+    rng = random.Random(1)
+    updates = [(f"cliente{i}@test.com", i, rng.choice(STATUSES)) for i in range(NUM_MESSAGES)]
+
+    start = time.perf_counter()
+    templates = EmailTemplates()
+    print(f"Compilación de {len(templates.templates)} plantillas: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'variante':<36} | {'throughput':>16}")
+    measure("solo HTML: f-string (antes)", lambda: [legacy_body(order_id, status) for _, order_id, status in updates])
+    measure("solo HTML: Jinja2 sin caché", lambda: run_uncached(templates, updates))
+    measure("solo HTML: plantillas con caché", lambda: run_single(templates, updates, render_only=True))
+    measure("solo HTML: render_batch", lambda: run_batch(templates, updates, render_only=True))
+    measure("MIME completo: antes", lambda: run_legacy(updates))
+    measure("MIME completo: plantillas", lambda: run_single(templates, updates))
+    measure("MIME completo: render_batch", lambda: run_batch(templates, updates))
+    print(f"\nCaché: {templates.stats()}")
+
+
+if __name__ == "__main__":
+    main()
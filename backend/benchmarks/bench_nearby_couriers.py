@@ -0,0 +1,79 @@
+"""
+Benchmark: búsqueda de repartidores cercanos
+Compara el recorrido lineal original contra el índice espacial GeoGrid
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_nearby_couriers
+"""
+
+import random
+import time
+
+from app.services.spatial import GeoGrid
+from app.utils import calculate_distance
+
+# Área aproximada de Medellín
+LAT_RANGE = (6.15, 6.35)
+LNG_RANGE = (-75.65, -75.50)
+QUERIES = 200
+
+
+def make_couriers(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "lat": rng.uniform(*LAT_RANGE),
+            "lng": rng.uniform(*LNG_RANGE),
+            "available": rng.random() < 0.7,
+        }
+        for i in range(n)
+    ]
+
+
+def linear_scan(couriers, lat, lng, max_distance):
+    """Réplica del algoritmo original de get_nearby_couriers"""
+    nearby = []
+    for courier in couriers:
+        if not courier.get("available", True):
+            continue
+        distance = calculate_distance(lat, lng, courier["lat"], courier["lng"])
+        if distance <= max_distance:
+            nearby.append((courier["id"], distance))
+    nearby.sort(key=lambda x: x[1])
+    return nearby
+
+
+def run(n: int, max_distance: float = 2.0):
+    couriers = make_couriers(n)
+    rng = random.Random(7)
+    points = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(QUERIES)]
+
+    start = time.perf_counter()
+    index = GeoGrid()
+    for c in couriers:
+        index.upsert(c["id"], c["lat"], c["lng"], c["available"])
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = [linear_scan(couriers, lat, lng, max_distance) for lat, lng in points]
+    linear_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+    start = time.perf_counter()
+    got = [index.within_radius(lat, lng, max_distance) for lat, lng in points]
+    radius_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+    start = time.perf_counter()
+    for lat, lng in points:
+        index.nearest(lat, lng, k=5)
+    knn_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+    assert [r[0] for r in expected[0]] == [r[0] for r in got[0]], "Resultados distintos"
+
+    print(f"{n:>7} repartidores | build {build_ms:8.1f} ms | lineal {linear_ms:8.3f} ms/q | "
+          f"radio {radius_ms:7.3f} ms/q ({linear_ms / radius_ms:5.1f}x) | k-NN(5) {knn_ms:7.3f} ms/q")
+
+
+if __name__ == "__main__":
+    for size in (1_000, 10_000, 100_000):
+        run(size)
@@ -0,0 +1,84 @@
+"""
+Benchmark: creación de pedidos según el tamaño del carrito
+Compara la resolución anterior (una consulta por línea del carrito) contra
+price_order_items (una sola consulta IN), incluyendo el INSERT del pedido.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_order_creation
+"""
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import Base, create_async_db_engine
+from app.models import Business, Order, Product
+from app.routes.delivery import price_order_items
+
+CART_SIZES = (1, 10, 50, 100, 200)
+REPEAT = 30
+
+
+async def legacy_price(db, items):
+    """Réplica del bucle original: un SELECT por cada producto del carrito"""
+    total = 0
+    order_products = []
+    for item in items:
+        result = await db.execute(select(Product).where(Product.id == item["product_id"]))
+        product = result.scalars().first()
+        if not product:
+            continue
+        quantity = item.get("quantity", 1)
+        total += product.price * quantity
+        order_products.append({"product_id": product.id, "product_name": product.name, "quantity": quantity,
+                               "unit_price": product.price, "subtotal": product.price * quantity,
+                               "image": product.image})
+    return order_products, total
+
+
+async def create(Session, items, mode):
+    async with Session() as db:
+        if mode == "legacy":
+            order_products, total = await legacy_price(db, items)
+        else:
+            order_products, total = await price_order_items(db, 1, items)
+        db.add(Order(business_id=1, customer_name="Bench", products=order_products, total=total,
+                     status="pendiente", status_history=[]))
+        await db.commit()
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_db_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        async with Session() as db:
+            db.add(Business(id=1, name="Supermercado", latitude=6.24, longitude=-75.56, delivery_time=30))
+            db.add_all(Product(id=i, business_id=1, name=f"Producto {i}", price=1000 + i, available=True,
+                               source="Local") for i in range(1, max(CART_SIZES) + 1))
+            await db.commit()
+
+        print(f"{'líneas':>7} | {'N+1 (antes)':>12} | {'IN (ahora)':>12} | mejora")
+        for size in CART_SIZES:
+            items = [{"product_id": i, "quantity": 2} for i in range(1, size + 1)]
+            results = {}
+            for mode in ("legacy", "batched"):
+                samples = []
+                for _ in range(REPEAT):
+                    start = time.perf_counter()
+                    await create(Session, items, mode)
+                    samples.append(time.perf_counter() - start)
+                results[mode] = statistics.median(samples) * 1000
+            print(f"{size:>7} | {results['legacy']:9.2f} ms | {results['batched']:9.2f} ms | "
+                  f"{results['legacy'] / results['batched']:5.1f}x")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
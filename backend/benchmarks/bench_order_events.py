@@ -0,0 +1,116 @@
+"""
+Benchmark: costo de registrar un cambio de estado según el largo del historial
+Compara la versión anterior de update_order_status (copia status_history, agrega
+una entrada y reescribe el JSON completo) contra el INSERT en order_events de
+app/services/order_events.py, sobre una base SQLite temporal. También mide la
+reproducción en streaming del log (replay_events).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_order_events
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database()
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import Business, Order, OrderEvent  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.order_events import replay_events, set_actor  # noqa: E402
+
+HISTORY_LENGTHS = (10, 100, 1_000, 10_000)
+TRANSITIONS = 30
+STATUSES = ("preparando", "en_camino")
+REPLAY_EVENTS = 500_000
+
+
+def legacy_transition(db, order_id, status):
+    """Réplica de update_order_status antes del log de eventos"""
+    order = db.get(Order, order_id)
+    order.status = status
+    history = list(order.status_history or [])
+    history.append({"status": status, "timestamp": datetime.now().isoformat(), "updated_by": "admin@delivery.com"})
+    order.status_history = history
+    order.updated_at = datetime.now()
+    db.commit()
+
+
+def event_transition(db, order_id, status):
+    order = db.get(Order, order_id)
+    order.status = status
+    set_actor(db, "admin@delivery.com")
+    order.updated_at = datetime.now()
+    db.commit()
+
+
+def seed_order(history_length):
+    start = datetime.now() - timedelta(days=30)
+    entries = [(start + timedelta(seconds=i), STATUSES[i % 2]) for i in range(history_length)]
+    with engine.begin() as conn:
+        legacy_id = conn.execute(insert(Order).values(
+            business_id=1, total=10_000, status=entries[-1][1], products=[],
+            status_history=[{"status": s, "timestamp": ts.isoformat(), "updated_by": "admin@delivery.com"}
+                            for ts, s in entries],
+        )).inserted_primary_key[0]
+        events_id = conn.execute(insert(Order).values(
+            business_id=1, total=10_000, status=entries[-1][1], products=[], status_history=[],
+        )).inserted_primary_key[0]
+        conn.execute(insert(OrderEvent), [
+            {"order_id": events_id, "ts": ts, "status": s, "actor": "admin@delivery.com"} for ts, s in entries
+        ])
+    return legacy_id, events_id
+
+
+def measure(fn, order_id):
+    times = []
+    for i in range(TRANSITIONS):
+        db = SessionLocal()
+        start = time.perf_counter()
+        fn(db, order_id, STATUSES[i % 2])
+        times.append(time.perf_counter() - start)
+        db.close()
+    return statistics.median(times) * 1000
+
+
+def replay():
+    with engine.begin() as conn:
+        order_id = conn.execute(insert(Order).values(business_id=1, total=1, status="entregado", products=[])
+                                ).inserted_primary_key[0]
+        start = datetime.now() - timedelta(days=90)
+        for offset in range(0, REPLAY_EVENTS, 50_000):
+            conn.execute(insert(OrderEvent), [
+                {"order_id": order_id, "ts": start + timedelta(seconds=i), "status": STATUSES[i % 2]}
+                for i in range(offset, offset + 50_000)
+            ])
+    db = SessionLocal()
+    start = time.perf_counter()
+    count = sum(1 for _ in replay_events(db))
+    elapsed = time.perf_counter() - start
+    db.close()
+    return count, elapsed
+
+
+def main():
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Business), [{"id": 1, "name": "Negocio 1"}])
+
+    print(f"{'historial':>10} | {'JSON anterior':>13} | {'order_events':>12}")
+    for length in HISTORY_LENGTHS:
+        legacy_id, events_id = seed_order(length)
+        legacy = measure(legacy_transition, legacy_id)
+        appended = measure(event_transition, events_id)
+        print(f"{length:>10,} | {legacy:>10.2f} ms | {appended:>9.2f} ms")
+
+    count, elapsed = replay()
+    print(f"\nreplay_events: {count:,} eventos en {elapsed:.2f}s ({count / elapsed:,.0f} eventos/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Prueba de carga: creación de pedidos con reintentos de los clientes
+Corre la app en el mismo proceso (httpx sobre ASGI, sin red) con una base temporal.
+Varios clientes crean pedidos en paralelo y una parte de ellos reintenta: reenvía
+la misma solicitud mientras la primera sigue en curso (timeout del cliente) o
+después de recibir la respuesta (respuesta perdida). Compara pedidos/s y pedidos
+duplicados sin y con el header Idempotency-Key.
+
+El correo de confirmación pasa por la cola interna de trabajos como en producción;
+la demo de seguimiento (que avanza el pedido durante más de un minuto) se desactiva.
+Las rutas se calculan sobre el grafo vial de prueba (data/road_graph_fixture.osm).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_order_ingestion
+"""
+
+import asyncio
+import contextlib
+import io
+import random
+import time
+import uuid
+
+from benchmarks import percentile, use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.auth_utils import create_access_token  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Business, Order, Product, User  # noqa: E402
+from app.routes import delivery  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.email import email_queue  # noqa: E402
+from app.services.routing import ROAD_GRAPH_FIXTURE, road_router  # noqa: E402
+from app.services.work_queue import work_queue  # noqa: E402
+
+BUYERS = 200
+BUSINESSES = 20
+PRODUCTS_PER_BUSINESS = 20
+CONCURRENCY = 32
+ORDERS = 2000
+# Fracción de pedidos que el cliente reenvía mientras la primera solicitud sigue en curso
+INFLIGHT_RETRY_RATE = 0.2
+# Fracción de pedidos que el cliente reenvía después de recibir la respuesta
+LATE_RETRY_RATE = 0.1
+
+
+async def no_demo(order_id: int):
+    return None
+
+
+def seed():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    tokens = []
+    for b in range(1, BUSINESSES + 1):
+        db.add(Business(id=b, name=f"Negocio {b}", category="Restaurante", latitude=6.24, longitude=-75.56,
+                        delivery_time=30, rating=4.5, is_open=True))
+        db.add_all(Product(business_id=b, name=f"Producto {b}-{i}", price=1000 + i, available=True, source="Local")
+                   for i in range(PRODUCTS_PER_BUSINESS))
+    for u in range(1, BUYERS + 1):
+        db.add(User(id=u, email=f"buyer{u}@delivery.com", hashed_password="-", full_name=f"Cliente {u}",
+                    role="buyer"))
+        tokens.append(create_access_token({"sub": f"buyer{u}@delivery.com", "uid": u, "role": "buyer"}))
+    db.commit()
+    db.close()
+    return tokens
+
+
+def order_body(rng):
+    business_id = rng.randint(1, BUSINESSES)
+    first = (business_id - 1) * PRODUCTS_PER_BUSINESS + 1
+    products = rng.sample(range(first, first + PRODUCTS_PER_BUSINESS), 3)
+    return {
+        "business_id": business_id,
+        "products": [{"product_id": p, "quantity": rng.randint(1, 3)} for p in products],
+        "customer_name": "Cliente", "customer_phone": "3001234567", "customer_address": "Calle 10 # 43-12",
+        "customer_lat": 6.21 + rng.random() * 0.06, "customer_lng": -75.60 + rng.random() * 0.06,
+    }
+
+
+def count_orders():
+    with SessionLocal() as db:
+        return db.scalar(select(func.count(Order.id)))
+
+
+async def run(tokens, with_key):
+    rng = random.Random(7)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    latencies, statuses = [], {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        counter = iter(range(ORDERS))
+
+        async def post(body, headers):
+            start = time.perf_counter()
+            r = await client.post("/api/delivery/orders", json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            return r
+
+        async def client_loop():
+            for n in counter:
+                body = order_body(rng)
+                headers = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+                if with_key:
+                    headers["Idempotency-Key"] = str(uuid.uuid4())
+                if rng.random() < INFLIGHT_RETRY_RATE:
+                    await asyncio.gather(post(body, headers), post(body, headers))
+                else:
+                    await post(body, headers)
+                if rng.random() < LATE_RETRY_RATE:
+                    await post(body, headers)
+
+        before = count_orders()
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+        await work_queue.drain()
+        await email_queue.drain()
+    return {
+        "created": count_orders() - before,
+        "requests": len(latencies),
+        "elapsed": elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "statuses": statuses,
+    }
+
+
+async def main():
+    tokens = seed()
+    road_router.path = ROAD_GRAPH_FIXTURE
+    delivery.demo_order_progression = no_demo
+    print(f"{ORDERS} pedidos, {CONCURRENCY} clientes concurrentes, reintentos: "
+          f"{INFLIGHT_RETRY_RATE:.0%} en curso + {LATE_RETRY_RATE:.0%} tras la respuesta\n")
+    print(f"{'modo':<22} | {'pedidos/s':>9} | {'req/s':>7} | {'p50':>8} | {'p99':>8} | "
+          f"{'creados':>7} | {'duplicados':>10}")
+    for label, with_key in (("sin Idempotency-Key", False), ("con Idempotency-Key", True)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await run(tokens, with_key)
+        print(f"{label:<22} | {ORDERS / result['elapsed']:>9,.0f} | {result['requests'] / result['elapsed']:>7,.0f} | "
+              f"{result['p50']:>5.1f} ms | {result['p99']:>5.1f} ms | {result['created']:>7,} | "
+              f"{result['created'] - ORDERS:>10,}   {result['statuses']}")
+    print(f"\ncola de trabajos: {work_queue.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
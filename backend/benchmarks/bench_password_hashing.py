@@ -0,0 +1,101 @@
+"""
+Benchmark: ráfaga de logins y su efecto sobre el resto de peticiones
+Corre la app en el mismo proceso (httpx sobre ASGI) con una base temporal. Mientras
+varios clientes hacen login en paralelo, una sonda pide /api/delivery/businesses
+cada 20 ms y mide su latencia desde el momento en que debía enviarse. Compara
+bcrypt ejecutado dentro del event loop (como antes) contra el pool dedicado de
+auth_utils.
+
+Uso (desde la carpeta backend):
+    BCRYPT_ROUNDS=12 python -m benchmarks.bench_password_hashing
+"""
+
+import asyncio
+import statistics
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database()
+
+import httpx  # noqa: E402
+
+import app.routes.auth as auth_routes  # noqa: E402
+from app.auth_utils import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, get_password_hash, pwd_context  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Business, User  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+
+USERS = 100
+LOGIN_CLIENTS = 16
+DURATION_SECONDS = 8
+PROBE_INTERVAL = 0.02
+
+
+def seed():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    hashed = get_password_hash("bench")  # Mismo costo para todos; se calcula una vez
+    db.add(Business(id=1, name="Negocio", category="Restaurante", latitude=6.24, longitude=-75.56))
+    db.add_all(User(id=i, email=f"user{i}@delivery.com", hashed_password=hashed, full_name=f"Usuario {i}",
+                    role="buyer") for i in range(1, USERS + 1))
+    db.commit()
+    db.close()
+
+
+async def inline_verify(plain_password, hashed_password):
+    """Comportamiento anterior: bcrypt dentro del event loop"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def run(label, client):
+    stop = time.perf_counter() + DURATION_SECONDS
+    logins, probe = [], []
+
+    async def login_client(n):
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            r = await client.post("/api/auth/token",
+                                  data={"username": f"user{n % USERS + 1}@delivery.com", "password": "bench"})
+            r.raise_for_status()
+            logins.append(time.perf_counter() - start)
+            n += LOGIN_CLIENTS
+
+    async def probe_client():
+        # Latencia contada desde el momento en que la petición debía salir: incluye
+        # el tiempo que el event loop tardó en atenderla
+        scheduled = time.perf_counter()
+        while scheduled < stop:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            r = await client.get("/api/delivery/businesses")
+            r.raise_for_status()
+            probe.append(time.perf_counter() - scheduled)
+            scheduled = max(scheduled + PROBE_INTERVAL, time.perf_counter())
+
+    start = time.perf_counter()
+    await asyncio.gather(probe_client(), *(login_client(n) for n in range(LOGIN_CLIENTS)))
+    elapsed = time.perf_counter() - start
+    probe.sort()
+    print(f"{label:<24} | {len(logins) / elapsed:>8.1f}/s | {statistics.median(logins) * 1000:>8.0f} ms | "
+          f"{statistics.median(probe) * 1000:>8.1f} ms | {probe[int(len(probe) * 0.99)] * 1000:>8.1f} ms | "
+          f"{len(probe):>6}")
+
+
+async def main():
+    seed()
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}, pool de {PASSWORD_HASH_WORKERS} hilos, {LOGIN_CLIENTS} clientes "
+          f"haciendo login durante {DURATION_SECONDS}s, sonda cada {PROBE_INTERVAL * 1000:.0f} ms\n")
+    print(f"{'modo':<24} | {'logins':>10} | {'p50 login':>11} | {'p50 sonda':>11} | {'p99 sonda':>11} | sondas")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/api/delivery/businesses")  # Calentar el caché del catálogo
+        pooled = auth_routes.verify_and_update_password
+        auth_routes.verify_and_update_password = inline_verify
+        await run("bcrypt en el event loop", client)
+        auth_routes.verify_and_update_password = pooled
+        await run("pool dedicado", client)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
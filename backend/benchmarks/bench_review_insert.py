@@ -0,0 +1,74 @@
+"""
+Benchmark: latencia de insertar una reseña según cuántas tiene ya el negocio
+Compara la versión anterior de create_review (carga todas las reseñas del negocio
+y las vuelve a sumar) contra el UPDATE incremental de app/services/ratings.py,
+sobre una base SQLite temporal.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_review_insert
+"""
+
+import random
+import statistics
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database()
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import Business, Review  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.ratings import add_review_statement  # noqa: E402
+
+REVIEW_COUNTS = (100, 1_000, 10_000, 50_000)
+INSERTS = 30
+
+
+def legacy_review(db, business_id, rating):
+    """Réplica de create_review antes de los acumulados"""
+    db.add(Review(order_id=1, business_id=business_id, rating=rating, comment=""))
+    business = db.query(Business).filter(Business.id == business_id).first()
+    reviews = db.query(Review).filter(Review.business_id == business_id).all()
+    if reviews:
+        total_rating = sum([r.rating for r in reviews]) + rating
+        business.rating = round(total_rating / (len(reviews) + 1), 1)
+    db.commit()
+
+
+def incremental_review(db, business_id, rating):
+    db.add(Review(order_id=1, business_id=business_id, rating=rating, comment=""))
+    db.execute(add_review_statement(business_id, rating))
+    db.commit()
+
+
+def measure(fn, business_id):
+    rng = random.Random(business_id)
+    times = []
+    for _ in range(INSERTS):
+        db = SessionLocal()
+        start = time.perf_counter()
+        fn(db, business_id, rng.randint(1, 5))
+        times.append(time.perf_counter() - start)
+        db.close()
+    return statistics.median(times) * 1000
+
+
+def main():
+    upgrade_schema(engine)
+    rng = random.Random(3)
+    print(f"{'reseñas previas':>15} | {'anterior':>10} | {'incremental':>11}")
+    for business_id, count in enumerate(REVIEW_COUNTS, start=1):
+        with engine.begin() as conn:
+            conn.execute(insert(Business), [{"id": business_id, "name": f"Negocio {business_id}", "rating": 4.0}])
+            conn.execute(insert(Review), [{"order_id": 1, "business_id": business_id, "rating": rng.randint(1, 5)}
+                                          for _ in range(count)])
+        legacy = measure(legacy_review, business_id)
+        incremental = measure(incremental_review, business_id)
+        print(f"{count:>15,} | {legacy:>7.2f} ms | {incremental:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: consultas de ruta por segundo sobre la red vial
+Genera un extracto de OSM sintético (cuadrícula de calles con puntos de forma, vías
+de un sentido y avenidas) del tamaño aproximado de una comuna, o usa un extracto real
+si se pasa su ruta. Compara Dijkstra y A* sobre el grafo completo, A* sobre el grafo
+contraído y el RoadRouter con caché por celdas (tráfico negocio -> cliente).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_routing [extracto.osm]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from app.services.routing import RoadGraph, RoadRouter
+
+GRID_SIZE = 120          # intersecciones por lado
+SHAPE_POINTS = 3         # puntos de forma por cuadra
+ORIGIN = (6.20, -75.61)
+BLOCK_DEG = 0.0009       # ≈ 100 m
+NUM_QUERIES = 300
+NUM_BUSINESSES = 40
+NUM_ORDERS = 5_000
+NUM_CUSTOMERS = 150
+
+
+def write_synthetic_extract(path: str):
+    rng = random.Random(7)
+    next_id = [0]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<osm version="0.6">\n')
+
+        def node(lat, lng):
+            next_id[0] += 1
+            f.write(f'<node id="{next_id[0]}" lat="{lat:.7f}" lon="{lng:.7f}"/>\n')
+            return next_id[0]
+
+        grid = [[node(ORIGIN[0] + i * BLOCK_DEG, ORIGIN[1] + j * BLOCK_DEG) for j in range(GRID_SIZE)]
+                for i in range(GRID_SIZE)]
+        ways = []
+        for horizontal in (True, False):
+            for a in range(GRID_SIZE):
+                refs = [grid[a][0] if horizontal else grid[0][a]]
+                for b in range(1, GRID_SIZE):
+                    for k in range(1, SHAPE_POINTS + 1):
+                        t = (b - 1 + k / (SHAPE_POINTS + 1)) * BLOCK_DEG
+                        jitter = rng.uniform(-0.00004, 0.00004)
+                        if horizontal:
+                            refs.append(node(ORIGIN[0] + a * BLOCK_DEG + jitter, ORIGIN[1] + t))
+                        else:
+                            refs.append(node(ORIGIN[0] + t, ORIGIN[1] + a * BLOCK_DEG + jitter))
+                    refs.append(grid[a][b] if horizontal else grid[b][a])
+                highway = "primary" if a % 10 == 0 else "residential"
+                oneway = "yes" if a % 4 == 1 else ("-1" if a % 4 == 3 else None)
+                ways.append((refs, highway, oneway))
+        for w, (refs, highway, oneway) in enumerate(ways, start=1):
+            f.write(f'<way id="{w}">' + "".join(f'<nd ref="{r}"/>' for r in refs))
+            f.write(f'<tag k="highway" v="{highway}"/>')
+            if oneway:
+                f.write(f'<tag k="oneway" v="{oneway}"/>')
+            f.write("</way>\n")
+        f.write("</osm>\n")
+
+
+def random_point(rng, graph):
+    node = rng.randrange(len(graph))
+    return graph.lat[node] + rng.uniform(-0.0005, 0.0005), graph.lng[node] + rng.uniform(-0.0005, 0.0005)
+
+
+def measure(label, graph, pairs, heuristic=True):
+    snapped = [(graph.nearest_node(*a)[0], graph.nearest_node(*b)[0]) for a, b in pairs]
+    start = time.perf_counter()
+    for source, target in snapped:
+        graph.shortest_path(source, target, heuristic=heuristic)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} | {len(graph):>8,} | {len(pairs) / elapsed:>10,.0f} | {elapsed / len(pairs) * 1000:8.2f} ms")
+
+
+def main():
+    if len(sys.argv) > 1:
+        path, cleanup = sys.argv[1], False
+    else:
+        fd, path = tempfile.mkstemp(suffix=".osm")
+        os.close(fd)
+        write_synthetic_extract(path)
+        cleanup = True
+
+    try:
+        start = time.perf_counter()
+        full = RoadGraph.from_osm(path, contract=False)
+        full_load = time.perf_counter() - start
+        start = time.perf_counter()
+        contracted = RoadGraph.from_osm(path)
+        contracted_load = time.perf_counter() - start
+    finally:
+        if cleanup:
+            os.remove(path)
+
+    print(f"Carga: completo {full_load:.1f}s ({len(full):,} nodos), "
+          f"contraído {contracted_load:.1f}s ({len(contracted):,} nodos, {contracted.edge_count:,} aristas)\n")
+
+    rng = random.Random(11)
+    pairs = [(random_point(rng, contracted), random_point(rng, contracted)) for _ in range(NUM_QUERIES)]
+    print(f"{'modo':<30} | {'nodos':>8} | {'rutas/s':>10} | {'por ruta':>11}")
+    measure("Dijkstra, grafo completo", full, pairs[:NUM_QUERIES // 3], heuristic=False)
+    measure("A*, grafo completo", full, pairs[:NUM_QUERIES // 3])
+    measure("A*, grafo contraído", contracted, pairs)
+
+    # Tráfico real: pocos negocios, clientes que se repiten por cuadra
+    router = RoadRouter(graph=contracted)
+    businesses = [random_point(rng, contracted) for _ in range(NUM_BUSINESSES)]
+    customers = [random_point(rng, contracted) for _ in range(NUM_CUSTOMERS)]
+    orders = [(rng.choice(businesses), rng.choice(customers)) for _ in range(NUM_ORDERS)]
+    start = time.perf_counter()
+    for (b_lat, b_lng), (c_lat, c_lng) in orders:
+        router.route(b_lat, b_lng, c_lat, c_lng)
+    elapsed = time.perf_counter() - start
+    stats = router.stats()
+    print(f"{'RoadRouter con caché (pedidos)':<30} | {len(contracted):>8,} | {len(orders) / elapsed:>10,.0f} | "
+          f"{elapsed / len(orders) * 1000:8.2f} ms   (hit rate {stats['hit_rate']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
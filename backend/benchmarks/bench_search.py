@@ -0,0 +1,146 @@
+"""
+Benchmark: latencia de /api/delivery/search con 500k productos
+Llena una base SQLite temporal con productos de supermercado sintéticos (los
+triggers alimentan products_fts durante la carga) y mide search_products para
+distintos tipos de consulta: término frecuente, término raro, varias palabras,
+prefijo, error de tipeo y filtro geográfico. Como referencia mide lo que costaría
+sin índice: LIKE '%término%' sobre nombre y descripción recorre toda la tabla para
+reunir las coincidencias que habría que ordenar por relevancia.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_search
+"""
+
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks import latency_summary, use_temp_database
+
+use_temp_database()
+
+from sqlalchemy import func, insert, or_, select  # noqa: E402
+
+from app.database import AsyncSessionLocal, engine  # noqa: E402
+from app.models import Business, Product  # noqa: E402
+from app.schema import upgrade_schema  # noqa: E402
+from app.services.business_index import business_index  # noqa: E402
+from app.services.search import search_products, search_vocabulary  # noqa: E402
+
+PRODUCTS = 500_000
+BUSINESSES = 2_000
+REPEAT = 30
+PAGE_SIZE = 20
+
+KINDS = ["Leche", "Queso", "Yogur", "Arroz", "Café", "Chocolate", "Galletas", "Jabón", "Detergente", "Champú",
+         "Atún", "Pan", "Jamón", "Salchicha", "Aceite", "Azúcar", "Harina", "Pasta", "Gaseosa", "Jugo",
+         "Cerveza", "Vino", "Agua", "Papas", "Arepa", "Mantequilla", "Huevos", "Pollo", "Carne", "Mermelada"]
+QUALIFIERS = ["entera", "deslactosada", "light", "integral", "tradicional", "orgánico", "premium", "familiar",
+              "picante", "dulce", "natural", "sin azúcar", "con sal", "ahumado", "campesino", "especial",
+              "de la casa", "extra", "clásico", "finas hierbas"]
+BRANDS = ["Alquería", "Colanta", "Alpina", "Zenú", "Noel", "Diana", "Roa", "Doria", "Postobón", "Águila",
+          "Nutresa", "Ramo", "Quala", "Familia", "Fab", "Jumbo", "Éxito", "Corona", "Mamá Ines", "Van Camps"]
+CATEGORIES = ["Lácteos", "Despensa", "Aseo", "Bebidas", "Carnes", "Panadería", "Snacks", "Licores"]
+
+QUERIES = {
+    "término frecuente": "leche",
+    "término raro": "mermelada campesino",
+    "marca + producto": "colanta queso",
+    "sin tildes": "jamon ahumado",
+    "prefijo": "deslac",
+    "error de tipeo": "chocolte",
+}
+
+
+def seed():
+    upgrade_schema(engine)
+    rng = random.Random(11)
+    with engine.begin() as conn:
+        conn.execute(insert(Business), [
+            {"id": b, "name": f"Supermercado {b}", "latitude": 6.15 + rng.random() * 0.2,
+             "longitude": -75.65 + rng.random() * 0.15, "is_open": True}
+            for b in range(1, BUSINESSES + 1)
+        ])
+    start = time.perf_counter()
+    for offset in range(0, PRODUCTS, 50_000):
+        rows = []
+        for i in range(offset, offset + 50_000):
+            kind = rng.choice(KINDS)
+            rows.append({
+                "business_id": rng.randint(1, BUSINESSES),
+                "name": f"{kind} {rng.choice(QUALIFIERS)} {rng.choice(BRANDS)} {rng.randint(1, 50) * 50}g",
+                "price": rng.randint(1_000, 90_000),
+                "description": f"{kind} {rng.choice(QUALIFIERS)} marca {rng.choice(BRANDS)}",
+                "category": rng.choice(CATEGORIES),
+                "available": rng.random() > 0.05,
+                "source": "Local",
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(Product), rows)
+    return time.perf_counter() - start
+
+
+def like_search(term):
+    pattern = f"%{term}%"
+    stmt = select(Product.id).where(Product.available == True,
+                                    or_(Product.name.ilike(pattern), Product.description.ilike(pattern)))
+    with engine.connect() as conn:
+        return conn.execute(stmt).all()
+
+
+async def measure(query, geo=None):
+    times, result = [], None
+    async with AsyncSessionLocal() as db:
+        # La primera vuelta calienta la caché de páginas de SQLite y no se cuenta
+        for i in range(REPEAT + 1):
+            start = time.perf_counter()
+            distances = await business_index.within_radius(db, *geo) if geo else None
+            result = await search_products(db, query, PAGE_SIZE, business_distances=distances)
+            if i:
+                times.append(time.perf_counter() - start)
+    return latency_summary(times), result
+
+
+async def run_queries(title):
+    print(f"\n{title}")
+    print(f"{'consulta':<22} | {'texto':<22} | {'p50':>8} | {'p95':>8} | resultados")
+    for label, query in QUERIES.items():
+        (p50, p95), result = await measure(query)
+        shown = f"{result['count']}" + (f" (corregida: {result['corrected_query']})" if result["corrected_query"] else "")
+        print(f"{label:<22} | {query:<22} | {p50:>5.1f} ms | {p95:>5.1f} ms | {shown}")
+    for radius in (1, 3):
+        (p50, p95), result = await measure("leche", geo=(6.25, -75.57, radius))
+        label = f"geo {radius} km"
+        print(f"{label:<22} | {'leche':<22} | {p50:>5.1f} ms | {p95:>5.1f} ms | {result['count']}")
+
+
+async def main():
+    print(f"Cargando {PRODUCTS:,} productos en {BUSINESSES:,} negocios...")
+    elapsed = seed()
+    print(f"Carga con triggers FTS5: {elapsed:.1f}s ({PRODUCTS / elapsed:,.0f} productos/s)")
+
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        await db.run_sync(search_vocabulary.reload)
+        print(f"Vocabulario para correcciones: {len(search_vocabulary.terms):,} términos "
+              f"en {(time.perf_counter() - start) * 1000:.0f} ms")
+        await business_index.get(db)
+
+    await run_queries(f"Búsquedas ({REPEAT} repeticiones, página de {PAGE_SIZE})")
+
+    print("\nReferencia sin índice (LIKE '%término%', todas las coincidencias):")
+    for term in ("leche", "mermelada", "chocolte"):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            matches = len(like_search(term))
+            times.append(time.perf_counter() - start)
+        print(f"  {term:<12} {statistics.median(times) * 1000:>8.1f} ms  {matches:,} coincidencias")
+    with engine.connect() as conn:
+        total = conn.scalar(select(func.count(Product.id)))
+    print(f"\n{total:,} productos")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
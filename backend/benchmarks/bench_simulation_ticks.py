@@ -0,0 +1,99 @@
+"""
+Benchmark: CPU por tick con 10k simulaciones de entrega activas
+Compara la versión anterior (una corrutina por pedido que duerme entre pasos y
+publica por su cuenta) contra el ticker único con estado en arreglos de NumPy.
+Ambas publican en un ConnectionManager en memoria sin sockets, así se incluye
+la serialización de cada mensaje.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_simulation_ticks [num_simulaciones]
+"""
+
+import asyncio
+import math
+import random
+import sys
+import time
+
+from app.services.broadcast import MemoryBroadcast
+from app.services.simulation import SimulationService
+from app.websockets import ConnectionManager
+
+NUM_SIMULATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+TICK_SECONDS = 0.5
+NUM_TICKS = 10
+
+
+async def legacy_simulation(broadcaster, order_id, start_lat, start_lng, end_lat, end_lng, steps):
+    """Réplica del bucle anterior de start_simulation (paso fijo)"""
+    lat_step = (end_lat - start_lat) / steps
+    lng_step = (end_lng - start_lng) / steps
+    current_lat, current_lng = start_lat, start_lng
+    for i in range(steps):
+        current_lat += lat_step + math.sin(i * 0.5) * 0.00005
+        current_lng += lng_step + math.cos(i * 0.5) * 0.00005
+        await broadcaster.broadcast(order_id, {
+            "type": "location_update",
+            "lat": current_lat,
+            "lng": current_lng,
+            "progress": int((i / steps) * 100),
+            "eta_minutes": int((steps - i) * 2 / 60) + 1
+        })
+        await asyncio.sleep(TICK_SECONDS)
+
+
+def trips():
+    rng = random.Random(5)
+    for order_id in range(NUM_SIMULATIONS):
+        yield (order_id, 6.2 + rng.random() * 0.1, -75.6 + rng.random() * 0.1,
+               6.2 + rng.random() * 0.1, -75.6 + rng.random() * 0.1)
+
+
+async def run_legacy():
+    broadcaster = ConnectionManager(MemoryBroadcast())
+    steps = NUM_TICKS * 10
+    tasks = [asyncio.create_task(legacy_simulation(broadcaster, *trip, steps)) for trip in trips()]
+    await asyncio.sleep(TICK_SECONDS / 2)
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(TICK_SECONDS * NUM_TICKS)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return cpu / NUM_TICKS, wall / NUM_TICKS
+
+
+async def run_ticker():
+    service = SimulationService(tick_seconds=TICK_SECONDS, broadcaster=ConnectionManager(MemoryBroadcast()))
+    for trip in trips():
+        service.add(*trip, duration_seconds=TICK_SECONDS * NUM_TICKS * 10)
+    await asyncio.sleep(TICK_SECONDS / 2)
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.sleep(TICK_SECONDS * NUM_TICKS)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    # Costo aislado de un tick: avance vectorizado y publicación en lote
+    start = time.process_time()
+    for _ in range(NUM_TICKS):
+        await service.tick()
+    tick_cpu = (time.process_time() - start) / NUM_TICKS
+    for order_id in list(service.active_simulations):
+        service.stop_simulation(order_id)
+    return cpu / NUM_TICKS, wall / NUM_TICKS, tick_cpu
+
+
+async def main():
+    import app.services.simulation as simulation
+    simulation.print = lambda *args, **kwargs: None
+
+    print(f"{NUM_SIMULATIONS} simulaciones activas, tick de {TICK_SECONDS}s, {NUM_TICKS} ticks medidos\n")
+    legacy_cpu, legacy_wall = await run_legacy()
+    ticker_cpu, ticker_wall, tick_cpu = await run_ticker()
+    print(f"{'modo':<26} | {'CPU por tick':>12} | {'% de un núcleo':>14}")
+    print(f"{'corrutina por pedido':<26} | {legacy_cpu * 1000:9.1f} ms | {legacy_cpu / legacy_wall:13.0%}")
+    print(f"{'ticker único (NumPy)':<26} | {ticker_cpu * 1000:9.1f} ms | {ticker_cpu / ticker_wall:13.0%}")
+    print(f"\nTick aislado (advance + broadcast_many): {tick_cpu * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
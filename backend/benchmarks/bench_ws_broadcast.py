@@ -0,0 +1,121 @@
+"""
+Benchmark: latencia de broadcast por WebSocket con miles de clientes simulados
+Compara el ConnectionManager anterior (send_json secuencial por socket) contra el
+actual (serialización única y cola de envío por conexión). Una fracción de los
+clientes son lentos y otra fracción están muertos (el envío falla).
+
+Mide, por mensaje, el tiempo hasta que todos los clientes sanos lo recibieron.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.bench_ws_broadcast [num_clientes]
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+import app.websockets as ws
+from app.websockets import ConnectionManager
+
+NUM_CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+NUM_ORDERS = 10
+NUM_MESSAGES = 10
+NETWORK_DELAY = (0.001, 0.005)   # Cliente normal
+SLOW_FRACTION, SLOW_DELAY = 0.01, 1.0
+DEAD_FRACTION = 0.005
+
+
+class FakeSocket:
+    """WebSocket simulado con latencia de envío configurable"""
+
+    def __init__(self, rng: random.Random):
+        roll = rng.random()
+        self.dead = roll < DEAD_FRACTION
+        self.slow = not self.dead and roll < DEAD_FRACTION + SLOW_FRACTION
+        self.delay = SLOW_DELAY if self.slow else rng.uniform(*NETWORK_DELAY)
+        self.received = {}
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text: str):
+        if self.dead:
+            raise ConnectionResetError("cliente desconectado")
+        await asyncio.sleep(self.delay)
+        self.received[json.loads(text)["seq"]] = time.perf_counter()
+
+    async def send_json(self, message: dict):
+        await self.send_text(json.dumps(message))
+
+
+class LegacyConnectionManager:
+    """Réplica del broadcast anterior: un send_json tras otro, sin expulsar sockets muertos"""
+
+    def __init__(self):
+        self.active_connections = {}
+
+    async def connect(self, websocket, order_id):
+        await websocket.accept()
+        self.active_connections.setdefault(order_id, []).append(websocket)
+
+    async def broadcast(self, order_id, message):
+        for connection in self.active_connections.get(order_id, []):
+            try:
+                await connection.send_json(message)
+            except Exception:
+                pass
+
+
+async def run(manager, label):
+    rng = random.Random(3)
+    sockets = {}
+    for i in range(NUM_CLIENTS):
+        sock = FakeSocket(rng)
+        order_id = i % NUM_ORDERS
+        sockets[sock] = order_id
+        await manager.connect(sock, order_id)
+    healthy = [s for s in sockets if not s.dead and not s.slow]
+
+    broadcast_times, sent_at = [], {}
+    start = time.perf_counter()
+    for seq in range(NUM_MESSAGES):
+        sent_at[seq] = time.perf_counter()
+        call_start = time.perf_counter()
+        await asyncio.gather(*(manager.broadcast(order_id, {"type": "location_update", "seq": seq})
+                               for order_id in range(NUM_ORDERS)))
+        broadcast_times.append(time.perf_counter() - call_start)
+        await asyncio.sleep(0.05)
+
+    # Esperar a que todos los clientes sanos tengan todos los mensajes
+    deadline = time.perf_counter() + 60
+    while any(len(s.received) < NUM_MESSAGES for s in healthy) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    total = time.perf_counter() - start
+
+    latencies = sorted(s.received[seq] - sent_at[seq] for s in healthy for seq in s.received)
+    remaining = sum(len(c) for c in manager.active_connections.values())
+    print(f"{label:<8} | {statistics.median(broadcast_times) * 1000:8.1f} ms | "
+          f"{statistics.median(latencies) * 1000:8.1f} ms | {latencies[int(len(latencies) * 0.99)] * 1000:8.1f} ms | "
+          f"{total:6.2f} s | {remaining}")
+
+
+async def main():
+    print(f"{NUM_CLIENTS} clientes en {NUM_ORDERS} órdenes; {NUM_MESSAGES} mensajes por orden; "
+          f"{SLOW_FRACTION:.0%} lentos ({SLOW_DELAY}s), {DEAD_FRACTION:.1%} muertos\n")
+    print(f"{'modo':<8} | {'broadcast':>11} | {'entrega p50':>11} | {'entrega p99':>11} | {'total':>8} | conexiones finales")
+    await run(LegacyConnectionManager(), "antes")
+    # Timeout corto para que los lentos se expulsen dentro de la prueba
+    ws.WS_SEND_TIMEOUT_SECONDS = 0.5
+    await run(ConnectionManager(), "ahora")
+
+
+if __name__ == "__main__":
+    # Silenciar los mensajes de conexión/desconexión del manager
+    ws.print = lambda *args, **kwargs: None
+    asyncio.run(main())
@@ -1,18 +1,24 @@
 from app.database import SessionLocal, engine, Base
-from app.models import Business, Product, Courier, Order, User
+from app.models import Business, Product, Courier, Order, OrderEvent, User
+from app.schema import upgrade_schema
+from app.services.stats import rebuild_stats
 from sqlalchemy import text
 
 def reset_db():
+    upgrade_schema(engine)
     session = SessionLocal()
     try:
         print("🧹 Limpiando base de datos...")
         # Borrar datos en orden de dependencias
+        session.query(OrderEvent).delete()
         session.query(Order).delete()
         session.query(Product).delete()
         session.query(Business).delete()
         session.query(Courier).delete()
         session.query(User).delete()
         session.commit()
+        # Los borrados masivos no disparan los eventos del ORM: contadores desde cero
+        rebuild_stats(session)
         print("✅ Base de datos limpia.")
     except Exception as e:
         print(f"❌ Error limpiando DB: {e}")
@@ -0,0 +1,57 @@
+"""
+Importa o actualiza el catálogo de productos desde un archivo
+
+Acepta un arreglo JSON, NDJSON/JSONL o CSV (también comprimidos con .gz) y lo
+procesa en streaming. Los productos se identifican por (business_id, sku): sin
+columna sku se usa el nombre normalizado, así que volver a importar el mismo
+archivo actualiza precios en lugar de duplicar. Si la importación se corta, al
+correrla de nuevo continúa desde el último lote confirmado.
+
+Columnas: business_id, name, price y opcionales sku, description, category,
+image, available, source.
+
+Uso (desde la carpeta backend):
+    python import_catalog.py data/products.json
+    python import_catalog.py catalogo_jumbo.ndjson.gz --business-id 7 --source Jumbo
+"""
+
+import argparse
+
+from app.database import SessionLocal, engine
+from app.schema import upgrade_schema
+from app.services.catalog_cache import CATALOG_CACHE_TTL_SECONDS
+from app.services.catalog_import import CATALOG_IMPORT_BATCH_SIZE, FORMATS, import_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa productos al catálogo")
+    parser.add_argument("path", help="Archivo .json, .ndjson/.jsonl o .csv (opcionalmente .gz)")
+    parser.add_argument("--format", choices=FORMATS, help="Formato, si la extensión no lo indica")
+    parser.add_argument("--business-id", type=int, help="Negocio de las filas sin business_id")
+    parser.add_argument("--source", default="Local", help="Origen de las filas sin source (Local, Jumbo...)")
+    parser.add_argument("--batch-size", type=int, default=CATALOG_IMPORT_BATCH_SIZE,
+                        help="Filas por transacción")
+    parser.add_argument("--restart", action="store_true", help="Ignora el checkpoint y empieza de cero")
+    parser.add_argument("--rejects", help="Archivo NDJSON para las filas rechazadas")
+    args = parser.parse_args()
+
+    upgrade_schema(engine)
+    db = SessionLocal()
+    try:
+        print(f"📦 Importando productos desde {args.path}...")
+        stats = import_catalog(db, args.path, fmt=args.format, source=args.source,
+                               business_id=args.business_id, batch_size=args.batch_size,
+                               resume=not args.restart, rejects_path=args.rejects)
+        print(f"✅ {stats.upserted:,} productos guardados en {stats.batches} lotes "
+              f"({stats.rate:,.0f} filas/s, {stats.elapsed:.1f}s)")
+        if stats.rejected:
+            print(f"⚠️ {stats.rejected:,} filas rechazadas: ver {stats.rejects_path}")
+        # La caché del catálogo vive en el proceso del servidor, no en este
+        print(f"ℹ️ Un servidor en marcha puede seguir mostrando el catálogo anterior por hasta "
+              f"{CATALOG_CACHE_TTL_SECONDS:g}s (CATALOG_CACHE_TTL_SECONDS)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
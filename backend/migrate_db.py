@@ -1,12 +1,12 @@
 import json
 import os
-import sys
-from sqlalchemy.orm import Session
-from app.database import SessionLocal, engine, Base
-from app.models import Business, Product, Courier, Order, Coupon
+from app.database import SessionLocal, engine
+from app.models import Business, Product, Courier, Coupon
+from app.schema import upgrade_schema
+from app.services.catalog_import import import_catalog
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
+# Crear tablas y aplicar columnas/índices nuevos
+upgrade_schema(engine)
 
 def migrate_data():
     db = SessionLocal()
@@ -36,6 +36,9 @@ def migrate_data():
         except FileNotFoundError:
             print("⚠️ No se encontró businesses.json")
 
+    # Los productos se validan contra los negocios guardados
+    db.commit()
+
     # 2. Productos
     product_count = db.query(Product).count()
     print(f"📊 Productos actuales en DB: {product_count}")
@@ -45,36 +48,26 @@ def migrate_data():
             # Productos locales
             file_path = "data/products.json"
             if os.path.exists(file_path):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    print(f"📦 Cargando {len(data)} productos desde {file_path}...")
-                    for item in data:
-                        try:
-                            p = Product(
-                                business_id=item["business_id"],
-                                name=item["name"],
-                                price=item["price"],
-                                description=item["description"],
-                                category=item["category"],
-                                available=item.get("available", True),
-                                image=item.get("image", ""),
-                                source="Local"
-                            )
-                            db.add(p)
-                        except Exception as e:
-                            print(f"❌ Error agregando producto {item['name']}: {e}")
-                print(f"✅ Productos migrados.")
+                print(f"📦 Cargando productos desde {file_path}...")
+                stats = import_catalog(db, file_path, source="Local")
+                print(f"✅ {stats.upserted} productos migrados ({stats.rejected} rechazados).")
             else:
                 print(f"⚠️ Archivo no encontrado: {file_path}")
             
-            # Productos Jumbo
-            # ... (rest of Jumbo logic)
+            # Productos Jumbo: las filas sin business_id van al negocio JUMBO_BUSINESS_ID
+            file_path = "data/jumbo_products.json"
+            if os.path.exists(file_path):
+                jumbo_business_id = os.getenv("JUMBO_BUSINESS_ID")
+                print(f"📦 Cargando productos Jumbo desde {file_path}...")
+                stats = import_catalog(db, file_path, source="Jumbo",
+                                       business_id=int(jumbo_business_id) if jumbo_business_id else None)
+                print(f"✅ {stats.upserted} productos Jumbo migrados ({stats.rejected} rechazados).")
         except Exception as e:
             print(f"❌ Error migrando productos: {e}")
             import traceback
             traceback.print_exc()
     else:
-        print("ℹ️ Se omitió migración de productos (ya existen datos).")
+        print("ℹ️ Se omitió migración de productos (ya existen datos). Usa import_catalog.py para actualizarlos.")
 
     # 3. Repartidores
     if db.query(Courier).count() == 0:
@@ -0,0 +1,30 @@
+"""
+Reconstruye las estadísticas materializadas del panel de admin
+
+Recalcula los contadores globales desde las tablas (orders, users, businesses) y
+los agregados por hora/día reproduciendo el log order_events. Útil tras cargas
+masivas o borrados directos en la DB.
+
+Uso (desde la carpeta backend):
+    python rebuild_stats.py
+"""
+
+from app.database import SessionLocal, engine
+from app.schema import upgrade_schema
+from app.services.stats import rebuild_stats
+
+
+def main():
+    upgrade_schema(engine)
+    db = SessionLocal()
+    try:
+        print("📊 Reconstruyendo estadísticas...")
+        stats = rebuild_stats(db)
+        print(f"✅ {stats['total_orders']} pedidos, {stats['total_users']} usuarios, "
+              f"{stats['total_businesses']} negocios. Por estado: {stats['orders_by_status']}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
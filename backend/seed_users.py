@@ -1,6 +1,7 @@
 from app.database import SessionLocal, engine, Base
 from app.models import User, Business
 from app.auth_utils import get_password_hash
+from app.services.stats import rebuild_stats
 
 def seed_users():
     # Asegurar que las tablas existan
@@ -71,6 +72,8 @@ def seed_users():
 
         print(f"✅ Usuario creado: {user_data['email']} ({user_data['role']})")
 
+    # Contadores del panel de admin al día con los usuarios y negocios creados
+    rebuild_stats(db)
     db.close()
     print("\n✨ ¡Proceso completado!")
 
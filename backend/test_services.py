@@ -0,0 +1,156 @@
+"""
+Verificaciones de regresión de los servicios en segundo plano
+Cada verificación arma su propio escenario (en memoria o en una base SQLite
+temporal) y reporta [OK] o [ERROR].
+
+Uso (desde la carpeta backend):
+    python test_services.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+# Configurar encoding para Windows
+if sys.platform == 'win32':
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def check_simulation_cancel_during_broadcast():
+    """Un pedido cancelado mientras el tick publica no rompe el cierre de los demás"""
+    print("Verificando cancelación de simulaciones durante el broadcast...\n")
+    from app.services.simulation import SimulationService
+
+    class CancellingBroadcaster:
+        """Cancela el pedido 1 en medio del broadcast, como update_order_status"""
+
+        def __init__(self):
+            self.delivered = []
+            self.service = None
+
+        async def broadcast_many(self, messages):
+            for order_id, message in messages:
+                if isinstance(message, dict) and message.get("status") == "entregado":
+                    self.delivered.append(order_id)
+                    self.service.stop_simulation(1)
+            await asyncio.sleep(0)
+
+    async def scenario():
+        broadcaster = CancellingBroadcaster()
+        service = SimulationService(tick_seconds=0.01, broadcaster=broadcaster)
+        broadcaster.service = service
+        futures = {order_id: service.add(order_id, 6.20, -75.57, 6.21, -75.56, duration_seconds=0.03)
+                   for order_id in (1, 2, 3)}
+        results = await asyncio.wait_for(asyncio.gather(*futures.values()), timeout=5)
+        # Un tick más: nada debe volver a anunciarse como entregado
+        delivered_before = len(broadcaster.delivered)
+        await service.tick()
+        return dict(zip(futures, results)), broadcaster.delivered, delivered_before, service
+
+    results, delivered, delivered_before, service = asyncio.run(scenario())
+    ok = True
+    if results != {1: False, 2: True, 3: True}:
+        print(f"  [ERROR] Resultados inesperados: {results}")
+        ok = False
+    if service.active_simulations:
+        print(f"  [ERROR] Quedaron simulaciones activas: {service.active_simulations}")
+        ok = False
+    if len(delivered) != delivered_before or sorted(delivered) != [1, 2, 3]:
+        print(f"  [ERROR] 'entregado' publicado de más: {delivered}")
+        ok = False
+    if ok:
+        print("  [OK] Las demás simulaciones terminan y 'entregado' se publica una sola vez")
+    return ok
+
+
+def check_concurrent_courier_assignment(workers: int = 8, attempts: int = 150):
+    """Muchos hilos asignando a la vez: cada repartidor y cada pedido se reclaman una sola vez"""
+    print("\nVerificando asignación concurrente de repartidores...\n")
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base, create_db_engine
+    from app.models import Courier, Order
+    from app.services.couriers import assign_courier
+
+    couriers_count, orders_count = 20, 50
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'check.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as db:
+            db.add_all(Courier(name=f"Repartidor {i}", phone=str(i), lat=6.24, lng=-75.56, available=True)
+                       for i in range(couriers_count))
+            db.add_all(Order(customer_name=f"Cliente {i}", status="preparando", business_lat=6.24,
+                             business_lng=-75.56) for i in range(orders_count))
+            db.commit()
+
+        wins, errors = [], []
+        barrier = threading.Barrier(workers)
+
+        def worker(seed: int):
+            rng = random.Random(seed)
+            barrier.wait()
+            with Session() as db:
+                for _ in range(attempts):
+                    courier_id, order_id = rng.randint(1, couriers_count), rng.randint(1, orders_count)
+                    try:
+                        if assign_courier(db, courier_id, order_id)[0]:
+                            wins.append((courier_id, order_id))
+                    except Exception as e:
+                        errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with Session() as db:
+            couriers = {c.id: c for c in db.query(Courier).all()}
+            assigned = db.query(Order).filter(Order.delivery_person_id.isnot(None)).all()
+        engine.dispose()
+
+    problems = []
+    if errors:
+        problems.append(f"{len(errors)} errores, ej. {errors[0]!r}")
+    if any(n > 1 for n in Counter(c for c, _ in wins).values()):
+        problems.append("un repartidor ganó más de un pedido")
+    if any(n > 1 for n in Counter(o for _, o in wins).values()):
+        problems.append("un pedido se reclamó más de una vez")
+    if sorted(wins) != sorted((o.delivery_person_id, o.id) for o in assigned):
+        problems.append("las asignaciones exitosas no coinciden con la tabla orders")
+    for order in assigned:
+        courier = couriers[order.delivery_person_id]
+        if courier.available or courier.current_order_id != order.id:
+            problems.append(f"repartidor {courier.id} inconsistente con el pedido {order.id}")
+            break
+    for problem in problems:
+        print(f"  [ERROR] {problem}")
+    if not problems:
+        print(f"  [OK] {workers * attempts} intentos en {workers} hilos: {len(wins)} asignaciones, "
+              f"ninguna duplicada")
+    return not problems
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("  VERIFICACION DE SERVICIOS")
+    print("=" * 50)
+    print()
+
+    checks = [
+        check_simulation_cancel_during_broadcast(),
+        check_concurrent_courier_assignment(),
+    ]
+
+    print("\n" + "=" * 50)
+    if all(checks):
+        print("\n[OK] Todas las verificaciones pasaron")
+    else:
+        print(f"\n[ERROR] Fallaron {checks.count(False)} verificaciones")
+        sys.exit(1)